@@ -1,13 +1,16 @@
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import TextField
+from django.utils.functional import cached_property
 from rest_framework import serializers
 
 from bs4 import BeautifulSoup
 
+from lego.apps.content.rendering import get_rendered_content, warm_rendered_content
 from lego.apps.content.utils import sanitize_html
 from lego.apps.files.constants import IMAGE, READY
 from lego.apps.files.models import File
-from lego.apps.files.thumbor import generate_url
+from lego.utils.fields import get_list_values
 
 
 class ContentField(TextField):
@@ -62,16 +65,26 @@ class ContentField(TextField):
 
         return str(html)
 
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        transaction.on_commit(lambda: warm_rendered_content(value))
+        return value
+
 
 class ContentSerializerField(serializers.CharField):
     """
-    Serializer field with thumbor url injection.
+    Serializer field with thumbor url injection. The rendered html is cached, and the content
+    of every item in a list is looked up at once.
     """
 
     def to_representation(self, value):
-        safe_value = sanitize_html(value, allow_images=True)
+        if value not in self.rendered:
+            values = [value, *get_list_values(self)]
+            self.rendered.update(
+                get_rendered_content([item for item in values if isinstance(item, str)])
+            )
+        return self.rendered[value]
 
-        html = BeautifulSoup(safe_value, "html.parser")
-        for image in html.find_all("img"):
-            image["src"] = generate_url(image.get("data-file-key"))
-        return str(html)
+    @cached_property
+    def rendered(self):
+        return {}
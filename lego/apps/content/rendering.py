@@ -0,0 +1,74 @@
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import cache
+
+from bs4 import BeautifulSoup
+
+from lego.apps.content.utils import sanitize_html
+from lego.apps.files.thumbor import THUMBOR_SECURITY_KEY, THUMBOR_SERVER, generate_url
+from lego.utils.cache import LocalCache
+
+# Bump when the sanitizer or the rendering below changes, to stop serving old html
+RENDER_VERSION = 1
+
+# Cache keys depend on the thumbor configuration, since the urls are signed with the key
+_config = sha1(
+    f"{RENDER_VERSION}:{THUMBOR_SERVER}:{THUMBOR_SECURITY_KEY}".encode()
+).hexdigest()[:12]
+
+local_cache = LocalCache(max_size=1000, timeout=60 * 60)
+
+
+def render_content(value):
+    """
+    Sanitize html and inject thumbor urls for the images.
+    """
+    safe_value = sanitize_html(value, allow_images=True)
+
+    html = BeautifulSoup(safe_value, "html.parser")
+    for image in html.find_all("img"):
+        image["src"] = generate_url(image.get("data-file-key"))
+    return str(html)
+
+
+def _cache_key(value):
+    return f"content_html_{_config}_{sha1(value.encode()).hexdigest()}"
+
+
+def get_rendered_content(values):
+    """
+    Rendered html for many content strings, mapped by the content.
+
+    The html is cached by a hash of the content, so an edit is a new key and nothing has to
+    be invalidated. Lookups go through a small in-process LRU in front of redis, and the
+    misses are rendered and stored in both.
+    """
+    keys = {_cache_key(value): value for value in set(values) if value}
+    rendered = local_cache.get_many(keys)
+    missing = [key for key in keys if key not in rendered]
+    if missing and settings.CONTENT_RENDER_CACHE_TIMEOUT:
+        shared = cache.get_many(missing)
+        local_cache.set_many(shared)
+        rendered.update(shared)
+        missing = [key for key in missing if key not in shared]
+
+    if missing:
+        new = {key: render_content(keys[key]) for key in missing}
+        if settings.CONTENT_RENDER_CACHE_TIMEOUT:
+            cache.set_many(new, timeout=settings.CONTENT_RENDER_CACHE_TIMEOUT)
+            local_cache.set_many(new)
+        rendered.update(new)
+
+    result = {keys[key]: html for key, html in rendered.items()}
+    # Empty content is not cached, rendering it is free
+    result.update({value: render_content(value) for value in values if not value})
+    return result
+
+
+def warm_rendered_content(value):
+    """
+    Render content ahead of the first read, used when content is saved.
+    """
+    if value and settings.CONTENT_RENDER_CACHE_TIMEOUT:
+        get_rendered_content([value])
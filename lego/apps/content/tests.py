@@ -1,8 +1,15 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.text import slugify
+from rest_framework import serializers
 
 from lego.apps.articles.models import Article
+from lego.apps.content import rendering
+from lego.apps.content.fields import ContentSerializerField
 from lego.apps.content.models import SlugModel
 from lego.apps.users.models import User
 from lego.utils.test_utils import BaseTestCase
@@ -151,3 +158,57 @@ class ContentModelTestCase(BaseTestCase):
                 text=content,
                 current_user=User.objects.get(username="webkom"),
             )
+
+
+class ExampleContentSerializer(serializers.Serializer):
+    text = ContentSerializerField()
+
+
+class ContentRenderingTestCase(BaseTestCase):
+    def setUp(self):
+        cache.clear()
+        rendering.local_cache.clear()
+
+    def serialize(self, *texts):
+        items = [SimpleNamespace(text=text) for text in texts]
+        return [
+            item["text"] for item in ExampleContentSerializer(items, many=True).data
+        ]
+
+    def test_injects_image_urls(self):
+        (html,) = self.serialize('<p><img data-file-key="image.png"></p>')
+        self.assertIn('data-file-key="image.png"', html)
+        self.assertIn("src=", html)
+        self.assertEqual(
+            rendering.render_content('<p><img data-file-key="image.png"></p>'), html
+        )
+
+    def test_renders_list_once_per_content(self):
+        with (
+            mock.patch.object(
+                rendering, "render_content", return_value="html"
+            ) as render,
+            mock.patch.object(rendering.cache, "get_many", wraps=cache.get_many) as get,
+        ):
+            self.serialize("<p>a</p>", "<p>b</p>", "<p>a</p>")
+        self.assertEqual(2, render.call_count)
+        self.assertEqual(1, get.call_count)
+
+    def test_cached_html_is_reused(self):
+        self.serialize("<p>a</p>")
+        rendering.local_cache.clear()
+        with mock.patch.object(rendering, "render_content") as render:
+            self.assertEqual(["<p>a</p>"], self.serialize("<p>a</p>"))
+        render.assert_not_called()
+
+    def test_edited_content_is_rendered(self):
+        self.assertEqual(["<p>a</p>"], self.serialize("<p>a</p>"))
+        self.assertEqual(["<p>b</p>"], self.serialize("<p>b</p>"))
+
+    def test_warms_cache_on_save(self):
+        content = "<p>saved content</p>"
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(title="test", description="test", text=content)
+        with mock.patch.object(rendering, "render_content") as render:
+            self.assertEqual([content], self.serialize(content))
+        render.assert_not_called()
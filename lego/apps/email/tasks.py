@@ -1,3 +1,4 @@
+import time
 from datetime import timedelta
 from zoneinfo import ZoneInfo
 
@@ -10,15 +11,14 @@ from structlog import get_logger
 
 from lego import celery_app
 from lego.apps.events.constants import EVENT_TYPE_TRANSLATIONS
-from lego.apps.events.models import Event
+from lego.apps.events.models import Event, Registration
 from lego.apps.joblistings.constants import JOB_TYPE_TRANSLATIONS
 from lego.apps.joblistings.models import Joblisting
 from lego.apps.notifications.constants import EMAIL, WEEKLY_MAIL
 from lego.apps.notifications.models import NotificationSetting
-from lego.apps.permissions.utils import get_permission_handler
 from lego.apps.restricted.message_processor import MessageProcessor
 from lego.apps.tags.models import Tag
-from lego.apps.users.models import AbakusGroup
+from lego.apps.users.models import AbakusGroup, User
 from lego.utils.tasks import AbakusTask
 
 log = get_logger()
@@ -28,50 +28,130 @@ def add_source_to_url(url):
     return f"{url}?utm_source=WeeklyMail&utm_campaign=Email"
 
 
-def create_weekly_mail(user):
-    week_number = timezone.now().isocalendar().week
-
-    three_days_ago_timestamp = timezone.now() - timedelta(days=3)
-    last_sunday_timestamp = timezone.now() - timedelta(days=7)
-
-    weekly_tag = Tag.objects.filter(tag="weekly").first()
-    # Check if weekly tag exists so it does not crash if some idiot deletes the weekly tag
-    todays_weekly = (
-        weekly_tag.article_set.filter(created_at__gt=three_days_ago_timestamp).first()
-        if weekly_tag
-        else None
-    )
-
-    events_next_week = Event.objects.filter(
-        pools__activation_date__gt=timezone.now(),
-        pools__activation_date__lt=timezone.now() + timedelta(days=7),
-    ).distinct()
-
-    permission_handler = get_permission_handler(events_next_week.model)
-    filtered_events = permission_handler.filter_queryset(user, events_next_week)
-
-    filtered_events = filter(
-        lambda event: event.get_possible_pools(user, True) or event.is_admitted(user),
-        filtered_events,
-    )
-
-    joblistings_last_week = Joblisting.objects.filter(
-        created_at__gt=last_sunday_timestamp, visible_from__lt=timezone.now()
-    )
+class WeeklyMail:
+    """
+    The weekly mail for many users. The weekly article, joblistings and events with
+    registration next week are loaded once. Users are grouped into segments by the events
+    they can see and register for, and the mail of each segment is rendered once.
+    """
+
+    def __init__(self):
+        now = timezone.now()
+        self.week_number = now.isocalendar().week
+
+        three_days_ago_timestamp = now - timedelta(days=3)
+        last_sunday_timestamp = now - timedelta(days=7)
+
+        weekly_tag = Tag.objects.filter(tag="weekly").first()
+        # Check if weekly tag exists so it does not crash if some idiot deletes the weekly tag
+        self.todays_weekly = (
+            weekly_tag.article_set.filter(
+                created_at__gt=three_days_ago_timestamp
+            ).first()
+            if weekly_tag
+            else None
+        )
 
-    joblistings = []
-    for joblisting in joblistings_last_week:
-        joblistings.append(
+        joblistings_last_week = Joblisting.objects.filter(
+            created_at__gt=last_sunday_timestamp, visible_from__lt=now
+        ).select_related("company")
+        self.joblistings = [
             {
                 "id": joblisting.id,
                 "company_name": joblisting.company.name,
                 "type": JOB_TYPE_TRANSLATIONS[joblisting.job_type],
                 "title": joblisting.title,
             }
+            for joblisting in joblistings_last_week
+        ]
+
+        self.events = list(
+            Event.objects.filter(
+                pools__activation_date__gt=now,
+                pools__activation_date__lt=now + timedelta(days=7),
+            )
+            .distinct()
+            .prefetch_related(
+                "pools__permission_groups",
+                "can_edit_users",
+                "can_edit_groups",
+                "can_view_groups",
+            )
+        )
+
+    def segments(self, users):
+        """
+        Group users by the ids of the events in their mail.
+        """
+        group_ids = User.objects.all_group_ids_by_user([user.pk for user in users])
+        admitted = set(
+            Registration.objects.filter(
+                event__in=self.events, user__in=users, pool__isnull=False
+            ).values_list("user_id", "event_id")
         )
 
-    events = []
-    for event in filtered_events:
+        segments = {}
+        for user in users:
+            event_ids = frozenset(
+                event.pk
+                for event in self.events
+                if self.can_view(event, user, group_ids[user.pk])
+                and (
+                    (user.pk, event.pk) in admitted
+                    or self.can_register(event, group_ids[user.pk])
+                )
+            )
+            segments.setdefault(event_ids, []).append(user)
+        return segments
+
+    def can_view(self, event, user, group_ids):
+        """
+        EventPermissionHandler.filter_queryset for a loaded event.
+        """
+        if not event.require_auth or event.created_by_id == user.pk:
+            return True
+        if any(edit_user.pk == user.pk for edit_user in event.can_edit_users.all()):
+            return True
+        return any(
+            group.pk in group_ids
+            for group in [*event.can_edit_groups.all(), *event.can_view_groups.all()]
+        )
+
+    def can_register(self, event, group_ids):
+        return any(
+            group.pk in group_ids
+            for pool in event.pools.all()
+            for group in pool.permission_groups.all()
+        )
+
+    def render(self, event_ids):
+        """
+        The html of the mail with the given events, with CSS inlined. None when the mail is
+        empty.
+        """
+        events = [
+            self.render_event(event) for event in self.events if event.pk in event_ids
+        ]
+        if not (events or self.joblistings or self.todays_weekly):
+            return None
+
+        html_body = render_to_string(
+            "email/email/weekly_mail.html",
+            {
+                "week_number": self.week_number,
+                "events": events,
+                "todays_weekly": (
+                    ""
+                    if self.todays_weekly is None
+                    else add_source_to_url(self.todays_weekly.get_absolute_url())
+                ),
+                "joblistings": self.joblistings,
+                "frontend_url": settings.FRONTEND_URL,
+            },
+        )
+        return transform(html_body)
+
+    def render_event(self, event):
         pools = []
         for pool in event.pools.all():
             pools.append(
@@ -83,66 +163,56 @@ def create_weekly_mail(user):
                 }
             )
 
-        events.append(
-            {
-                "title": event.title,
-                "id": event.id,
-                "pools": pools,
-                "start_time": event.start_time.astimezone(
-                    ZoneInfo("Europe/Oslo")
-                ).strftime("%d.%m kl %H:%M"),
-                "url": add_source_to_url(event.get_absolute_url()),
-                "type": EVENT_TYPE_TRANSLATIONS[event.event_type],
-            }
-        )
-
-    html_body = render_to_string(
-        "email/email/weekly_mail.html",
-        {
-            "week_number": week_number,
-            "events": events,
-            "todays_weekly": (
-                ""
-                if todays_weekly is None
-                else add_source_to_url(todays_weekly.get_absolute_url())
+        return {
+            "title": event.title,
+            "id": event.id,
+            "pools": pools,
+            "start_time": event.start_time.astimezone(ZoneInfo("Europe/Oslo")).strftime(
+                "%d.%m kl %H:%M"
             ),
-            "joblistings": joblistings,
-            "frontend_url": settings.FRONTEND_URL,
-        },
-    )
-    if events or joblistings or todays_weekly:
-        return html_body
-    return None
+            "url": add_source_to_url(event.get_absolute_url()),
+            "type": EVENT_TYPE_TRANSLATIONS[event.event_type],
+        }
 
 
 @celery_app.task(serializer="json", bind=True, base=AbakusTask)
 def send_weekly_email(self, logger_context=None):
     self.setup_logger(logger_context)
 
-    week_number = timezone.now().isocalendar().week
+    start = time.perf_counter()
 
-    # Send to all active students
-    all_users = set(AbakusGroup.objects.get(name="Students").restricted_lookup()[0])
-    recipients = []
+    # Send to all active students that want mail
+    all_users = [
+        user
+        for user in set(AbakusGroup.objects.get(name="Students").restricted_lookup()[0])
+        if user.email_lists_enabled
+    ]
+    channels = NotificationSetting.active_channels_by_user(all_users, WEEKLY_MAIL)
+    recipients = [user for user in all_users if EMAIL in channels[user.pk]]
 
-    for user in all_users:
-        if not user.email_lists_enabled:
-            # Don't send emails to users that don't want mail.
-            continue
+    weekly_mail = WeeklyMail()
+    segments = weekly_mail.segments(recipients)
 
-        if EMAIL not in NotificationSetting.active_channels(user, WEEKLY_MAIL):
+    datatuple = []
+    for event_ids, users in segments.items():
+        html = weekly_mail.render(event_ids)
+        if html is None:
             continue
-        recipients.append(user)
-
-    datatuple = (
-        (
-            f"Ukesmail uke {week_number}",
-            transform(html) if (html := create_weekly_mail(user)) is not None else None,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-        )
-        for user in recipients
+        datatuple += [
+            (
+                f"Ukesmail uke {weekly_mail.week_number}",
+                html,
+                settings.DEFAULT_FROM_EMAIL,
+                [user.email],
+            )
+            for user in users
+        ]
+
+    log.info(
+        "weekly_mail_built",
+        segments=len(segments),
+        recipients=len(datatuple),
+        build_time=time.perf_counter() - start,
     )
-    datatuple = tuple(tuppel for tuppel in datatuple if tuppel[1] is not None)
     if datatuple:
-        MessageProcessor.send_mass_mail_html(datatuple)
+        MessageProcessor.send_mass_mail_html(tuple(datatuple))
@@ -1,10 +1,15 @@
 from datetime import timedelta
 from unittest.mock import patch
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from lego.apps.email.tasks import send_weekly_email
+from premailer import transform
+
+from lego.apps.email.tasks import WeeklyMail, send_weekly_email
 from lego.apps.events.models import Pool
+from lego.apps.events.tests.utils import get_dummy_users
 from lego.apps.joblistings.models import Joblisting
 from lego.apps.notifications.models import NotificationSetting
 from lego.apps.users.models import AbakusGroup, User
@@ -191,3 +196,60 @@ class WeeklyEmailTaskTest(BaseTestCase):
 
         send_weekly_email()
         self.assertFalse(send_mass_mail_mock.called)
+
+
+@patch("lego.apps.restricted.message_processor.MessageProcessor.send_mass_mail_html")
+class WeeklyEmailSegmentTestCase(BaseTestCase):
+    fixtures = [
+        "test_users.yaml",
+        "test_events.yaml",
+        "test_companies.yaml",
+        "test_abakus_groups.yaml",
+    ]
+
+    def setUp(self):
+        pool = Pool.objects.get(pk=1)
+        pool.activation_date = timezone.now() + timedelta(days=1)
+        pool.save()
+        self.users = get_dummy_users(6)
+        students = AbakusGroup.objects.get(name="Students")
+        abakus = AbakusGroup.objects.get(name="Abakus")
+        for user in self.users:
+            students.add_user(user)
+        for user in self.users[:4]:
+            abakus.add_user(user)
+
+    def get_messages(self, send_mail_mock):
+        return {
+            recipients[0]: html
+            for _, html, _, recipients in send_mail_mock.call_args.args[0]
+        }
+
+    def test_mail_is_rendered_once_per_segment(self, send_mail_mock):
+        with patch(
+            "lego.apps.email.tasks.transform", wraps=transform
+        ) as mock_transform:
+            send_weekly_email()
+
+        # Users outside Abakus have an empty mail and receive nothing
+        self.assertEqual(1, mock_transform.call_count)
+        messages = self.get_messages(send_mail_mock)
+        self.assertEqual({user.email for user in self.users[:4]}, set(messages))
+        self.assertEqual(1, len(set(messages.values())))
+        self.assertIn("POOLS_WITH_REGISTRATIONS", messages[self.users[0].email])
+
+    def test_segments_by_visible_events(self, send_mail_mock):
+        segments = WeeklyMail().segments(self.users)
+
+        self.assertEqual(2, len(segments))
+        self.assertEqual(self.users[:4], segments[frozenset([1])])
+        self.assertEqual(self.users[4:], segments[frozenset()])
+
+    def test_query_count_is_independent_of_users(self, send_mail_mock):
+        weekly_mail = WeeklyMail()
+        with CaptureQueriesContext(connection) as few:
+            weekly_mail.segments(self.users[:2])
+        with CaptureQueriesContext(connection) as many:
+            weekly_mail.segments(self.users)
+
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
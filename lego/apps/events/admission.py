@@ -0,0 +1,62 @@
+from django_redis import get_redis_connection
+
+
+class AdmissionQueue:
+    """
+    FIFO of pending registrations for an event, stored in a redis stream.
+
+    Registrations are admitted by one consumer per event at a time, holding the queue lock.
+    The consumer reads entries in arrival order and admits them in batches, so a burst of
+    registrations when an event opens does not turn into workers waiting on each other's
+    row locks.
+    """
+
+    stream_key_format = "event_admission:{event_id}"
+    lock_key_format = "event_admission_lock:{event_id}"
+    batch_size = 50
+    # Seconds before the lock of a consumer that stopped without releasing it expires
+    lock_timeout = 60
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+        self.stream_key = self.stream_key_format.format(event_id=event_id)
+        self.lock_key = self.lock_key_format.format(event_id=event_id)
+
+    @property
+    def redis(self):
+        try:
+            return self._redis
+        except AttributeError:
+            self._redis = get_redis_connection("default")
+            return self._redis
+
+    def __len__(self):
+        return self.redis.xlen(self.stream_key)
+
+    def push(self, *registration_ids):
+        pipe = self.redis.pipeline()
+        for registration_id in registration_ids:
+            pipe.xadd(self.stream_key, {"registration": registration_id})
+        pipe.execute()
+
+    def read(self, count=None):
+        """
+        Return the oldest entries as (entry_id, registration_id) tuples, without removing them.
+        """
+        entries = self.redis.xrange(self.stream_key, count=count or self.batch_size)
+        return [
+            (entry_id, int(fields[b"registration"])) for entry_id, fields in entries
+        ]
+
+    def remove(self, entry_ids):
+        if entry_ids:
+            self.redis.xdel(self.stream_key, *entry_ids)
+
+    def clear(self):
+        self.redis.delete(self.stream_key)
+
+    def lock(self):
+        return self.redis.lock(self.lock_key, timeout=self.lock_timeout)
+
+    def is_locked(self):
+        return bool(self.redis.exists(self.lock_key))
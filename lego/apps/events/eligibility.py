@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable, Optional
+
+from django.db.models import Count, Model
+from django.utils import timezone
+
+from lego.apps.events import constants
+from lego.apps.events.models import Event, Pool, Registration
+from lego.apps.users.models import User
+
+
+def is_prefetched(instance: Model, name: str) -> bool:
+    return name in getattr(instance, "_prefetched_objects_cache", {})
+
+
+class UserEventEligibility:
+    """
+    Possible pools, earliest registration time and admission status of one user for many
+    events. The pools, permission groups and registrations of all events are loaded in a
+    constant number of queries, instead of per event while serializing a list.
+
+    Events are loaded with load(), and must be loaded before they are looked up.
+    """
+
+    _user_group_ids: set[int]
+    _penalties: int
+
+    def __init__(self, user: User) -> None:
+        self.user: User = user
+        self.registrations: dict[int, Optional[Registration]] = {}
+        self.pools: dict[int, list[Pool]] = {}
+        self.pool_group_ids: dict[int, set[int]] = {}
+        self.merged_registration_counts: dict[int, int] = {}
+
+    def __contains__(self, event: Event) -> bool:
+        return event.pk in self.pools
+
+    @property
+    def user_group_ids(self) -> set[int]:
+        try:
+            return self._user_group_ids
+        except AttributeError:
+            self._user_group_ids = {group.pk for group in self.user.all_groups}
+            return self._user_group_ids
+
+    @property
+    def penalties(self) -> int:
+        try:
+            return self._penalties
+        except AttributeError:
+            self._penalties = self.user.number_of_penalties()
+            return self._penalties
+
+    def load(self, events: Iterable[Event]) -> None:
+        events_by_pk: dict[int, Event] = {
+            event.pk: event for event in events if event not in self
+        }
+        if not events_by_pk:
+            return
+
+        for event_id in events_by_pk:
+            self.pools[event_id] = []
+            self.registrations[event_id] = None
+        # The event list views prefetch the pools and the registration of the user
+        pools: Iterable[Pool]
+        if all(is_prefetched(event, "pools") for event in events_by_pk.values()):
+            pools = [
+                pool for event in events_by_pk.values() for pool in event.pools.all()
+            ]
+        else:
+            pools = Pool.objects.filter(event_id__in=events_by_pk)
+        for pool in pools:
+            self.pools[pool.event_id].append(pool)
+            self.pool_group_ids[pool.id] = set()
+        for pool_id, group_id in Pool.objects.filter(
+            event_id__in=events_by_pk, permission_groups__isnull=False
+        ).values_list("id", "permission_groups"):
+            self.pool_group_ids[pool_id].add(group_id)
+
+        registrations: Iterable[Registration]
+        if all(hasattr(event, "user_reg") for event in events_by_pk.values()):
+            registrations = [
+                event.user_reg[0]  # type: ignore[attr-defined]
+                for event in events_by_pk.values()
+                if event.user_reg  # type: ignore[attr-defined]
+            ]
+        else:
+            registrations = Registration.objects.filter(
+                user=self.user, event_id__in=events_by_pk
+            ).exclude(status=constants.SUCCESS_UNREGISTER)
+        for registration in registrations:
+            self.registrations[registration.event_id] = registration
+
+    def is_admitted(self, event: Event) -> bool:
+        registration = self.registrations[event.pk]
+        return registration is not None and registration.pool_id is not None
+
+    def possible_pools(self, event: Event, future: bool = False) -> list[Pool]:
+        """
+        Event.get_possible_pools for the loaded event.
+        """
+        if self.is_admitted(event):
+            return []
+        return [
+            pool
+            for pool in self.pools[event.pk]
+            if not self.pool_group_ids[pool.id].isdisjoint(self.user_group_ids)
+            and (future or pool.activation_date <= timezone.now())
+        ]
+
+    def activation_time(self, event: Event) -> Optional[date]:
+        """
+        Event.get_earliest_registration_time for the loaded event.
+        """
+        pools = self.possible_pools(event, future=True)
+        if not pools:
+            return None
+        return event.get_earliest_registration_time(
+            self.user, pools, self.penalties if event.heed_penalties else 0
+        )
+
+    def spots_left(self, event: Event) -> Optional[int]:
+        """
+        Event.spots_left_for_user for the loaded event.
+        """
+        pools = self.possible_pools(event)
+        if not pools:
+            return None
+
+        if event.is_merged:
+            # Pool counters are not maintained after merge_time
+            if event.pk not in self.merged_registration_counts:
+                self._count_merged_registrations()
+            capacity = sum(pool.capacity for pool in self.pools[event.pk])
+            return capacity - self.merged_registration_counts[event.pk]
+
+        return sum(pool.spots_left() for pool in pools)
+
+    def _count_merged_registrations(self) -> None:
+        event_ids = [
+            event_id
+            for event_id in self.pools
+            if event_id not in self.merged_registration_counts
+        ]
+        self.merged_registration_counts.update(dict.fromkeys(event_ids, 0))
+        self.merged_registration_counts.update(
+            Registration.objects.filter(pool__event_id__in=event_ids)
+            .order_by()
+            .values("pool__event_id")
+            .annotate(count=Count("id"))
+            .values_list("pool__event_id", "count")
+        )
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
 
+from lego.apps.events.eligibility import UserEventEligibility
 from lego.apps.events.models import Event, Registration
 from lego.apps.permissions.constants import EDIT
 from lego.apps.users.serializers.photo_consents import PhotoConsentSerializer
@@ -68,15 +69,41 @@ class PersonalPaymentStatusField(serializers.Field):
         return None
 
 
+def get_eligibility(field, event):
+    """
+    The eligibility of the requesting user, shared by all event fields of a serializer. The
+    first lookup loads every event in the list being serialized.
+    """
+    request = field.context.get("request", None)
+    if not request or not request.user.is_authenticated:
+        return None
+
+    eligibility = field.context.get("event_eligibility")
+    if eligibility is None:
+        eligibility = field.context["event_eligibility"] = UserEventEligibility(
+            request.user
+        )
+    if event not in eligibility:
+        events = [event]
+        if isinstance(field.root, serializers.ListSerializer):
+            events += [
+                instance
+                for instance in field.root.instance
+                if isinstance(instance, Event)
+            ]
+        eligibility.load(events)
+    return eligibility
+
+
 class IsAdmittedField(serializers.Field):
     def get_attribute(self, instance):
         return instance
 
     def to_representation(self, value):
-        request = self.context.get("request", None)
-        if not request or not request.user.is_authenticated:
+        eligibility = get_eligibility(self, value)
+        if eligibility is None:
             return False
-        return value.is_admitted(request.user)
+        return eligibility.is_admitted(value)
 
 
 class FollowingField(serializers.Field):
@@ -95,17 +122,9 @@ class ActivationTimeField(serializers.Field):
         return instance
 
     def to_representation(self, value):
-        request = self.context.get("request", None)
-        if not request or not request.user.is_authenticated:
-            return
-
-        kwargs = {}
-        cached_penalties = self.context.get("cached_penalties", None)
-        if hasattr(value, "possible_pools") and hasattr(value, "user_reg"):
-            kwargs["pools"] = [] if value.user_reg else value.possible_pools
-        if cached_penalties is not None:
-            kwargs["penalties"] = cached_penalties
-        return value.get_earliest_registration_time(request.user, **kwargs)
+        eligibility = get_eligibility(self, value)
+        if eligibility is not None:
+            return eligibility.activation_time(value)
 
 
 class SpotsLeftField(serializers.Field):
@@ -113,9 +132,9 @@ class SpotsLeftField(serializers.Field):
         return instance
 
     def to_representation(self, value):
-        request = self.context.get("request", None)
-        if request and request.user.is_authenticated:
-            return value.spots_left_for_user(request.user)
+        eligibility = get_eligibility(self, value)
+        if eligibility is not None:
+            return eligibility.spots_left(value)
 
 
 class SetPaymentStatusField(serializers.ChoiceField):
@@ -6,7 +6,15 @@ from typing import Any, Optional
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
-from django.db.models import CharField, Count, ManyToManyField, QuerySet, Sum
+from django.db.models import (
+    CharField,
+    Count,
+    F,
+    ManyToManyField,
+    QuerySet,
+    Sum,
+    prefetch_related_objects,
+)
 from django.utils import timezone
 
 from lego.apps.action_handlers.events import handle_event
@@ -27,6 +35,7 @@ from lego.apps.events.permissions import (
     EventPermissionHandler,
     RegistrationPermissionHandler,
 )
+from lego.apps.events.waiting_list import WaitingList
 from lego.apps.files.models import FileField
 from lego.apps.followers.models import FollowEvent
 from lego.apps.permissions.models import ObjectPermissionsModel
@@ -348,7 +357,7 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             return registration.add_to_waiting_list()
 
         # If the event is merged or has only one pool we can skip a lot of logic
-        if all_pools.count() == 1:
+        if len(all_pools) == 1:
             return registration.add_to_pool(possible_pools[0])
 
         if self.is_merged:
@@ -359,24 +368,35 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
                     return registration.add_direct_to_pool(possible_pools[0])
             return registration.add_to_waiting_list()
 
-        # Calculates which pools that are full or open for registration based on capacity
-        full_pools, open_pools = self.calculate_full_pools(possible_pools)
+        with transaction.atomic():
+            # Lock the possible pools in a fixed order, so the counters used to choose a pool
+            # cannot change before the registration is added to it.
+            locked_pools: list[Pool] = list(
+                Pool.objects.select_for_update()
+                .filter(id__in=[pool.id for pool in possible_pools])
+                .order_by("id")
+            )
 
-        if not open_pools:
-            return registration.add_to_waiting_list()
+            # Calculates which pools that are full or open for registration based on capacity
+            full_pools, open_pools = self.calculate_full_pools(locked_pools)
 
-        if len(open_pools) == 1:
-            return registration.add_to_pool(open_pools[0])
+            if not open_pools:
+                return registration.add_to_waiting_list()
 
-        # Returns a list of the pool(s) with the least amount of potential members
-        exclusive_pools: list[Pool] = self.find_most_exclusive_pools(open_pools)
+            if len(open_pools) == 1:
+                chosen_pool = open_pools[0]
+            else:
+                # Returns a list of the pool(s) with the least amount of potential members
+                exclusive_pools: list[Pool] = self.find_most_exclusive_pools(open_pools)
 
-        if len(exclusive_pools) == 1:
-            chosen_pool = exclusive_pools[0]
-        else:
-            chosen_pool = self.select_highest_capacity(exclusive_pools)
+                if len(exclusive_pools) == 1:
+                    chosen_pool = exclusive_pools[0]
+                else:
+                    chosen_pool = self.select_highest_capacity(exclusive_pools)
 
-        return registration.add_to_pool(chosen_pool)
+            chosen_pool.increment()
+
+        return registration.add_direct_to_pool(chosen_pool)
 
     def unregister(
         self,
@@ -426,7 +446,9 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
                 if follow_event_item:
                     follow_event_item.delete()
 
-    def check_for_bump_or_rebalance(self, open_pool: Pool) -> None:
+    def check_for_bump_or_rebalance(
+        self, open_pool: Pool, waiting_list: Optional[WaitingList] = None
+    ) -> None:
         """
         Checks if there is an available spot in the event.
         If so, and the event is merged, bumps the first person in the waiting list.
@@ -439,26 +461,35 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         corresponding pools by including all pools in the select statement.
 
         :param open_pool: The pool where the unregistration happened.
+        :param waiting_list: The waiting list of the event, loaded if not given.
         """
         if not self.is_full:
+            if waiting_list is None:
+                waiting_list = WaitingList(self)
             if self.is_merged:
-                self.bump()
+                self.bump(waiting_list=waiting_list)
             elif not open_pool.is_full:
-                for registration in self.waiting_registrations:
-                    if open_pool in self.get_possible_pools(registration.user):
-                        return self.bump(to_pool=open_pool)
-                self.try_to_rebalance(open_pool=open_pool)
+                if waiting_list.is_waiting_for(open_pool):
+                    return self.bump(to_pool=open_pool, waiting_list=waiting_list)
+                self.try_to_rebalance(open_pool=open_pool, waiting_list=waiting_list)
 
-    def bump(self, to_pool: Optional[Pool] = None) -> None:
+    def bump(
+        self,
+        to_pool: Optional[Pool] = None,
+        waiting_list: Optional[WaitingList] = None,
+    ) -> None:
         """
         Pops the appropriate registration from the waiting list,
         and moves the registration from the waiting list to `to pool`.
 
         :param to_pool: A pool with a free slot. If the event is merged, this will be null.
+        :param waiting_list: The waiting list of the event, loaded if not given.
         """
-        if self.waiting_registrations.exists():
+        if waiting_list is None:
+            waiting_list = WaitingList(self)
+        if len(waiting_list):
             with transaction.atomic():
-                first_waiting = self.pop_from_waiting_list(to_pool)
+                first_waiting = waiting_list.pop(to_pool)
                 if first_waiting:
                     new_pool: Optional[Pool] = None
                     if to_pool:
@@ -466,7 +497,7 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
                         new_pool.increment()
                     else:
                         for pool in self.pools.select_for_update().all():
-                            if self.can_register(first_waiting.user, pool):
+                            if waiting_list.can_register(first_waiting, pool):
                                 new_pool = pool
                                 new_pool.increment()
                                 break
@@ -474,24 +505,21 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
                     first_waiting.save(update_fields=["pool"])
                     handle_event(first_waiting, "bump")
 
-    def early_bump(self, opening_pool: Pool) -> None:
+    def early_bump(
+        self, opening_pool: Pool, waiting_list: Optional[WaitingList] = None
+    ) -> None:
         """
         Used when bumping users from waiting list to a pool that is about to be activated,
         using an async task. This is done to make sure these existing registrations are given
         the spot ahead of users that register at activation time.
 
         :param opening_pool: The pool about to be activated.
+        :param waiting_list: The waiting list of the event, loaded if not given.
         """
-        for reg in self.waiting_registrations:
-            if opening_pool.is_full:
-                break
-            if self.heed_penalties and reg.user.number_of_penalties() >= 3:
-                continue
-            if self.can_register(reg.user, opening_pool, future=True):
-                reg.pool = opening_pool
-                reg.save()
-                handle_event(reg, "bump")
-        self.check_for_bump_or_rebalance(opening_pool)
+        if waiting_list is None:
+            waiting_list = WaitingList(self)
+        self._bump_to_open_pool(opening_pool, waiting_list)
+        self.check_for_bump_or_rebalance(opening_pool, waiting_list=waiting_list)
 
     def bump_on_pool_creation_or_expansion(self) -> None:
         """
@@ -502,40 +530,67 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         This method does the same as `early_bump`, but only accepts people that can be bumped now,
         not people that can be bumped in the future.
         """
-        open_pools: list[Pool] = [pool for pool in self.pools.all() if not pool.is_full]
+        pools: list[Pool] = list(self.pools.all())
+        open_pools: list[Pool] = [pool for pool in pools if not pool.is_full]
+        waiting_list = WaitingList(self, pools=pools)
         for pool in open_pools:
-            for reg in self.waiting_registrations:
-                if self.is_full or pool.is_full:
-                    break
-                if self.heed_penalties and reg.user.number_of_penalties() >= 3:
-                    continue
-                if self.can_register(reg.user, pool, future=True):
-                    reg.pool = pool
-                    reg.save()
-                    handle_event(reg, "bump")
-            self.check_for_bump_or_rebalance(pool)
-
-    def try_to_rebalance(self, open_pool: Pool) -> None:
+            self._bump_to_open_pool(pool, waiting_list, until_event_is_full=True)
+            self.check_for_bump_or_rebalance(pool, waiting_list=waiting_list)
+
+    def _bump_to_open_pool(
+        self, pool: Pool, waiting_list: WaitingList, until_event_is_full: bool = False
+    ) -> None:
+        """
+        Bumps waiting registrations that can join `pool` in the future, in waiting list
+        order, until the pool is full. Users with three or more penalties are skipped.
+        """
+        for reg in list(waiting_list.registrations):
+            if pool.is_full or (until_event_is_full and self.is_full):
+                break
+            if self.heed_penalties and waiting_list.number_of_penalties(reg) >= 3:
+                continue
+            if waiting_list.can_register(reg, pool, future=True):
+                pool.increment()
+                reg.pool = pool
+                reg.save()
+                waiting_list.remove(reg)
+                handle_event(reg, "bump")
+
+    def try_to_rebalance(
+        self, open_pool: Pool, waiting_list: Optional[WaitingList] = None
+    ) -> None:
         """
         Pull the top waiting registrations for all pools, and try to
         move users in the pools they are waiting for to `open_pool` so
         that someone can be bumped.
 
         :param open_pool: The pool where the unregistration happened.
+        :param waiting_list: The waiting list of the event, loaded if not given.
         """
+        if waiting_list is None:
+            waiting_list = WaitingList(self)
         balanced_pools: list[Pool] = []
         bumped: bool = False
 
-        for waiting_registration in self.waiting_registrations:
-            for full_pool in self.get_possible_pools(waiting_registration.user):
+        for waiting_registration in list(waiting_list.registrations):
+            for full_pool in waiting_list.possible_pools(waiting_registration):
                 if full_pool not in balanced_pools:
                     balanced_pools.append(full_pool)
-                    bumped = self.rebalance_pool(from_pool=full_pool, to_pool=open_pool)
+                    bumped = self.rebalance_pool(
+                        from_pool=full_pool,
+                        to_pool=open_pool,
+                        waiting_list=waiting_list,
+                    )
 
                 if bumped:
                     return
 
-    def rebalance_pool(self, from_pool: Pool, to_pool: Pool) -> bool:
+    def rebalance_pool(
+        self,
+        from_pool: Pool,
+        to_pool: Pool,
+        waiting_list: Optional[WaitingList] = None,
+    ) -> bool:
         """
         Iterates over registrations in a full pool, and checks
         if they can be moved to the open pool. If possible, moves
@@ -543,22 +598,28 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
 
         :param from_pool: A full pool with waiting registrations.
         :param to_pool: A pool with one open slot.
+        :param waiting_list: The waiting list of the event, loaded if not given.
         :return: Boolean, whether or not `bump()` has been called.
         """
-        to_pool_permissions = to_pool.permission_groups.all()
+        if waiting_list is None:
+            waiting_list = WaitingList(self)
+        to_pool_permissions = waiting_list.pool_group_ids.get(to_pool.id, set())
+        registrations = list(self.registrations.filter(pool=from_pool))
+        user_groups = User.objects.all_group_ids_by_user(
+            [registration.user_id for registration in registrations]
+        )
         bumped: bool = False
-        for old_registration in self.registrations.filter(pool=from_pool):
+        for old_registration in registrations:
             if to_pool.is_full:
                 break
-            moveable: bool = False
-            user_groups = old_registration.user.all_groups
-            for group in to_pool_permissions:
-                if group in user_groups:
-                    moveable = True
-            if moveable:
+            if not to_pool_permissions.isdisjoint(
+                user_groups.get(old_registration.user_id, set())
+            ):
+                from_pool.decrement()
+                to_pool.increment()
                 old_registration.pool = to_pool
                 old_registration.save()
-                self.bump(to_pool=from_pool)
+                self.bump(to_pool=from_pool, waiting_list=waiting_list)
                 bumped = True
         return bumped
 
@@ -580,41 +641,21 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         )[0]
 
     def pop_from_waiting_list(
-        self, to_pool: Optional[Pool] = None
+        self,
+        to_pool: Optional[Pool] = None,
+        waiting_list: Optional[WaitingList] = None,
     ) -> Registration | None:
         """
         Pops the first user in the waiting list that can join `to_pool`.
         If `from_pool=None`, pops the first user in the waiting list overall.
 
         :param to_pool: The pool we are bumping to. If post-merge, there is no pool.
+        :param waiting_list: The waiting list of the event, loaded if not given.
         :return: The registration that is first in line for said pool.
         """
-
-        if to_pool:
-            for registration in self.waiting_registrations:
-                if self.heed_penalties:
-                    penalties: int = registration.user.number_of_penalties()
-                    earliest_reg: Optional[date] = self.get_earliest_registration_time(
-                        registration.user, [to_pool], penalties
-                    )
-                    if penalties < 3 and earliest_reg and earliest_reg < timezone.now():
-                        if self.can_register(registration.user, to_pool):
-                            return registration
-                elif self.can_register(registration.user, to_pool):
-                    return registration
-            return None
-
-        if self.heed_penalties:
-            for registration in self.waiting_registrations:
-                penalties = registration.user.number_of_penalties()
-                earliest_reg = self.get_earliest_registration_time(
-                    registration.user, None, penalties
-                )
-                if penalties < 3 and earliest_reg and earliest_reg < timezone.now():
-                    return registration
-            return None
-
-        return self.waiting_registrations.first()
+        if waiting_list is None:
+            waiting_list = WaitingList(self)
+        return waiting_list.pop(to_pool)
 
     @staticmethod
     def has_pool_permission(user: User, pool: Pool) -> bool:
@@ -624,7 +665,9 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
         return False
 
     @staticmethod
-    def calculate_full_pools(pools: QuerySet[Pool]) -> tuple[list[Pool], list[Pool]]:
+    def calculate_full_pools(
+        pools: QuerySet[Pool] | list[Pool],
+    ) -> tuple[list[Pool], list[Pool]]:
         full_pools: list[Pool] = []
         open_pools: list[Pool] = []
         for pool in pools:
@@ -638,9 +681,15 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
     def find_most_exclusive_pools(pools: list[Pool]) -> list[Pool]:
         lowest: float | int = float("inf")
         equal: list[Pool] = []
+        # One lookup of the cached group populations for all pools, instead of counting the
+        # members of every permission group.
+        prefetch_related_objects(pools, "permission_groups")
+        populations: dict[int, int] = AbakusGroup.objects.populations(
+            group.pk for pool in pools for group in pool.permission_groups.all()
+        )
         for pool in pools:
             groups: QuerySet[AbakusGroup] = pool.permission_groups.all()
-            users: int = sum(g.number_of_users for g in groups)
+            users: int = sum(populations[g.pk] for g in groups)
             if users == lowest:
                 equal.append(pool)
             elif users < lowest:
@@ -686,6 +735,7 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
             return None
 
         if self.is_merged:
+            # Pool counters are not maintained after merge_time
             return all_pools.annotate(Count("registrations")).aggregate(
                 spots_left=Sum("capacity") - Sum("registrations__count")
             )["spots_left"]
@@ -701,10 +751,16 @@ class Event(Content, BasisModel, ObjectPermissionsModel):
     def get_is_full(self, queryset: Optional[QuerySet[Pool]] = None) -> bool:
         if queryset is None:
             queryset = self.pools.filter(activation_date__lte=timezone.now())
-        query = queryset.annotate(Count("registrations")).aggregate(
-            active_capacity=Sum("capacity"),
-            registrations_count=Sum("registrations__count"),
-        )
+        if self.is_merged:
+            # Pool counters are not maintained after merge_time
+            query = queryset.annotate(Count("registrations")).aggregate(
+                active_capacity=Sum("capacity"),
+                registrations_count=Sum("registrations__count"),
+            )
+        else:
+            query = queryset.aggregate(
+                active_capacity=Sum("capacity"), registrations_count=Sum("counter")
+            )
         active_capacity: int = query["active_capacity"] or 0
         registrations_count: int = query["registrations_count"] or 0
         if active_capacity == 0:
@@ -812,11 +868,24 @@ class Pool(BasisModel):
     activation_date = models.DateTimeField()
     permission_groups = models.ManyToManyField(AbakusGroup)
 
+    # Number of registrations in the pool. Kept up to date under a row lock until merge_time,
+    # and reset from the registrations when the event is saved.
     counter = models.PositiveSmallIntegerField(default=0)
 
     class Meta:
         ordering = ["id"]
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        # The counter is only written by increment(), decrement() and Event.save(), so saving
+        # an instance loaded before a registration does not overwrite the counter.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.fields
+                if field.concrete and not field.primary_key and field.name != "counter"
+            ]
+        super().save(*args, **kwargs)
+
     def delete(self, *args: Any, **kwargs: Any) -> tuple[int, dict[str, int]]:
         if not self.registrations.exists():
             return super().delete(*args, **kwargs)
@@ -827,10 +896,10 @@ class Pool(BasisModel):
     def is_full(self) -> bool:
         if self.capacity == 0:
             return False
-        return self.registrations.count() >= self.capacity
+        return self.counter >= self.capacity
 
     def spots_left(self) -> int:
-        return self.capacity - self.registrations.count()
+        return self.capacity - self.counter
 
     @property
     def is_activated(self) -> bool:
@@ -841,13 +910,13 @@ class Pool(BasisModel):
         return self.registrations.count()
 
     def increment(self) -> Pool:
+        Pool.objects.filter(pk=self.pk).update(counter=F("counter") + 1)
         self.counter += 1
-        self.save(update_fields=["counter"])
         return self
 
     def decrement(self) -> Pool:
+        Pool.objects.filter(pk=self.pk).update(counter=F("counter") - 1)
         self.counter -= 1
-        self.save(update_fields=["counter"])
         return self
 
     def permission_group_ids(self) -> set[int]:
@@ -21,6 +21,7 @@ from lego.apps.events.fields import (
     SpotsLeftField,
     TotalCapacityField,
     WaitingRegistrationCountField,
+    get_eligibility,
 )
 from lego.apps.events.models import Event, Pool, Registration
 from lego.apps.events.serializers.pools import (
@@ -288,10 +289,11 @@ class EventReadUserDetailedSerializer(EventReadDetailedSerializer):
 
         # If the user is not allowed to register and is not registered,
         # there is no need for consents
+        eligibility = get_eligibility(self, obj)
         if (
-            not obj.is_admitted(request.user)
+            not eligibility.is_admitted(obj)
             and not obj.is_on_waiting_list(request.user)
-            and len(obj.get_possible_pools(request.user, future=True)) == 0
+            and not eligibility.possible_pools(obj, future=True)
         ):
             return []
 
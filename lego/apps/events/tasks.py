@@ -1,17 +1,21 @@
+import time
 import uuid
 from datetime import timedelta
+from functools import partial
 
-from django.db import IntegrityError, transaction
+from django.db import DatabaseError, IntegrityError, transaction
 from django.db.models import Q
 from django.utils import timezone
 
 import stripe
 from celery.canvas import chain
+from celery.utils.time import get_exponential_backoff_interval
 from structlog import get_logger
 
 from lego import celery_app
 from lego.apps.action_handlers.events import handle_event
 from lego.apps.events import constants
+from lego.apps.events.admission import AdmissionQueue
 from lego.apps.events.exceptions import (
     EventHasClosed,
     PoolCounterNotEqualToRegistrationCount,
@@ -23,6 +27,7 @@ from lego.apps.events.serializers.registrations import (
     StripeChargeSerializer,
     StripePaymentIntentSerializer,
 )
+from lego.apps.events.waiting_list import WaitingList
 from lego.apps.events.websockets import (
     notify_event_registration,
     notify_user_payment,
@@ -100,6 +105,113 @@ def admit_registration(registration_id: int) -> Registration:
     return registration
 
 
+def admit_registrations(event_id: int, registration_ids: list[int]) -> list[int]:
+    """
+    Admit a batch of pending registrations for one event in the given order. The locks are
+    taken once and held for the whole batch, and every registration is admitted in a
+    savepoint so an error only affects that registration. Registrations that are no longer
+    pending are skipped, registrations for a closed event are marked as failed. Returns the
+    ids of the registrations that failed with any other error.
+    """
+    admitted: list[Registration] = []
+    failed: list[int] = []
+    with transaction.atomic():
+        # Lock the event before the pools, in the same order as unregister
+        locked_event = Event.objects.select_for_update().get(pk=event_id)
+        registrations = (
+            Registration.objects.select_for_update(of=("self",))
+            .select_related("user")
+            .filter(
+                id__in=registration_ids,
+                event_id=event_id,
+                status=constants.PENDING_REGISTER,
+            )
+            .in_bulk()
+        )
+        for registration_id in dict.fromkeys(registration_ids):
+            registration = registrations.get(registration_id)
+            if registration is None:
+                continue
+            registration.event = locked_event
+            try:
+                with transaction.atomic():
+                    locked_event.register(registration)
+            except EventHasClosed as e:
+                log.warn(
+                    "registration_tried_after_started",
+                    exception=e,
+                    registration_id=registration_id,
+                )
+                # The registration can't be admitted later, so it is not queued again
+                registration.status = constants.FAILURE_REGISTER
+                registration.save(update_fields=["status", "updated_at"])
+                transaction.on_commit(
+                    partial(
+                        notify_user_registration,
+                        constants.SOCKET_REGISTRATION_FAILURE,
+                        registration,
+                        error_message="Registrering er stengt",
+                    )
+                )
+                continue
+            except Exception as e:
+                # Any other error only fails this registration, it is retried by
+                # async_register
+                log.error(
+                    "registration_error",
+                    exception=e,
+                    exc_info=True,
+                    registration_id=registration_id,
+                )
+                failed.append(registration_id)
+                continue
+            admitted.append(registration)
+            transaction.on_commit(
+                partial(
+                    notify_event_registration,
+                    constants.SOCKET_REGISTRATION_SUCCESS,
+                    registration,
+                )
+            )
+    for registration in admitted:
+        if registration.can_pay:
+            chain(
+                async_initiate_payment.s(registration.id),
+                save_and_notify_payment.s(registration.id),
+            ).delay()
+    return failed
+
+
+def fail_pending_registrations(event_id: int, error_message: str) -> None:
+    """
+    Mark every pending registration for an event as failed and notify the users, used when
+    the event is deleted while registrations are queued.
+    """
+    registrations = list(
+        Registration.objects.select_related("user").filter(
+            event_id=event_id, status=constants.PENDING_REGISTER
+        )
+    )
+    Registration.objects.filter(pk__in=[r.pk for r in registrations]).update(
+        status=constants.FAILURE_REGISTER, updated_at=timezone.now()
+    )
+    for registration in registrations:
+        registration.status = constants.FAILURE_REGISTER
+        notify_user_registration(
+            constants.SOCKET_REGISTRATION_FAILURE,
+            registration,
+            error_message=error_message,
+        )
+
+
+def enqueue_registration(registration: Registration) -> None:
+    """
+    Queue a pending registration for admission in arrival order.
+    """
+    AdmissionQueue(registration.event_id).push(registration.id)
+    async_admit_registrations.delay(registration.event_id)
+
+
 def withdraw_registration(registration_id: int) -> Registration:
     """
     The unregistration counterpart to admit_registration.
@@ -149,6 +261,110 @@ def async_register(self, registration_id, logger_context=None):
         raise self.retry(exc=e, max_retries=3) from e
 
 
+@celery_app.task(serializer="json", bind=True, base=AbakusTask, max_retries=5)
+def async_admit_registrations(self, event_id, logger_context=None):
+    """
+    Drain the admission queue of an event. Only the worker holding the queue lock admits
+    registrations, other workers return and leave the queue to it. A database error that
+    fails the whole batch leaves the batch in the queue and retries the task. When the event
+    has been deleted, the pending registrations are failed and the queue is cleared.
+    """
+    self.setup_logger(logger_context)
+
+    queue = AdmissionQueue(event_id)
+    # Registrations queued after the last read, but before the lock was released, are
+    # picked up by checking the queue again after releasing the lock.
+    while len(queue):
+        lock = queue.lock()
+        if not lock.acquire(blocking=False):
+            return
+        try:
+            while entries := queue.read():
+                start = time.perf_counter()
+                registration_ids = [registration_id for _, registration_id in entries]
+                try:
+                    failed = admit_registrations(event_id, registration_ids)
+                except Event.DoesNotExist:
+                    log.warn(
+                        "registration_event_deleted",
+                        event_id=event_id,
+                        queued=len(queue),
+                    )
+                    fail_pending_registrations(
+                        event_id, error_message="Arrangementet er slettet"
+                    )
+                    queue.clear()
+                    break
+                except DatabaseError as e:
+                    log.error(
+                        "registration_batch_error",
+                        exception=e,
+                        event_id=event_id,
+                        batch_size=len(entries),
+                    )
+                    raise self.retry(
+                        exc=e,
+                        countdown=get_exponential_backoff_interval(
+                            factor=5,
+                            retries=self.request.retries,
+                            maximum=60,
+                            full_jitter=True,
+                        ),
+                    ) from e
+                queue.remove([entry_id for entry_id, _ in entries])
+                lock.reacquire()
+                log.info(
+                    "registration_batch_admitted",
+                    event_id=event_id,
+                    batch_size=len(entries),
+                    failed=len(failed),
+                    duration=time.perf_counter() - start,
+                )
+                # Retry failed registrations one by one, with the retry and failure handling
+                # of async_register.
+                for registration_id in failed:
+                    async_register.apply_async(
+                        (registration_id,), countdown=async_register.default_retry_delay
+                    )
+        finally:
+            lock.release()
+
+
+@celery_app.task(serializer="json", bind=True, base=AbakusTask)
+def check_admission_queues(self, logger_context=None):
+    """
+    Restart admission for events with registrations that have been pending for a while,
+    in case a worker stopped while admitting them. Registrations are queued again if the
+    queue of the event is empty, since admitting them twice is a no-op.
+    """
+    self.setup_logger(logger_context)
+
+    pending = (
+        Registration.objects.filter(
+            status=constants.PENDING_REGISTER,
+            updated_at__lte=timezone.now() - timedelta(minutes=5),
+            event__start_time__gte=timezone.now(),
+        )
+        .exclude(event__event_type=constants.INTEREST_EVENT)
+        .order_by("updated_at")
+        .values_list("event_id", "id")
+    )
+    registrations_by_event: dict[int, list[int]] = {}
+    for event_id, registration_id in pending:
+        registrations_by_event.setdefault(event_id, []).append(registration_id)
+
+    for event_id, registration_ids in registrations_by_event.items():
+        queue = AdmissionQueue(event_id)
+        if not len(queue) and not queue.is_locked():
+            queue.push(*registration_ids)
+        log.warn(
+            "admission_queue_restarted",
+            event_id=event_id,
+            pending=len(registration_ids),
+        )
+        async_admit_registrations.delay(event_id)
+
+
 @celery_app.task(serializer="json", bind=True, base=AbakusTask, default_retry_delay=30)
 def async_unregister(self, registration_id, logger_context=None):
     self.setup_logger(logger_context)
@@ -483,12 +699,20 @@ def check_events_for_registrations_with_expired_penalties(self, logger_context=N
         with transaction.atomic():
             locked_event = Event.objects.select_for_update().get(pk=event_id)
             if locked_event.waiting_registrations.exists():
-                locked_pools = locked_event.pools.select_for_update().all()
+                locked_pools = list(locked_event.pools.select_for_update().all())
+                waiting_list = WaitingList(locked_event, pools=locked_pools)
                 for pool in locked_pools:
                     if pool.is_activated and not pool.is_full:
-                        for _ in range(locked_event.waiting_registrations.count()):
-                            locked_event.check_for_bump_or_rebalance(pool)
-                            if pool.is_full:
+                        for _ in range(len(waiting_list)):
+                            state = (len(waiting_list), pool.counter)
+                            locked_event.check_for_bump_or_rebalance(
+                                pool, waiting_list=waiting_list
+                            )
+                            # Nothing changed, so trying again would not bump anyone
+                            if pool.is_full or state == (
+                                len(waiting_list),
+                                pool.counter,
+                            ):
                                 break
 
 
@@ -505,13 +729,14 @@ def bump_waiting_users_to_new_pool(self, logger_context=None):
         with transaction.atomic():
             locked_event = Event.objects.select_for_update().get(pk=event_id)
             if locked_event.waiting_registrations.exists():
-                locked_pools = locked_event.pools.select_for_update().all()
+                locked_pools = list(locked_event.pools.select_for_update().all())
+                waiting_list = WaitingList(locked_event, pools=locked_pools)
                 for pool in locked_pools:
                     if not pool.is_full:
                         act = pool.activation_date
                         now = timezone.now()
                         if not pool.is_activated and act < now + timedelta(minutes=35):
-                            locked_event.early_bump(pool)
+                            locked_event.early_bump(pool, waiting_list=waiting_list)
                             log.info(
                                 "early_bump_executed",
                                 event_id=event_id,
@@ -523,7 +748,7 @@ def bump_waiting_users_to_new_pool(self, logger_context=None):
                                 event_id=event_id,
                                 pool_id=pool.id,
                             )
-                            locked_event.early_bump(pool)
+                            locked_event.early_bump(pool, waiting_list=waiting_list)
 
 
 @celery_app.task(serializer="json", bind=True, base=AbakusTask)
@@ -599,7 +824,8 @@ def notify_event_creator_when_payment_overdue(self, logger_context=None):
 @celery_app.task(serializer="json", bind=True, base=AbakusTask)
 def check_that_pool_counters_match_registration_number(self, logger_context=None):
     """
-    Task that checks whether pools counters are in sync with number of registrations. We do not
+    Task that checks whether pools counters are in sync with number of registrations, and
+    resets counters that are not, since occupancy is read from the counters. We do not
     enforce this check for events that are merged, hence the merge_time filter, because
     incrementing the counter decreases the registration performance
     """
@@ -610,6 +836,7 @@ def check_that_pool_counters_match_registration_number(self, logger_context=None
         Q(merge_time__gte=timezone.now()) | Q(merge_time__isnull=True),
     ).values_list("id", flat=True)
 
+    error = None
     for event_id in events_ids:
         with transaction.atomic():
             locked_event = Event.objects.select_for_update().get(pk=event_id)
@@ -618,6 +845,11 @@ def check_that_pool_counters_match_registration_number(self, logger_context=None
                 registration_count = pool.registrations.count()
                 if pool.counter != registration_count:
                     log.critical("pool_counter_not_equal_registration_count", pool=pool)
-                    raise PoolCounterNotEqualToRegistrationCount(
+                    error = error or PoolCounterNotEqualToRegistrationCount(
                         pool, registration_count, locked_event
                     )
+                    pool.counter = registration_count
+                    pool.save(update_fields=["counter"])
+
+    if error:
+        raise error
@@ -0,0 +1,196 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.utils import timezone
+
+from celery.exceptions import Retry
+
+from lego.apps.events import constants
+from lego.apps.events.admission import AdmissionQueue
+from lego.apps.events.models import Event, Registration
+from lego.apps.events.tasks import (
+    admit_registrations,
+    async_admit_registrations,
+    check_admission_queues,
+    enqueue_registration,
+)
+from lego.apps.events.tests.utils import get_dummy_users
+from lego.apps.users.models import AbakusGroup, User
+from lego.utils.test_utils import BaseTestCase
+
+
+class AdmissionQueueTestCase(BaseTestCase):
+    fixtures = [
+        "test_abakus_groups.yaml",
+        "test_users.yaml",
+        "test_events.yaml",
+        "test_companies.yaml",
+    ]
+
+    def setUp(self):
+        self.event = Event.objects.get(title="POOLS_NO_REGISTRATIONS")
+        self.event.start_time = timezone.now() + timedelta(days=1)
+        self.event.merge_time = timezone.now() + timedelta(hours=12)
+        self.event.save()
+        self.pool = self.event.pools.get(name="Abakusmember")
+        self.pool.activation_date = timezone.now() - timedelta(days=1)
+        self.pool.capacity = 2
+        self.pool.save()
+        self.queue = AdmissionQueue(self.event.id)
+        self.queue.redis.delete(self.queue.stream_key, self.queue.lock_key)
+
+    def tearDown(self):
+        self.queue.redis.delete(self.queue.stream_key, self.queue.lock_key)
+
+    def pending_registrations(self, count, without_pool_access=0):
+        registrations = []
+        for i, user in enumerate(get_dummy_users(count)):
+            if i >= without_pool_access:
+                AbakusGroup.objects.get(name="Abakus").add_user(user)
+            registrations.append(
+                Registration.objects.create(
+                    event=self.event, user=user, status=constants.PENDING_REGISTER
+                )
+            )
+        return registrations
+
+    def test_admits_in_arrival_order(self):
+        registrations = self.pending_registrations(3)
+        for registration in registrations:
+            enqueue_registration(registration)
+
+        for registration in registrations:
+            registration.refresh_from_db()
+        self.assertEqual(
+            [self.pool.id, self.pool.id, None],
+            [registration.pool_id for registration in registrations],
+        )
+        self.assertTrue(
+            all(r.status == constants.SUCCESS_REGISTER for r in registrations)
+        )
+        self.assertEqual(0, len(self.queue))
+
+    def test_skips_registrations_that_are_not_pending(self):
+        registration = self.pending_registrations(1)[0]
+        admit_registrations(self.event.id, [registration.id, registration.id])
+        registration.refresh_from_db()
+        self.assertEqual(self.pool.id, registration.pool_id)
+
+        self.assertEqual([], admit_registrations(self.event.id, [registration.id]))
+        self.pool.refresh_from_db()
+        self.assertEqual(1, self.pool.counter)
+
+    @mock.patch("lego.apps.events.tasks.async_register")
+    def test_failed_registrations_are_retried(self, mock_async_register):
+        failing, registration = self.pending_registrations(2, without_pool_access=1)
+        self.queue.push(failing.id, registration.id)
+
+        async_admit_registrations(self.event.id)
+
+        mock_async_register.apply_async.assert_called_once_with(
+            (failing.id,), countdown=mock_async_register.default_retry_delay
+        )
+        registration.refresh_from_db()
+        self.assertEqual(constants.SUCCESS_REGISTER, registration.status)
+        self.assertEqual(0, len(self.queue))
+
+    def test_only_lock_holder_admits(self):
+        registration = self.pending_registrations(1)[0]
+        lock = self.queue.lock()
+        lock.acquire()
+        try:
+            enqueue_registration(registration)
+        finally:
+            lock.release()
+
+        registration.refresh_from_db()
+        self.assertEqual(constants.PENDING_REGISTER, registration.status)
+        self.assertEqual(1, len(self.queue))
+
+    def test_check_admission_queues_requeues_stale_registrations(self):
+        registration = self.pending_registrations(1)[0]
+        Registration.objects.filter(id=registration.id).update(
+            updated_at=timezone.now() - timedelta(minutes=10)
+        )
+
+        check_admission_queues()
+
+        registration.refresh_from_db()
+        self.assertEqual(constants.SUCCESS_REGISTER, registration.status)
+        self.assertEqual(0, len(self.queue))
+
+    @mock.patch("lego.apps.events.tasks.async_register")
+    def test_unexpected_error_only_fails_the_registration(self, mock_async_register):
+        failing, registration = self.pending_registrations(2)
+        register = Event.register
+
+        def fail_first(event, registration):
+            if registration.id == failing.id:
+                raise OperationalError("lock timeout")
+            return register(event, registration)
+
+        self.queue.push(failing.id, registration.id)
+        with mock.patch.object(Event, "register", fail_first):
+            async_admit_registrations(self.event.id)
+
+        mock_async_register.apply_async.assert_called_once_with(
+            (failing.id,), countdown=mock_async_register.default_retry_delay
+        )
+        registration.refresh_from_db()
+        self.assertEqual(constants.SUCCESS_REGISTER, registration.status)
+        self.assertEqual(0, len(self.queue))
+
+    def test_closed_event_fails_registrations(self):
+        registration = self.pending_registrations(1)[0]
+        self.event.start_time = timezone.now() + timedelta(hours=1)
+        self.event.save()
+
+        self.assertEqual([], admit_registrations(self.event.id, [registration.id]))
+
+        registration.refresh_from_db()
+        self.assertEqual(constants.FAILURE_REGISTER, registration.status)
+
+    def test_deleted_event_fails_registrations(self):
+        registrations = self.pending_registrations(2)
+        self.queue.push(*[registration.id for registration in registrations])
+        Event.objects.filter(pk=self.event.pk).update(deleted=True)
+
+        async_admit_registrations(self.event.id)
+
+        for registration in registrations:
+            registration.refresh_from_db()
+            self.assertEqual(constants.FAILURE_REGISTER, registration.status)
+        self.assertEqual(0, len(self.queue))
+        self.assertFalse(self.queue.is_locked())
+
+        # Registrations queued later are failed the same way
+        registration = Registration.objects.create(
+            event=self.event,
+            user=User.objects.get(username="test1"),
+            status=constants.PENDING_REGISTER,
+        )
+        enqueue_registration(registration)
+        registration.refresh_from_db()
+        self.assertEqual(constants.FAILURE_REGISTER, registration.status)
+        self.assertEqual(0, len(self.queue))
+
+    def test_database_error_retries_the_batch(self):
+        registration = self.pending_registrations(1)[0]
+        self.queue.push(registration.id)
+
+        with (
+            mock.patch(
+                "lego.apps.events.tasks.admit_registrations",
+                side_effect=OperationalError("connection lost"),
+            ),
+            mock.patch.object(
+                async_admit_registrations, "retry", side_effect=Retry
+            ) as retry,
+            self.assertRaises(Retry),
+        ):
+            async_admit_registrations(self.event.id)
+
+        retry.assert_called_once()
+        self.assertEqual(1, len(self.queue))
+        self.assertFalse(self.queue.is_locked())
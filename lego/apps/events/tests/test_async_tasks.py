@@ -310,6 +310,9 @@ class PoolActivationTestCase(BaseAPITestCase):
         with self.assertRaises(PoolCounterNotEqualToRegistrationCount):
             check_that_pool_counters_match_registration_number()
 
+        self.pool_one.refresh_from_db()
+        self.assertEqual(self.pool_one.registrations.count(), self.pool_one.counter)
+
     def test_ensure_pool_counters_match_registration_number(self):
         """Test that method does not raise error when counter is ok"""
 
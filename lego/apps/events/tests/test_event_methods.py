@@ -108,6 +108,8 @@ class EventMethodTest(BaseTestCase):
         for user in users[:3]:
             registration = Registration.objects.get_or_create(event=event, user=user)[0]
             event.register(registration)
+        abakus_pool.refresh_from_db()
+        webkom_pool.refresh_from_db()
         full_pools, open_pools = event.calculate_full_pools([abakus_pool, webkom_pool])
         self.assertEqual(len(full_pools), 1)
         self.assertEqual(len(open_pools), 1)
@@ -115,10 +117,28 @@ class EventMethodTest(BaseTestCase):
         for user in users[3:]:
             registration = Registration.objects.get_or_create(event=event, user=user)[0]
             event.register(registration)
+        abakus_pool.refresh_from_db()
+        webkom_pool.refresh_from_db()
         full_pools, open_pools = event.calculate_full_pools([abakus_pool, webkom_pool])
         self.assertEqual(len(full_pools), 2)
         self.assertEqual(len(open_pools), 0)
 
+    def test_saving_stale_pool_keeps_counter(self):
+        """Test that saving a pool loaded before a registration does not reset the counter"""
+        event = Event.objects.get(title="POOLS_NO_REGISTRATIONS")
+        pool = event.pools.get(name="Abakusmember")
+        user = get_dummy_users(1)[0]
+        AbakusGroup.objects.get(name="Abakus").add_user(user)
+        registration = Registration.objects.get_or_create(event=event, user=user)[0]
+        event.register(registration)
+
+        pool.capacity += 1
+        pool.save()
+
+        pool.refresh_from_db()
+        self.assertEqual(1, pool.counter)
+        self.assertEqual(pool.registrations.count(), pool.counter)
+
     def test_doesnt_have_pool_permission(self):
         """Test method checking that user does not have the appropriate permission groups"""
         event = Event.objects.get(title="POOLS_NO_REGISTRATIONS")
@@ -167,6 +187,18 @@ class EventMethodTest(BaseTestCase):
             len(event.find_most_exclusive_pools([webkom_pool, abakus_pool])), 1
         )
 
+    def test_find_most_exclusive_pool_query_count(self):
+        """Test that the member counts of all permission groups are looked up at once"""
+        event = Event.objects.get(title="POOLS_NO_REGISTRATIONS")
+        webkom_pool = event.pools.get(name="Webkom")
+        abakus_pool = event.pools.get(name="Abakusmember")
+        webkom_pool.permission_groups.add(
+            *AbakusGroup.objects.filter(name__in=["Abakom", "Users"])
+        )
+
+        with self.assertNumQueries(2):
+            event.find_most_exclusive_pools([webkom_pool, abakus_pool])
+
     def test_find_most_exclusive_when_equal(self):
         """Test method calculating the most exclusive pool when they are equally exclusive"""
         event = Event.objects.get(title="POOLS_NO_REGISTRATIONS")
@@ -3,7 +3,8 @@ from datetime import timedelta
 from unittest import mock, skipIf
 
 from django.conf import settings
-from django.db import IntegrityError, OperationalError
+from django.db import IntegrityError, OperationalError, connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
@@ -302,6 +303,38 @@ class ListEventsTestCase(BaseAPITestCase):
         self.assertEqual(event_response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(event_response.json()["results"]), 13)
 
+    def test_query_count_is_independent_of_events(self):
+        AbakusGroup.objects.get(name="Webkom").add_user(self.abakus_user)
+        self.client.force_authenticate(self.abakus_user)
+        Event.objects.update(heed_penalties=True)
+        url = f"{_get_list_url()}?date_after={(timezone.now() + timedelta(days=5)).date()}"
+
+        with CaptureQueriesContext(connection) as many:
+            event_response = self.client.get(url)
+        self.assertEqual(len(event_response.json()["results"]), 13)
+
+        Event.objects.filter(
+            pk__in=Event.objects.order_by("pk").values("pk")[:10]
+        ).update(start_time=timezone.now() + timedelta(days=1))
+        with CaptureQueriesContext(connection) as few:
+            event_response = self.client.get(url)
+        self.assertEqual(len(event_response.json()["results"]), 3)
+
+        # Pools, penalties and registrations are loaded once for the whole page
+        def eligibility_queries(context):
+            tables = (
+                'FROM "events_pool"',
+                'FROM "users_penalty"',
+                "events_registration",
+            )
+            return [
+                query
+                for query in context.captured_queries
+                if any(table in query["sql"] for table in tables)
+            ]
+
+        self.assertEqual(len(eligibility_queries(many)), len(eligibility_queries(few)))
+
 
 class RetrieveEventsTestCase(BaseAPITestCase):
     fixtures = [
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from lego.apps.events.models import Event, Registration
+from lego.apps.events.tasks import check_events_for_registrations_with_expired_penalties
+from lego.apps.events.waiting_list import WaitingList
+from lego.apps.users.models import AbakusGroup, Penalty
+from lego.utils.test_utils import BaseTestCase
+
+from .utils import get_dummy_users, make_penalty_expire
+
+
+class WaitingListTestCase(BaseTestCase):
+    fixtures = [
+        "test_abakus_groups.yaml",
+        "test_users.yaml",
+        "test_companies.yaml",
+        "test_events.yaml",
+    ]
+
+    def setUp(self):
+        Event.objects.all().update(start_time=timezone.now() + timedelta(hours=3))
+        self.event = Event.objects.get(title="POOLS_NO_REGISTRATIONS")
+        self.event.pools.update(activation_date=timezone.now() - timedelta(hours=12))
+        self.abakus_pool = self.event.pools.get(name="Abakusmember")
+        self.webkom_pool = self.event.pools.get(name="Webkom")
+        self.users = get_dummy_users(13)
+        for user in self.users:
+            AbakusGroup.objects.get(name="Abakus").add_user(user)
+
+    def register(self, users):
+        for user in users:
+            registration = Registration.objects.get_or_create(
+                event=self.event, user=user
+            )[0]
+            self.event.register(registration)
+
+    def count_pop_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            registration = self.event.pop_from_waiting_list(self.abakus_pool)
+        self.assertIsNone(registration)
+        return len(context.captured_queries)
+
+    def test_query_count_is_independent_of_waiting_list(self):
+        """Popping from the waiting list uses the same queries for any number of users"""
+        self.register(self.users)
+        waiting = [
+            registration.user for registration in self.event.waiting_registrations
+        ]
+        for user in waiting:
+            Penalty.objects.create(
+                user=user, reason="test", weight=3, source_event=self.event
+            )
+
+        Registration.objects.filter(user__in=waiting[3:]).update(pool=self.webkom_pool)
+        small = self.count_pop_queries()
+        Registration.objects.filter(user__in=waiting[3:]).update(pool=None)
+        large = self.count_pop_queries()
+
+        self.assertEqual(small, large)
+
+    def test_pop_skips_users_with_penalties(self):
+        self.register(self.users[:5])
+        first, second = self.event.waiting_registrations
+        Penalty.objects.create(
+            user=first.user, reason="test", weight=3, source_event=self.event
+        )
+
+        waiting_list = WaitingList(self.event)
+
+        self.assertEqual(second, waiting_list.pop(self.abakus_pool))
+        self.assertIsNone(waiting_list.pop(self.abakus_pool))
+        self.assertIsNone(waiting_list.pop(self.webkom_pool))
+        self.assertEqual(1, len(waiting_list))
+
+    def test_expired_penalties_task_bumps_all_open_spots(self):
+        self.register(self.users[:7])
+        waiting = [
+            registration.user for registration in self.event.waiting_registrations
+        ]
+        penalties = [
+            Penalty.objects.create(
+                user=user, reason="test", weight=3, source_event=self.event
+            )
+            for user in waiting
+        ]
+        self.abakus_pool.capacity = 5
+        self.abakus_pool.save()
+        self.event.bump_on_pool_creation_or_expansion()
+        self.assertEqual(4, self.event.waiting_registrations.count())
+
+        for penalty in penalties[:3]:
+            make_penalty_expire(penalty)
+        check_events_for_registrations_with_expired_penalties.delay()
+
+        self.abakus_pool.refresh_from_db()
+        self.assertEqual(5, self.abakus_pool.counter)
+        self.assertEqual(
+            set(waiting[2:]),
+            {registration.user for registration in self.event.waiting_registrations},
+        )
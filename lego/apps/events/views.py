@@ -65,6 +65,7 @@ from lego.apps.events.tasks import (
     async_retrieve_payment,
     async_unregister,
     check_for_bump_on_pool_creation_or_expansion,
+    enqueue_registration,
     save_and_notify_payment,
     withdraw_registration,
 )
@@ -125,13 +126,6 @@ class EventViewSet(AllowedPermissionsMixin, viewsets.ModelViewSet):
             )
             if user.is_authenticated:
                 queryset = queryset.prefetch_related(
-                    Prefetch(
-                        "pools",
-                        queryset=Pool.objects.filter(
-                            permission_groups__in=self.request.user.all_groups
-                        ).distinct(),
-                        to_attr="possible_pools",
-                    ),
                     Prefetch(
                         "registrations",
                         queryset=Registration.objects.filter(user=user)
@@ -441,7 +435,7 @@ class RegistrationViewSet(
             registration.feedback = feedback
             registration.save(current_user=current_user)
             if not is_interest_event:
-                transaction.on_commit(lambda: async_register.delay(registration.id))
+                transaction.on_commit(lambda: enqueue_registration(registration))
 
         response_status: int = status.HTTP_202_ACCEPTED
         if is_interest_event:
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from django.utils import timezone
+
+from lego.apps.users.models import Penalty, User
+
+if TYPE_CHECKING:
+    from lego.apps.events.models import Event, Pool, Registration
+
+
+class WaitingList:
+    """
+    The waiting list of an event, with the penalties and groups of the waiting users and the
+    permission groups of the pools loaded in bulk. Bumps are found in memory, instead of with
+    queries per waiting registration while the event is locked.
+
+    Registrations are removed from the list when they are bumped, so one instance can be
+    shared by all bumps done in a transaction.
+    """
+
+    def __init__(self, event: Event, pools: Optional[Iterable[Pool]] = None) -> None:
+        self.event: Event = event
+        self.registrations: list[Registration] = list(
+            event.waiting_registrations.select_related("user")
+        )
+        self.pools: list[Pool] = (
+            list(event.pools.all()) if pools is None else list(pools)
+        )
+
+        user_ids: list[int] = [
+            registration.user_id for registration in self.registrations
+        ]
+        self.group_ids: dict[int, set[int]] = User.objects.all_group_ids_by_user(
+            user_ids
+        )
+        self.penalties: dict[int, int] = (
+            Penalty.objects.weights_by_user(user_ids) if event.heed_penalties else {}
+        )
+        self.pool_group_ids: dict[int, set[int]] = {
+            pool.id: set() for pool in self.pools
+        }
+        for pool_id, group_id in event.pools.values_list("id", "permission_groups"):
+            if group_id is not None:
+                self.pool_group_ids.setdefault(pool_id, set()).add(group_id)
+
+    def __len__(self) -> int:
+        return len(self.registrations)
+
+    def remove(self, registration: Registration) -> None:
+        self.registrations.remove(registration)
+
+    def number_of_penalties(self, registration: Registration) -> int:
+        return self.penalties.get(registration.user_id, 0)
+
+    def can_register(
+        self, registration: Registration, pool: Pool, future: bool = False
+    ) -> bool:
+        """
+        Event.can_register for a waiting registration, which is never admitted.
+        """
+        if not pool.is_activated and not future:
+            return False
+        return not self.pool_group_ids.get(pool.id, set()).isdisjoint(
+            self.group_ids.get(registration.user_id, set())
+        )
+
+    def possible_pools(
+        self, registration: Registration, future: bool = False
+    ) -> list[Pool]:
+        return [
+            pool
+            for pool in self.pools
+            if self.can_register(registration, pool, future=future)
+        ]
+
+    def is_waiting_for(self, pool: Pool) -> bool:
+        return any(
+            self.can_register(registration, pool) for registration in self.registrations
+        )
+
+    def can_be_bumped(
+        self, registration: Registration, to_pool: Optional[Pool] = None
+    ) -> bool:
+        """
+        Whether the registration is first in line for to_pool when it is ahead of the other
+        registrations, or for any pool when the event is merged and there is no to_pool.
+        """
+        if not self.event.heed_penalties:
+            return to_pool is None or self.can_register(registration, to_pool)
+
+        penalties = self.number_of_penalties(registration)
+        pools = [to_pool] if to_pool else self.possible_pools(registration, future=True)
+        earliest_reg = self.event.get_earliest_registration_time(
+            registration.user, pools, penalties
+        )
+        if penalties >= 3 or not earliest_reg or earliest_reg >= timezone.now():
+            return False
+        return to_pool is None or self.can_register(registration, to_pool)
+
+    def pop(self, to_pool: Optional[Pool] = None) -> Optional[Registration]:
+        """
+        Remove and return the first registration that can be bumped to to_pool, or to any
+        pool when to_pool is None.
+        """
+        for registration in self.registrations:
+            if self.can_be_bumped(registration, to_pool):
+                self.remove(registration)
+                return registration
+        return None
@@ -1,19 +1,28 @@
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from lego.apps.feeds.serializers.feeds import FeedActivitySerializer
 
 from . import verbs
 
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
 
-class Activity:
-    object_id = None
-    object_content_type = None
-
-    actor_id = None
-    actor_content_type = None
 
-    target_id = None
-    target_content_type = None
+class Activity:
+    __slots__ = (
+        "verb",
+        "time",
+        "extra_context",
+        "actor_id",
+        "actor_content_type",
+        "object_id",
+        "object_content_type",
+        "target_id",
+        "target_content_type",
+    )
 
     def __init__(self, actor, verb, object, target=None, time=None, extra_context=None):
         if isinstance(verb, int):
@@ -125,3 +134,76 @@ class Activity:
             time=serializer.validated_data["time"],
             extra_context=serializer.validated_data["extra_context"],
         )
+
+    def encode(self):
+        """
+        Compact representation used when the activity is stored in a feed or passed to a
+        task. Use serialize() for data leaving the system.
+
+        [verb_id, time (epoch microseconds), actor_content_type, actor_id,
+         object_content_type, object_id, target_content_type, target_id, extra_context]
+        """
+        time = self.time - EPOCH
+        return [
+            self.verb.id,
+            (time.days * 86400 + time.seconds) * 10**6 + time.microseconds,
+            self.actor_content_type,
+            self.actor_id,
+            self.object_content_type,
+            self.object_id,
+            self.target_content_type,
+            self.target_id,
+            self.extra_context,
+        ]
+
+    @classmethod
+    def decode(cls, data):
+        """
+        Decode an activity created by encode() or serialize() without running the DRF
+        validation. Only use this on data we have written ourselves.
+        """
+        if isinstance(data, dict):
+            return cls(
+                actor=data.get("actor"),
+                verb=data["verb"],
+                object=data["object"],
+                target=data.get("target"),
+                time=parse_datetime(data["time"]),
+                extra_context=data.get("extra_context"),
+            )
+
+        activity = cls.__new__(cls)
+        (
+            verb_id,
+            time,
+            activity.actor_content_type,
+            activity.actor_id,
+            activity.object_content_type,
+            activity.object_id,
+            activity.target_content_type,
+            activity.target_id,
+            activity.extra_context,
+        ) = data
+        activity.verb = verbs.verbs[verb_id]
+        activity.time = EPOCH + timedelta(microseconds=time)
+        return activity
+
+
+class ActivityList(Sequence):
+    """
+    Read-only view of an activity store, activities are decoded one at a time when they are
+    accessed.
+    """
+
+    __slots__ = ("store",)
+
+    def __init__(self, store):
+        self.store = store or []
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Activity.decode(activity) for activity in self.store[index]]
+        return Activity.decode(self.store[index])
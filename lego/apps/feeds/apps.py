@@ -1,4 +1,5 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete, post_save
 
 
 class FeedsConfig(AppConfig):
@@ -9,4 +10,11 @@ class FeedsConfig(AppConfig):
         super().ready()
         """
         """
+        from .attr_cache import AttrCache
+        from .signals import attr_cache_invalidation_callback
         from .verbs import verbs  # noqa
+
+        for content_type in {*AttrCache.RENDERS, *AttrCache.RELATED_RENDERS}:
+            model = apps.get_model(content_type)
+            post_save.connect(attr_cache_invalidation_callback, sender=model)
+            post_delete.connect(attr_cache_invalidation_callback, sender=model)
@@ -1,8 +1,20 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.apps import apps
 from django.core.cache import cache
+from django.db import transaction
 
+from django_redis import get_redis_connection
 from structlog import get_logger
 
-from lego.utils.content_types import string_to_model_cls
+from lego.utils.cache import LocalCache
+from lego.utils.content_types import (
+    instance_to_content_type_string,
+    instance_to_string,
+    strings_to_instances,
+)
 
 from . import attr_renderers
 
@@ -12,13 +24,31 @@ log = get_logger()
 class AttrCache:
     """
     The feed contains a lot of content strings, it's heavy to lookup all these values
-    on each request. The AttrCache stores the lookups for an small amount of time to reduce the
-    load on the database.
+    on each request. The AttrCache stores the lookups in two tiers, a small in-process LRU in
+    front of redis.
 
-    We don't do any invalidation, the cached values is only stored for a small amount of time.
+    Redis entries are invalidated when the rendered instances are saved or deleted, see
+    invalidate_instance. The in-process tier of other processes is not reached by the
+    invalidation, so it uses a short timeout.
     """
 
     CACHE_KEY = "feed_attr_cache_"
+    CACHE_TIMEOUT = 60 * 60
+    # Redis hash with the local_hits, redis_hits and misses of all processes
+    STATS_KEY = "feed_attr_cache_stats"
+    STATS_FIELDS = ("local_hits", "redis_hits", "misses")
+    # The counters are kept per process and added to the hash every STATS_FLUSH_LOOKUPS
+    # lookups or STATS_FLUSH_INTERVAL seconds, so lookups answered by the in-process tier
+    # don't call redis.
+    STATS_FLUSH_LOOKUPS = 100
+    STATS_FLUSH_INTERVAL = 10
+
+    stats_lock = threading.Lock()
+    pending_stats: Counter[str] = Counter()
+    pending_lookups = 0
+    stats_flushed_at = time.monotonic()
+
+    local_cache = LocalCache(max_size=10000, timeout=30)
 
     RENDERS = {
         "users.user": attr_renderers.render_user,
@@ -32,81 +62,184 @@ class AttrCache:
         "restricted.restrictedmail": attr_renderers.render_restricted_mail,
     }
 
+    # Renders that handle all instances of a type at once, used instead of RENDERS when
+    # present. The thumbor urls of the instances are signed in one batch.
+    BULK_RENDERS = {
+        "users.user": attr_renderers.render_users,
+        "users.abakusgroup": attr_renderers.render_abakus_groups,
+    }
+
     RELATED_FIELDS = {"meetings.meetinginvitation": ["meeting"]}
 
+    # Renders that include fields from related models, keyed by the related model:
+    # {related content_type: [(rendered content_type, field pointing to the related model)]}
+    RELATED_RENDERS = {
+        "meetings.meeting": [("meetings.meetinginvitation", "meeting")],
+        "gallery.gallery": [("gallery.gallerypicture", "gallery")],
+        "users.abakusgroup": [("notifications.announcement", "from_group")],
+    }
+
     def lookup_cache(self, content_strings):
         """
-        Lookup cache keys
+        Lookup cache keys, the in-process cache is checked before redis.
         """
-        cache_result = cache.get_many(
-            [self.CACHE_KEY + content_string for content_string in content_strings]
+        values = self.local_cache.get_many(content_strings)
+
+        missing = [
+            content_string
+            for content_string in content_strings
+            if content_string not in values
+        ]
+        cache_result = (
+            cache.get_many(
+                [self.CACHE_KEY + content_string for content_string in missing]
+            )
+            if missing
+            else {}
         )
 
         # Remove the cache_key prefix
-        values = {}
+        redis_values = {}
         for key, value in cache_result.items():
-            values[key[len(self.CACHE_KEY) :]] = value
+            redis_values[key[len(self.CACHE_KEY) :]] = value
+        self.local_cache.set_many(redis_values)
 
+        self.record_stats(
+            local_hits=len(values),
+            redis_hits=len(redis_values),
+            misses=len(missing) - len(redis_values),
+        )
+
+        values.update(redis_values)
         return values
 
     def save_lookups(self, items):
         """
-        Cache the items we looked up for a small amount of time.
+        Cache the items we looked up in both tiers.
         """
+        if not items:
+            return
         cache.set_many(
             {f"{self.CACHE_KEY}{key}": value for key, value in items.items()},
-            timeout=60,
+            timeout=self.CACHE_TIMEOUT,
         )
+        self.local_cache.set_many(items)
 
-    def extract_properties(self, content_type, ids):
+    @classmethod
+    def record_stats(cls, **counts):
         """
-        Lookup the values we need from the database.
-        Customize the renderers dict to change the values added to the feed.
+        Add the counts of a lookup to the counters of the process, and flush them to redis
+        when enough lookups or time has passed since the last flush.
         """
-        model = string_to_model_cls(content_type)
+        log.debug("feed_attr_cache_lookup", **counts)
+        with cls.stats_lock:
+            cls.pending_stats.update(counts)
+            cls.pending_lookups += 1
+            flush = (
+                cls.pending_lookups >= cls.STATS_FLUSH_LOOKUPS
+                or time.monotonic() - cls.stats_flushed_at >= cls.STATS_FLUSH_INTERVAL
+            )
+        if flush:
+            cls.flush_stats()
 
-        render = self.RENDERS.get(content_type)
-        if not render:
-            log.warn("feed_missing_context_render", context=content_type)
-            return []
+    @classmethod
+    def flush_stats(cls):
+        with cls.stats_lock:
+            counts = +cls.pending_stats
+            cls.pending_stats = Counter()
+            cls.pending_lookups = 0
+            cls.stats_flushed_at = time.monotonic()
+        if not counts:
+            return
+        pipe = get_redis_connection("default").pipeline()
+        for field, count in counts.items():
+            pipe.hincrby(cls.STATS_KEY, field, count)
+        pipe.execute()
 
-        # We need to use getattr on objects because we need to support custom object properties.
-        # .values() would have been much better if this wasn't a requirement...
-        related_fields = self.RELATED_FIELDS.get(content_type, [])
-        queryset = model.objects.filter(pk__in=list(ids)).select_related(
-            *related_fields
+    @classmethod
+    def get_stats(cls):
+        """
+        The counters of all processes since the last reset, with the share of lookups
+        answered by either cache tier. The counters of this process are flushed first,
+        other processes add theirs within STATS_FLUSH_INTERVAL seconds.
+        """
+        cls.flush_stats()
+        values = get_redis_connection("default").hgetall(cls.STATS_KEY)
+        stats = {
+            field: int(values.get(field.encode(), 0)) for field in cls.STATS_FIELDS
+        }
+        total = sum(stats.values())
+        stats["hit_rate"] = (
+            (stats["local_hits"] + stats["redis_hits"]) / total if total else None
         )
-        result = {}
+        return stats
 
-        for instance in queryset:
-            data = render(instance)
-            data["content_type"] = content_type
-            result[f"{content_type}-{instance.pk}"] = data
+    @classmethod
+    def reset_stats(cls):
+        with cls.stats_lock:
+            cls.pending_stats = Counter()
+            cls.pending_lookups = 0
+        get_redis_connection("default").delete(cls.STATS_KEY)
 
-        return result
+    @classmethod
+    def invalidate(cls, content_strings):
+        content_strings = list(content_strings)
+        if not content_strings:
+            return
+        cache.delete_many(
+            [cls.CACHE_KEY + content_string for content_string in content_strings]
+        )
+        cls.local_cache.delete_many(content_strings)
 
-    def filter_lookup(self, content_strings):
+    @classmethod
+    def invalidate_instance(cls, instance):
         """
-        Remove invalid content strings and group by content_type for faster lookup.
-        Returns a dict: {
-            content_type: set(pk's)
-        }
+        Invalidate the cached render of an instance, and the renders of other models
+        including fields from it. Runs after the transaction is committed, so a concurrent
+        lookup can't cache the old values again.
         """
-        valid = {}
+        content_type = instance_to_content_type_string(instance)
+        content_strings = [instance_to_string(instance)]
 
-        for content_string in content_strings:
-            try:
-                content_type, pk = content_string.split("-", maxsplit=1)
-                pk = int(pk)
+        for related_type, field in cls.RELATED_RENDERS.get(content_type, []):
+            model = apps.get_model(related_type)
+            content_strings += [
+                f"{related_type}-{pk}"
+                for pk in model.objects.filter(**{field: instance.pk}).values_list(
+                    "pk", flat=True
+                )
+            ]
+
+        transaction.on_commit(lambda: cls.invalidate(content_strings))
+
+    def extract_properties(self, instances):
+        """
+        Render the values we need from the instances found in the database.
+        Customize the renderers dict to change the values added to the feed.
+        """
+        # We need to use getattr on objects because we need to support custom object properties.
+        # .values() would have been much better if this wasn't a requirement...
+        result = {}
 
-                if content_type not in self.RENDERS.keys():
-                    continue
+        by_type = defaultdict(list)
+        for content_string, instance in instances.items():
+            by_type[instance_to_content_type_string(instance)].append(content_string)
 
-                valid.setdefault(content_type, set()).add(pk)
-            except ValueError:
-                pass
+        for content_type, content_strings in by_type.items():
+            type_instances = [
+                instances[content_string] for content_string in content_strings
+            ]
+            if content_type in self.BULK_RENDERS:
+                rendered = self.BULK_RENDERS[content_type](type_instances)
+            else:
+                rendered = [
+                    self.RENDERS[content_type](instance) for instance in type_instances
+                ]
+            for content_string, data in zip(content_strings, rendered, strict=True):
+                data["content_type"] = content_type
+                result[content_string] = data
 
-        return valid
+        return result
 
     def bulk_lookup(self, content_strings):
         """
@@ -114,21 +247,22 @@ class AttrCache:
         Steps:
             1. Try to find as many keys possible in the cache, we do this first because it's a
             fast operation
-            2. Group content_strings by content types
-            3. Query the database for all missing items grouped by type
-            4. Extract the information we need from each element we found in the database
-            5. Cache the values we found in the database
+            2. Query the database for all missing items, one query per content type
+            3. Extract the information we need from each element we found in the database
+            4. Cache the values we found in the database
         """
         result = self.lookup_cache(content_strings)
 
-        lookup_required = content_strings - set(result.keys())
-        lookup_groups = self.filter_lookup(lookup_required)
-
-        lookups = {}
-
-        for content_type, ids in lookup_groups.items():
-            lookup = self.extract_properties(content_type, ids)
-            lookups.update(lookup)
+        # Invalid strings and types without a render are skipped by the lookup
+        lookup_required = [
+            content_string
+            for content_string in content_strings - set(result.keys())
+            if content_string.split("-", 1)[0] in self.RENDERS
+        ]
+        instances = strings_to_instances(
+            lookup_required, related_fields=self.RELATED_FIELDS
+        )
+        lookups = self.extract_properties(instances)
 
         self.save_lookups(lookups)
 
@@ -1,14 +1,24 @@
-from lego.apps.files.thumbor import generate_url
+from lego.apps.files.thumbor import generate_urls
 
 
 def render_user(user):
-    return {
-        "id": user.id,
-        "username": user.username,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "profile_picture": generate_url(user.profile_picture, height=100, width=100),
-    }
+    return render_users([user])[0]
+
+
+def render_users(users):
+    pictures = generate_urls(
+        [user.profile_picture for user in users], height=100, width=100
+    )
+    return [
+        {
+            "id": user.id,
+            "username": user.username,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "profile_picture": picture,
+        }
+        for user, picture in zip(users, pictures, strict=True)
+    ]
 
 
 def render_event(event):
@@ -56,16 +66,27 @@ def render_gallery_picture(gallery_picture):
 
 
 def render_abakus_group(abakus_group):
-    logo = None
-    if abakus_group.logo_id:
-        logo = generate_url(abakus_group.logo_id, height=100, width=100)
+    return render_abakus_groups([abakus_group])[0]
 
-    return {
-        "id": abakus_group.id,
-        "name": abakus_group.name,
-        "type": abakus_group.type,
-        "logo": logo,
+
+def render_abakus_groups(abakus_groups):
+    with_logo = [abakus_group for abakus_group in abakus_groups if abakus_group.logo_id]
+    logos = generate_urls(
+        [abakus_group.logo_id for abakus_group in with_logo], height=100, width=100
+    )
+    logo_by_group = {
+        abakus_group.id: logo
+        for abakus_group, logo in zip(with_logo, logos, strict=True)
     }
+    return [
+        {
+            "id": abakus_group.id,
+            "name": abakus_group.name,
+            "type": abakus_group.type,
+            "logo": logo_by_group.get(abakus_group.id),
+        }
+        for abakus_group in abakus_groups
+    ]
 
 
 def render_registration(registration):
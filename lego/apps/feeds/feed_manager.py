@@ -1,11 +1,21 @@
+import time
+from math import ceil
+
+from celery import group
+from structlog import get_logger
+
 from lego.apps.feeds.constants import ADD, REMOVE
 
 from .tasks import feed_fanout
 from .utils import chunks
 
+log = get_logger()
+
 
 class FeedManager:
-    fanout_chunk_size = 10
+    min_fanout_chunk_size = 10
+    # Number of chunks we aim for, this should be close to the worker concurrency
+    fanout_parallelism = 8
 
     def add_activity(self, activity, recipients, feed_classes):
         for feed in feed_classes:
@@ -21,20 +31,51 @@ class FeedManager:
     def retrieve_feed(self, feed_class, feed_id):
         return feed_class.objects.filter(feed_id=str(feed_id))
 
+    def get_fanout_chunk_size(self, recipient_count, feed):
+        """
+        Spread the recipients over fanout_parallelism chunks, bounded by the max chunk size
+        of the feed. Each chunk is written in bulk, so larger chunks are cheaper in total.
+        """
+        chunk_size = ceil(recipient_count / self.fanout_parallelism)
+        return max(
+            self.min_fanout_chunk_size, min(chunk_size, feed.max_fanout_chunk_size)
+        )
+
     def _feed_operation(self, operation, activity, recipients, feed):
         """
-        Divide the fanout task into multiple celery tasks
+        Divide the fanout task into multiple celery tasks, dispatched as one group.
         """
+        encoded_activity = activity.encode()
+        feed_name = feed._meta.model_name
+
         if recipients:
-            recipient_chunks = chunks(list(recipients), self.fanout_chunk_size)
-            for chunk in recipient_chunks:
-                feed_fanout.delay(
-                    operation, activity.serialize(), chunk, feed._meta.model_name
-                )
+            chunk_size = self.get_fanout_chunk_size(len(recipients), feed)
+            recipient_chunks = list(chunks(list(recipients), chunk_size))
         else:
-            feed_fanout.delay(
-                operation, activity.serialize(), [], feed._meta.model_name
+            chunk_size = 0
+            recipient_chunks = [[]]
+
+        enqueued_at = time.time()
+        group(
+            feed_fanout.s(
+                operation,
+                encoded_activity,
+                chunk,
+                feed_name,
+                enqueued_at=enqueued_at,
             )
+            for chunk in recipient_chunks
+        ).apply_async()
+
+        log.info(
+            "feed_fanout_dispatched",
+            operation=operation,
+            feed=feed_name,
+            recipients=len(recipients),
+            chunks=len(recipient_chunks),
+            chunk_size=chunk_size,
+            dispatch_latency=time.time() - enqueued_at,
+        )
 
 
 feed_manager = FeedManager()
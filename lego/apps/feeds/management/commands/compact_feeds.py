@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models import Avg, CharField, Count, F, Func, IntegerField, Max, Q, Sum
+
+from lego.apps.feeds.activity import Activity
+from lego.apps.feeds.models import NotificationFeed, PersonalFeed, UserFeed
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Trim activity stores longer than max_aggregated_activities_length and rewrite "
+        "activities stored in the old serializer format to the compact encoding."
+    )
+
+    feeds = [PersonalFeed, UserFeed, NotificationFeed]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of rows rewritten per transaction",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Only print statistics for the rows that would be compacted",
+        )
+
+    def get_queryset(self, feed):
+        return feed.objects.annotate(
+            store_length=Func(
+                F("activity_store"),
+                function="jsonb_array_length",
+                output_field=IntegerField(),
+            ),
+            first_type=Func(
+                F("activity_store__0"),
+                function="jsonb_typeof",
+                output_field=CharField(),
+            ),
+        ).filter(
+            Q(store_length__gt=feed.max_aggregated_activities_length)
+            | Q(first_type="object")
+        )
+
+    def get_statistics(self, feed, ids):
+        row_size = Func(
+            F("activity_store"), function="pg_column_size", output_field=IntegerField()
+        )
+        return feed.objects.filter(id__in=ids).aggregate(
+            rows=Count("id"),
+            total_size=Sum(row_size),
+            avg_size=Avg(row_size),
+            max_size=Max(row_size),
+        )
+
+    def print_statistics(self, feed, label, statistics):
+        self.stdout.write(
+            f"{feed.__name__} {label}: {statistics['rows']} rows, "
+            f"total {statistics['total_size'] or 0} bytes, "
+            f"avg {statistics['avg_size'] or 0:.0f} bytes, "
+            f"max {statistics['max_size'] or 0} bytes"
+        )
+
+    def compact(self, feed, ids):
+        with transaction.atomic():
+            aggregated_activities = list(
+                feed.objects.select_for_update().filter(id__in=ids)
+            )
+            for aggregated_activity in aggregated_activities:
+                aggregated_activity.activity_store = [
+                    Activity.decode(activity).encode()
+                    for activity in aggregated_activity.activity_store
+                ]
+                aggregated_activity.limit_activity_store()
+
+            feed.objects.bulk_update(
+                aggregated_activities, ["activity_store", "minimized_activities"]
+            )
+
+    def run(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        for feed in self.feeds:
+            ids = list(self.get_queryset(feed).values_list("id", flat=True))
+            self.print_statistics(feed, "before", self.get_statistics(feed, ids))
+            if options["dry_run"] or not ids:
+                continue
+
+            for i in range(0, len(ids), batch_size):
+                self.compact(feed, ids[i : i + batch_size])
+
+            self.print_statistics(feed, "after", self.get_statistics(feed, ids))
@@ -0,0 +1,23 @@
+from lego.apps.feeds.attr_cache import AttrCache
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Print the hit and miss counters of the feed AttrCache, summed over all processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            default=False,
+            help="Reset the counters after printing them",
+        )
+
+    def run(self, *args, **options):
+        stats = AttrCache.get_stats()
+        for field in AttrCache.STATS_FIELDS:
+            self.stdout.write(f"{field:<12}{stats[field]}")
+        if stats["hit_rate"] is not None:
+            self.stdout.write(f"{'hit_rate':<12}{stats['hit_rate']:.1%}")
+        if options["reset"]:
+            AttrCache.reset_stats()
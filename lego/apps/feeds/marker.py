@@ -32,12 +32,35 @@ class MarkerModelMixin:
         kwargs = {"unseen": [activity], "unread": [activity]}
         storage.add(**kwargs)
 
+    @classmethod
+    def mark_insert_activities(cls, feed_ids, activity):
+        kwargs = {"unseen": [activity], "unread": [activity]}
+        RedisListStorage.add_many(feed_ids, **kwargs)
+
+    @classmethod
+    def unmark_activities(cls, activities_by_feed_id):
+        """
+        Remove activities from the unseen and unread lists of multiple feeds.
+        """
+        RedisListStorage.remove_many(activities_by_feed_id, "unseen", "unread")
+
     @classmethod
     def get_notification_data(cls, feed_id):
         storage = RedisListStorage(feed_id)
         unseen, unread = storage.count("unseen", "unread")
         return {"unseen_count": unseen, "unread_count": unread}
 
+    @classmethod
+    def get_notification_data_many(cls, feed_ids):
+        """
+        The notification data of multiple feeds, fetched with a single pipeline.
+        """
+        counts = RedisListStorage.count_many(feed_ids, "unseen", "unread")
+        return {
+            feed_id: {"unseen_count": unseen, "unread_count": unread}
+            for feed_id, (unseen, unread) in counts.items()
+        }
+
     @property
     def is_seen(self):
         storage = RedisListStorage(self.feed_id)
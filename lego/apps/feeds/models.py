@@ -2,10 +2,14 @@ from __future__ import annotations
 
 from typing import List, Union
 
-from django.db import IntegrityError, models
+from django.db import models, transaction
+from django.db.models import F, Func, Value
+from django.db.models.expressions import CombinedExpression
+from django.db.models.functions import Greatest
 from django.db.models.query import QuerySet
+from django.utils import timezone
 
-from lego.apps.feeds.activity import Activity
+from lego.apps.feeds.activity import Activity, ActivityList
 from lego.apps.feeds.marker import MarkerModelMixin
 
 
@@ -25,6 +29,8 @@ class FeedBase(models.Model):
     updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     max_aggregated_activities_length = 10
+    # Upper bound for the number of recipients handled by one fanout task
+    max_fanout_chunk_size = 1000
 
     class Meta:
         abstract = True
@@ -42,12 +48,12 @@ class FeedBase(models.Model):
 
     @property
     def activities(self):
-        return [Activity.deserialize(activity) for activity in self.activity_store]
+        return ActivityList(self.activity_store)
 
     @property
     def last_activity(self):
         if self.activity_store:
-            return self.activities[0]
+            return Activity.decode(self.activity_store[0])
 
     @property
     def activity_count(self):
@@ -55,29 +61,133 @@ class FeedBase(models.Model):
 
     @classmethod
     def create_activities(cls, activity, feed_ids, group):
-        def create_activity(activity, feed_id, group):
+        """
+        Create a new aggregated activity for each feed_id in a single INSERT. Returns the
+        created instances.
+        """
+        encoded_activity = activity.encode()
+        aggregated_activities = []
+        for feed_id in feed_ids:
             aggregated_activity = cls(feed_id=feed_id, group=group)
-            aggregated_activity.add_activity(activity)
-            return aggregated_activity
+            aggregated_activity.store_activity(activity, encoded_activity)
+            aggregated_activities.append(aggregated_activity)
+
+        result = cls.objects.bulk_create(aggregated_activities)
+        cls.activity_added(activity, feed_ids)
 
-        result = cls.objects.bulk_create(
-            [create_activity(activity, feed_id, group) for feed_id in feed_ids]
+        return result
+
+    @classmethod
+    def update_activities(cls, activity, aggregated_activities):
+        """
+        Add the activity to a list of existing aggregated activities. The activity is
+        prepended to the stores in the database with a single UPDATE, the instances are
+        updated in memory to match.
+        """
+        encoded_activity = activity.encode()
+        now = timezone.now()
+        for aggregated_activity in aggregated_activities:
+            aggregated_activity.store_activity(activity, encoded_activity)
+            aggregated_activity.updated_at = now
+
+        cls.objects.filter(
+            pk__in=[
+                aggregated_activity.pk for aggregated_activity in aggregated_activities
+            ]
+        ).update(
+            activity_store=cls.limit_activity_store_expression(
+                CombinedExpression(
+                    Value([encoded_activity], output_field=models.JSONField()),
+                    "||",
+                    F("activity_store"),
+                    output_field=models.JSONField(),
+                )
+            ),
+            minimized_activities=F("minimized_activities")
+            + Greatest(
+                Func(F("activity_store"), function="jsonb_array_length")
+                + 1
+                - cls.max_aggregated_activities_length,
+                0,
+            ),
+            ordering_key=str(activity.activity_id),
+            updated_at=now,
+        )
+        cls.activity_added(
+            activity,
+            [
+                aggregated_activity.feed_id
+                for aggregated_activity in aggregated_activities
+            ],
         )
 
-        return [activity.id for activity in result]
+        return aggregated_activities
 
-    def add_activity(self, activity):
+    @classmethod
+    def activity_added(cls, activity, feed_ids):
         """
-        Add activity to the activity store
+        Hook called after the bulk operations above, feeds with side effects per feed_id
+        override this.
+        """
+        pass
+
+    @classmethod
+    def prune(cls, ids):
+        """
+        Delete aggregated activities together with their timeline storage locations.
+        Returns the number of deleted aggregated activities and timeline rows.
+        """
+        with transaction.atomic():
+            deleted, _ = cls.objects.filter(id__in=ids).delete()
+            timeline_deleted, _ = TimelineStorage.objects.filter(
+                feed=cls._meta.model_name, aggregated_id__in=ids
+            ).delete()
+        return deleted, timeline_deleted
+
+    def store_activity(self, activity, encoded_activity=None):
+        """
+        Insert the activity in the activity store without any side effects. Bulk callers
+        pass the encoded activity to avoid encoding it once per row.
         """
         if not self.activity_store:
             activities = []
         else:
             activities = list(self.activity_store)
 
-        activities.insert(0, activity.serialize())
+        activities.insert(0, encoded_activity or activity.encode())
         self.activity_store = activities
         self.ordering_key = activity.activity_id
+        self.limit_activity_store()
+
+    def limit_activity_store(self):
+        """
+        Keep the max_aggregated_activities_length newest activities, the overflow is only
+        counted in minimized_activities.
+        """
+        overflow = len(self.activity_store) - self.max_aggregated_activities_length
+        if overflow > 0:
+            self.activity_store = self.activity_store[
+                : self.max_aggregated_activities_length
+            ]
+            self.minimized_activities += overflow
+
+    @classmethod
+    def limit_activity_store_expression(cls, activity_store):
+        """
+        SQL version of limit_activity_store, used by set-based updates.
+        """
+        return Func(
+            activity_store,
+            Value(f"$[0 to {cls.max_aggregated_activities_length - 1}]"),
+            function="jsonb_path_query_array",
+            output_field=models.JSONField(),
+        )
+
+    def add_activity(self, activity):
+        """
+        Add activity to the activity store
+        """
+        self.store_activity(activity)
 
     def remove_activity(self, activity):
         """
@@ -85,11 +195,11 @@ class FeedBase(models.Model):
         activity_store.
         """
         if isinstance(self.activity_store, list):
-            activity_id = str(activity.activity_id)
+            activity_id = activity.activity_id
             self.activity_store = [
                 raw_activity
                 for raw_activity in self.activity_store
-                if raw_activity.get("activity_id") != activity_id
+                if Activity.decode(raw_activity).activity_id != activity_id
             ]
         if self.last_activity:
             self.ordering_key = self.last_activity.activity_id
@@ -119,6 +229,9 @@ class AggregatedFeedBase(FeedBase):
 class NotificationFeedBase(FeedBase, MarkerModelMixin):
     objects = AggregatedFeedManager()
 
+    # Notifications are pushed over websockets per recipient, keep the chunks smaller
+    max_fanout_chunk_size = 250
+
     class Meta(FeedBase.Meta):
         abstract = True
         ordering = ("-ordering_key",)
@@ -127,6 +240,24 @@ class NotificationFeedBase(FeedBase, MarkerModelMixin):
         super().add_activity(activity)
         self.mark_insert_activity(self.feed_id, activity.activity_id)
 
+    @classmethod
+    def activity_added(cls, activity, feed_ids):
+        cls.mark_insert_activities(feed_ids, activity.activity_id)
+
+    @classmethod
+    def prune(cls, ids):
+        activities_by_feed_id = {}
+        for feed_id, activity_store in cls.objects.filter(id__in=ids).values_list(
+            "feed_id", "activity_store"
+        ):
+            activities_by_feed_id.setdefault(feed_id, []).extend(
+                Activity.decode(activity).activity_id for activity in activity_store
+            )
+
+        result = super().prune(ids)
+        cls.unmark_activities(activities_by_feed_id)
+        return result
+
     def remove_activity(self, activity):
         super().remove_activity(activity)
         self.mark_activity(self.feed_id, activity.activity_id, True, True)
@@ -155,17 +286,20 @@ class TimelineStorage(models.Model):
     @classmethod
     def add_ids(cls, activity_id, aggregated_ids, feed):
         """
-        Naive solution without bulk support.
+        Insert all locations in one statement, rows violating the unique constraint are
+        skipped.
         """
-        for aggregated_id in aggregated_ids:
-            try:
-                cls.objects.update_or_create(
+        cls.objects.bulk_create(
+            [
+                cls(
                     activity_id=str(activity_id),
                     feed=feed._meta.model_name,
                     aggregated_id=aggregated_id,
                 )
-            except IntegrityError:
-                pass
+                for aggregated_id in aggregated_ids
+            ],
+            ignore_conflicts=True,
+        )
 
     @classmethod
     def remove_ids(cls, activity_id, aggregated_ids, feed):
@@ -39,25 +39,56 @@ class RedisListStorage:
     def add(self, **kwargs):
         if kwargs:
             pipe = self.redis.pipeline()
-            for list_name, values in kwargs.items():
-                if values:
-                    key = self.get_key(list_name)
-                    for value in values:
-                        pipe.rpush(key, value)
-                    # Removes items from list's head
-                    pipe.ltrim(key, -self.max_length, -1)
+            self._add_to_pipeline(pipe, **kwargs)
             pipe.execute()
 
+    @classmethod
+    def add_many(cls, base_keys, **kwargs):
+        """
+        Add the same values to the lists of multiple keys using a single pipeline.
+        """
+        storages = [cls(key) for key in base_keys]
+        if storages and kwargs:
+            pipe = storages[0].redis.pipeline()
+            for storage in storages:
+                storage._add_to_pipeline(pipe, **kwargs)
+            pipe.execute()
+
+    def _add_to_pipeline(self, pipe, **kwargs):
+        for list_name, values in kwargs.items():
+            if values:
+                key = self.get_key(list_name)
+                for value in values:
+                    pipe.rpush(key, value)
+                # Removes items from list's head
+                pipe.ltrim(key, -self.max_length, -1)
+
     def remove(self, **kwargs):
         if kwargs:
             pipe = self.redis.pipeline()
-            for list_name, values in kwargs.items():
-                key = self.get_key(list_name)
-                for value in values:
-                    # Removes all occurrences of value in the list
-                    pipe.lrem(key, 0, value)
+            self._remove_from_pipeline(pipe, **kwargs)
+            pipe.execute()
+
+    @classmethod
+    def remove_many(cls, values_by_key, *list_names):
+        """
+        Remove values from the given lists of multiple keys using a single pipeline.
+        values_by_key maps base keys to the values that should be removed.
+        """
+        storages = [(cls(key), values) for key, values in values_by_key.items()]
+        if storages and list_names:
+            pipe = storages[0][0].redis.pipeline()
+            for storage, values in storages:
+                storage._remove_from_pipeline(pipe, **dict.fromkeys(list_names, values))
             pipe.execute()
 
+    def _remove_from_pipeline(self, pipe, **kwargs):
+        for list_name, values in kwargs.items():
+            key = self.get_key(list_name)
+            for value in values:
+                # Removes all occurrences of value in the list
+                pipe.lrem(key, 0, value)
+
     def count(self, *args):
         if args:
             keys = self.get_keys(args)
@@ -66,6 +97,27 @@ class RedisListStorage:
                 pipe.llen(key)
             return self.to_result(pipe.execute())
 
+    @classmethod
+    def count_many(cls, base_keys, *list_names):
+        """
+        Count the given lists of multiple keys using a single pipeline. Returns a dict mapping
+        base keys to the counts in the order of the list names.
+        """
+        storages = [cls(key) for key in base_keys]
+        if not (storages and list_names):
+            return {}
+        pipe = storages[0].redis.pipeline()
+        for storage in storages:
+            for key in storage.get_keys(list_names):
+                pipe.llen(key)
+        results = pipe.execute()
+        return {
+            storage.base_key: tuple(
+                results[i * len(list_names) : (i + 1) * len(list_names)]
+            )
+            for i, storage in enumerate(storages)
+        }
+
     def get(self, *args):
         if args:
             keys = self.get_keys(args)
@@ -1,10 +1,56 @@
+import time
+
+from django.conf import settings
+
+from structlog import get_logger
+
 from lego import celery_app
 from lego.utils.tasks import AbakusTask
 
-from .utils import fanout
+from .models import NotificationFeed, PersonalFeed, UserFeed
+from .utils import fanout, prune_feed
+
+log = get_logger()
 
 
 @celery_app.task(bind=True, base=AbakusTask)
-def feed_fanout(self, operation, activity, recipients, feed, logger_context=None):
+def feed_fanout(
+    self, operation, activity, recipients, feed, enqueued_at=None, logger_context=None
+):
     self.setup_logger(logger_context)
-    return fanout(operation, activity, recipients, feed)
+
+    started_at = time.time()
+    result = fanout(operation, activity, recipients, feed)
+
+    # Queue lag and the time from dispatch to finished chunk is used to tune the worker
+    # concurrency and FeedManager.fanout_parallelism.
+    finished_at = time.time()
+    log.info(
+        "feed_fanout_chunk_finished",
+        operation=operation,
+        feed=feed,
+        recipients=len(recipients),
+        duration=finished_at - started_at,
+        queue_lag=started_at - enqueued_at if enqueued_at else None,
+        latency=finished_at - enqueued_at if enqueued_at else None,
+    )
+    return result
+
+
+@celery_app.task(bind=True, base=AbakusTask)
+def prune_feeds(self, logger_context=None):
+    """
+    Periodic task enforcing settings.FEED_RETENTION on all feeds.
+    """
+    self.setup_logger(logger_context)
+
+    for feed in [PersonalFeed, UserFeed, NotificationFeed]:
+        started_at = time.time()
+        pruned, timeline_pruned = prune_feed(feed, settings.FEED_RETENTION_BATCH_SIZE)
+        log.info(
+            "feed_retention_pruned",
+            feed=feed._meta.model_name,
+            rows=pruned,
+            timeline_rows=timeline_pruned,
+            duration=time.time() - started_at,
+        )
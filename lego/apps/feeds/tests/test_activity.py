@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from lego.apps.feeds.activity import Activity, ActivityList
+from lego.apps.feeds.verbs import CommentVerb
+
+
+class ActivityEncodingTestCase(SimpleTestCase):
+    def setUp(self):
+        self.activity = Activity(
+            actor="users.user-1",
+            verb=CommentVerb,
+            object="comments.comment-2",
+            target="events.event-3",
+            time=timezone.now(),
+            extra_context={"content": "Hello"},
+        )
+
+    def assertActivityEqual(self, expected, actual):
+        self.assertEqual(expected.activity_id, actual.activity_id)
+        self.assertEqual(expected.time, actual.time)
+        self.assertEqual(expected.verb, actual.verb)
+        self.assertEqual(expected.actor, actual.actor)
+        self.assertEqual(expected.object, actual.object)
+        self.assertEqual(expected.target, actual.target)
+        self.assertEqual(expected.extra_context, actual.extra_context)
+
+    def test_encode_decode(self):
+        self.assertActivityEqual(self.activity, Activity.decode(self.activity.encode()))
+
+    def test_decode_without_target(self):
+        activity = Activity(
+            actor=None, verb=CommentVerb, object="comments.comment-2", time=None
+        )
+        decoded = Activity.decode(activity.encode())
+        self.assertActivityEqual(activity, decoded)
+        self.assertIsNone(decoded.target)
+        self.assertIsNone(decoded.actor)
+
+    def test_decode_serialized_activity(self):
+        """Activities stored before the compact encoding are still readable"""
+        self.assertActivityEqual(
+            self.activity, Activity.decode(self.activity.serialize())
+        )
+
+    def test_activity_list_decodes_on_access(self):
+        activities = ActivityList([self.activity.encode(), self.activity.encode()])
+        with mock.patch.object(
+            Activity, "decode", wraps=Activity.decode
+        ) as mock_decode:
+            self.assertEqual(2, len(activities))
+            mock_decode.assert_not_called()
+            self.assertActivityEqual(self.activity, activities[0])
+            mock_decode.assert_called_once()
+        self.assertEqual(2, len(list(activities)))
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from lego.apps.feeds import attr_cache
+from lego.apps.feeds.attr_cache import AttrCache
+from lego.apps.meetings.models import Meeting
+from lego.apps.users.models import User
+from lego.utils.content_types import instance_to_string
+
+
+class AttrCacheTestCase(TestCase):
+    fixtures = ["test_abakus_groups.yaml", "test_users.yaml", "test_meetings.yaml"]
+
+    def setUp(self):
+        self.cache = AttrCache()
+        self.user = User.objects.get(username="test1")
+        self.content_string = instance_to_string(self.user)
+        AttrCache.invalidate([self.content_string])
+        AttrCache.reset_stats()
+
+    def test_lookup_tiers(self):
+        self.cache.bulk_lookup({self.content_string})
+        self.assertEqual(1, AttrCache.get_stats()["misses"])
+
+        with self.assertNumQueries(0):
+            result = self.cache.bulk_lookup({self.content_string})
+        self.assertEqual(1, AttrCache.get_stats()["local_hits"])
+        self.assertEqual("test1", result[self.content_string]["username"])
+
+        AttrCache.local_cache.clear()
+        with self.assertNumQueries(0):
+            self.cache.bulk_lookup({self.content_string})
+        self.assertEqual(
+            {"local_hits": 1, "redis_hits": 1, "misses": 1, "hit_rate": 2 / 3},
+            AttrCache.get_stats(),
+        )
+
+    @mock.patch.object(AttrCache, "STATS_FLUSH_INTERVAL", 60)
+    @mock.patch.object(AttrCache, "STATS_FLUSH_LOOKUPS", 2)
+    def test_stats_flushed_in_batches(self):
+        """Lookups answered by the local tier don't call redis until the counters flush"""
+        self.cache.bulk_lookup({self.content_string})
+        with mock.patch.object(
+            attr_cache, "get_redis_connection", wraps=attr_cache.get_redis_connection
+        ) as get_redis_connection:
+            self.cache.bulk_lookup({self.content_string})
+            get_redis_connection.assert_called_once()
+            self.cache.bulk_lookup({self.content_string})
+            get_redis_connection.assert_called_once()
+
+        self.assertEqual(2, AttrCache.get_stats()["local_hits"])
+
+    def test_invalidate_on_save(self):
+        self.cache.bulk_lookup({self.content_string})
+
+        self.user.first_name = "Changed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        result = self.cache.bulk_lookup({self.content_string})
+        self.assertEqual("Changed", result[self.content_string]["first_name"])
+
+    def test_invalidate_related_renders(self):
+        meeting = Meeting.objects.get(id=1)
+        invitation, _ = meeting.invite_user(self.user)
+        content_string = instance_to_string(invitation)
+        self.cache.bulk_lookup({content_string})
+
+        meeting.title = "Changed"
+        with self.captureOnCommitCallbacks(execute=True):
+            meeting.save()
+
+        result = self.cache.bulk_lookup({content_string})
+        self.assertEqual("Changed", result[content_string]["meeting"]["title"])
@@ -1,8 +1,10 @@
-from django.test import TransactionTestCase
+from unittest import mock
+
+from django.test import SimpleTestCase, TransactionTestCase
 
 from lego.apps.feeds.activity import Activity
-from lego.apps.feeds.feed_manager import feed_manager
-from lego.apps.feeds.models import NotificationFeed
+from lego.apps.feeds.feed_manager import FeedManager, feed_manager
+from lego.apps.feeds.models import NotificationFeed, PersonalFeed
 from lego.apps.feeds.verbs import MeetingInvitationVerb
 from lego.apps.meetings.models import Meeting
 from lego.apps.users.models import User
@@ -50,3 +52,37 @@ class FeedManagerTestCase(TransactionTestCase):
         # Remove the second activity and mage sure the aggregated activity is removed
         self.manager.remove_activity(activity1, [], [NotificationFeed])
         self.assertEqual(0, NotificationFeed.objects.count())
+
+
+class FanoutChunkSizeTestCase(SimpleTestCase):
+    def setUp(self):
+        self.manager = FeedManager()
+
+    def test_small_fanouts_use_min_chunk_size(self):
+        self.assertEqual(
+            self.manager.min_fanout_chunk_size,
+            self.manager.get_fanout_chunk_size(3, PersonalFeed),
+        )
+
+    def test_chunk_size_scales_with_recipients(self):
+        self.assertEqual(375, self.manager.get_fanout_chunk_size(3000, PersonalFeed))
+
+    def test_chunk_size_is_bounded_by_feed(self):
+        self.assertEqual(
+            NotificationFeed.max_fanout_chunk_size,
+            self.manager.get_fanout_chunk_size(3000, NotificationFeed),
+        )
+        self.assertEqual(
+            PersonalFeed.max_fanout_chunk_size,
+            self.manager.get_fanout_chunk_size(100000, PersonalFeed),
+        )
+
+    @mock.patch("lego.apps.feeds.feed_manager.group")
+    def test_dispatch_encodes_once(self, mock_group):
+        activity = mock.Mock()
+        self.manager.add_activity(activity, range(3000), [NotificationFeed])
+
+        activity.encode.assert_called_once()
+        mock_group.return_value.apply_async.assert_called_once()
+        signatures = list(mock_group.call_args[0][0])
+        self.assertEqual(12, len(signatures))
@@ -1,8 +1,11 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
 from lego.apps.feeds.activity import Activity
 from lego.apps.feeds.models import PersonalFeed
-from lego.apps.feeds.verbs import MeetingInvitationVerb
+from lego.apps.feeds.verbs import CommentVerb, MeetingInvitationVerb
 from lego.apps.meetings.models import Meeting
 from lego.apps.users.models import User
 
@@ -32,3 +35,74 @@ class RemoveActivityTestCase(TestCase):
 
         feed.remove_activity(activity)
         self.assertEqual([], feed.activity_store)
+
+
+class LimitActivityStoreTestCase(TestCase):
+    def _activity(self, object_id):
+        return Activity(
+            actor="users.user-1",
+            verb=CommentVerb,
+            object=f"comments.comment-{object_id}",
+            target="events.event-1",
+        )
+
+    def test_add_activity_rolls_overflow_into_minimized(self):
+        feed = PersonalFeed(feed_id="1", group="test")
+        limit = feed.max_aggregated_activities_length
+        for i in range(limit + 3):
+            feed.add_activity(self._activity(i + 1))
+
+        self.assertEqual(limit, len(feed.activity_store))
+        self.assertEqual(3, feed.minimized_activities)
+        self.assertEqual(limit + 3, feed.activity_count)
+        self.assertEqual(limit + 3, feed.last_activity.object_id)
+
+    def test_update_activities_limits_store_in_database(self):
+        feed = PersonalFeed(feed_id="1", group="test")
+        limit = feed.max_aggregated_activities_length
+        for i in range(limit):
+            feed.add_activity(self._activity(i + 1))
+        feed.save()
+
+        PersonalFeed.update_activities(self._activity(limit + 1), [feed])
+
+        stored = PersonalFeed.objects.get(id=feed.id)
+        self.assertEqual(feed.activity_store, stored.activity_store)
+        self.assertEqual(1, stored.minimized_activities)
+        self.assertEqual(limit + 1, stored.last_activity.object_id)
+
+
+class CompactFeedsCommandTestCase(TestCase):
+    def test_compacts_legacy_and_oversized_rows(self):
+        activities = [
+            Activity(
+                actor="users.user-1",
+                verb=CommentVerb,
+                object=f"comments.comment-{i + 1}",
+            )
+            for i in range(15)
+        ]
+        legacy = PersonalFeed.objects.create(
+            feed_id="1",
+            group="legacy",
+            activity_store=[activity.serialize() for activity in activities[:2]],
+        )
+        oversized = PersonalFeed.objects.create(
+            feed_id="1",
+            group="oversized",
+            activity_store=[activity.encode() for activity in activities],
+        )
+
+        call_command("compact_feeds", stdout=StringIO())
+
+        legacy.refresh_from_db()
+        self.assertEqual(
+            [activity.encode() for activity in activities[:2]],
+            legacy.activity_store,
+        )
+        oversized.refresh_from_db()
+        self.assertEqual(
+            oversized.max_aggregated_activities_length,
+            len(oversized.activity_store),
+        )
+        self.assertEqual(5, oversized.minimized_activities)
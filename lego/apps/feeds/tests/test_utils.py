@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from lego.apps.feeds.activity import Activity
+from lego.apps.feeds.models import NotificationFeed, PersonalFeed, TimelineStorage
+from lego.apps.feeds.storage import RedisListStorage
+from lego.apps.feeds.utils import add_to_feed, prune_feed
+from lego.apps.feeds.verbs import AnnouncementVerb
+
+
+class AddToFeedTestCase(TestCase):
+    def _activity(self, time=None, object_id=1):
+        return Activity(
+            actor="users.user-1",
+            verb=AnnouncementVerb,
+            object=f"notifications.announcement-{object_id}",
+            time=time,
+        )
+
+    def _count_queries(self, activity, recipients):
+        with CaptureQueriesContext(connection) as context:
+            add_to_feed(activity, PersonalFeed, recipients)
+        return len(context.captured_queries)
+
+    def test_query_count_is_independent_of_recipients(self):
+        small = self._count_queries(self._activity(object_id=1), range(5))
+        large = self._count_queries(self._activity(object_id=2), range(100, 200))
+        self.assertEqual(small, large)
+
+        # Both existing and new aggregated activities
+        existing = self._count_queries(self._activity(object_id=2), range(150, 250))
+        self.assertEqual(small + 1, existing)
+
+    def test_updates_existing_and_creates_new(self):
+        first = self._activity(time=timezone.now() - timedelta(minutes=1))
+        second = self._activity()
+        add_to_feed(first, PersonalFeed, [1, 2])
+        add_to_feed(second, PersonalFeed, [2, 3])
+
+        self.assertEqual(3, PersonalFeed.objects.count())
+        self.assertEqual(2, len(PersonalFeed.objects.get(feed_id="2").activity_store))
+        self.assertEqual(
+            str(second.activity_id), PersonalFeed.objects.get(feed_id="2").ordering_key
+        )
+        self.assertEqual(1, len(PersonalFeed.objects.get(feed_id="3").activity_store))
+        self.assertTrue(
+            TimelineStorage.objects.filter(
+                activity_id=str(second.activity_id), feed="personalfeed"
+            ).exists()
+        )
+
+
+class PruneFeedTestCase(TestCase):
+    def _add(self, feed, recipients, object_id):
+        activity = Activity(
+            actor="users.user-1",
+            verb=AnnouncementVerb,
+            object=f"notifications.announcement-{object_id}",
+        )
+        add_to_feed(activity, feed, recipients)
+        return activity
+
+    @override_settings(
+        FEED_RETENTION={"personalfeed": {"max_items": 2, "max_age": None}}
+    )
+    def test_prunes_oldest_items_per_feed(self):
+        for object_id in range(1, 5):
+            self._add(PersonalFeed, ["1"], object_id)
+        self._add(PersonalFeed, ["2"], 5)
+
+        pruned, timeline_pruned = prune_feed(PersonalFeed, batch_size=1)
+
+        self.assertEqual(2, pruned)
+        self.assertEqual(2, timeline_pruned)
+        self.assertEqual(2, PersonalFeed.objects.filter(feed_id="1").count())
+        self.assertEqual(1, PersonalFeed.objects.filter(feed_id="2").count())
+        self.assertEqual(3, TimelineStorage.objects.count())
+
+    @override_settings(
+        FEED_RETENTION={"personalfeed": {"max_items": 1, "max_age": None}}
+    )
+    def test_prunable_ids_are_selected_per_batch(self):
+        for object_id in range(1, 6):
+            self._add(PersonalFeed, ["1"], object_id)
+
+        with CaptureQueriesContext(connection) as context:
+            pruned, _ = prune_feed(PersonalFeed, batch_size=2)
+
+        self.assertEqual(4, pruned)
+        self.assertEqual(1, PersonalFeed.objects.filter(feed_id="1").count())
+        selects = [
+            query["sql"]
+            for query in context.captured_queries
+            if "ROW_NUMBER()" in query["sql"]
+        ]
+        self.assertEqual(3, len(selects))
+        self.assertTrue(all(sql.endswith("LIMIT 2") for sql in selects))
+
+    @override_settings(
+        FEED_RETENTION={
+            "notificationfeed": {"max_items": None, "max_age": timedelta(days=30)}
+        }
+    )
+    def test_prunes_old_items_and_markers(self):
+        NotificationFeed.mark_all("1", True, True)
+        self._add(NotificationFeed, ["1"], 1)
+        new = self._add(NotificationFeed, ["1"], 2)
+        NotificationFeed.objects.filter(group__endswith="-1").update(
+            updated_at=timezone.now() - timedelta(days=31)
+        )
+
+        pruned, _ = prune_feed(NotificationFeed, batch_size=10)
+
+        self.assertEqual(1, pruned)
+        storage = RedisListStorage("1")
+        unseen = storage.redis.lrange(storage.get_key("unseen"), 0, -1)
+        self.assertEqual([str(new.activity_id).encode()], unseen)
@@ -1,12 +1,18 @@
+from itertools import chain
 from typing import List, Type, cast
 
 from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 
 from lego.apps.feeds.activity import Activity
 from lego.apps.feeds.aggregator import FeedAggregator
 from lego.apps.feeds.constants import ADD, REMOVE
 from lego.apps.feeds.models import FeedBase, NotificationFeed, TimelineStorage
-from lego.apps.feeds.websockets import notify_new_notification
+from lego.apps.feeds.websockets import notify_new_notifications
 
 aggregator = FeedAggregator()
 
@@ -16,7 +22,7 @@ def fanout(operation, activity, recipients, feed):
     Fanout is called in celery task and is responsible for distributing the actions into the
     destination feeds.
     """
-    activity = Activity.deserialize(activity)
+    activity = Activity.decode(activity)
     feed = cast(Type[FeedBase], apps.get_model("feeds", feed))
 
     if operation == ADD:
@@ -31,39 +37,50 @@ def fanout(operation, activity, recipients, feed):
 def add_to_feed(activity: Activity, feed: Type[FeedBase], recipients: List[str]):
     """
     Lookup groupings and add the activity to the feed.
+
+    The fanout is done in bulk inside one transaction: matching aggregated activities are
+    updated with one bulk UPDATE, new ones are created with one INSERT and the timeline
+    storage is written with one INSERT. The number of queries does not depend on the
+    number of recipients.
     """
     # Search the last x elements for a matching group
     recipients = set(map(str, recipients))
-    timeline_ids = set()
     group_search_offset = 20
     group = aggregator.get_group(activity)
     is_notification = feed == NotificationFeed
 
-    existing_aggregated_activities = feed.objects.find_matching_groups(
-        group, group_search_offset, recipients
-    )
-
-    # Populate existing aggregated activities
-    for aggregated_activity in existing_aggregated_activities:
-        aggregated_activity.add_activity(activity)
-        aggregated_activity.save()
-        if is_notification:
-            notify_new_notification(aggregated_activity)
-        recipients.remove(aggregated_activity.feed_id)
-        timeline_ids.add(aggregated_activity.id)
-
-    # Create new aggregated activity for users that don't have an item already
-    activity_ids = feed.create_activities(activity, recipients, group)
-    timeline_ids |= set(activity_ids)
-
-    TimelineStorage.add_ids(activity.activity_id, timeline_ids, feed)
+    with transaction.atomic():
+        existing_aggregated_activities = feed.update_activities(
+            activity,
+            list(
+                feed.objects.find_matching_groups(
+                    group, group_search_offset, recipients
+                )
+            ),
+        )
+        recipients -= {
+            aggregated_activity.feed_id
+            for aggregated_activity in existing_aggregated_activities
+        }
+
+        # Create new aggregated activity for users that don't have an item already
+        new_aggregated_activities = feed.create_activities(activity, recipients, group)
+
+        TimelineStorage.add_ids(
+            activity.activity_id,
+            [
+                aggregated_activity.id
+                for aggregated_activity in chain(
+                    existing_aggregated_activities, new_aggregated_activities
+                )
+            ],
+            feed,
+        )
 
     if is_notification:
-        new_aggregated_activities = feed.objects.find_matching_groups(
-            group, group_search_offset, recipients
+        notify_new_notifications(
+            chain(existing_aggregated_activities, new_aggregated_activities)
         )
-        for aggregated_activity in new_aggregated_activities:
-            notify_new_notification(aggregated_activity)
 
 
 def remove_from_feed(activity, feed, recipients):
@@ -86,6 +103,46 @@ def remove_from_feed(activity, feed, recipients):
     TimelineStorage.remove_ids(activity.activity_id, aggregated_ids, feed)
 
 
+def prune_feed(feed: Type[FeedBase], batch_size: int):
+    """
+    Apply the FEED_RETENTION policy of the feed. Rows are deleted in batches, each batch in
+    its own transaction. The ids of a batch are selected again after the previous batch is
+    deleted, so the prunable ids are never loaded all at once.
+    """
+    policy = settings.FEED_RETENTION.get(feed._meta.model_name, {})
+    max_age = policy.get("max_age")
+    max_items = policy.get("max_items")
+
+    querysets = []
+    if max_age:
+        querysets.append(
+            feed.objects.filter(updated_at__lt=timezone.now() - max_age).order_by()
+        )
+    if max_items:
+        querysets.append(
+            feed.objects.annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=F("feed_id"),
+                    order_by=F("ordering_key").desc(),
+                )
+            )
+            .filter(position__gt=max_items)
+            .order_by()
+        )
+
+    pruned = timeline_pruned = 0
+    for queryset in querysets:
+        while ids := list(queryset.values_list("id", flat=True)[:batch_size]):
+            deleted, timeline_deleted = feed.prune(ids)
+            pruned += deleted
+            timeline_pruned += timeline_deleted
+            if not deleted:
+                break
+
+    return pruned, timeline_pruned
+
+
 def chunks(quotient, dividend):
     for i in range(0, len(quotient), dividend):
         yield quotient[i : i + dividend]
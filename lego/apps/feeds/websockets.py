@@ -1,25 +1,47 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable
 
 from lego.apps.feeds.serializers.sockets import FeedActivitySocketSerializer
 from lego.apps.websockets.groups import group_for_user
-from lego.apps.websockets.notifiers import notify_group
+from lego.apps.websockets.notifiers import notify_groups
 
 if TYPE_CHECKING:
     from lego.apps.feeds.models import NotificationFeed
 
 
 def notify_new_notification(aggregated_activity: NotificationFeed):
+    notify_new_notifications([aggregated_activity])
+
+
+def notify_new_notifications(aggregated_activities: Iterable[NotificationFeed]):
+    """
+    Push the aggregated activities to their owners. The context for all payloads is looked
+    up with a single AttrCache lookup.
+    """
     from lego.apps.feeds.views import FeedViewSet
 
-    group = group_for_user(aggregated_activity.feed_id)
-    serializer = FeedActivitySocketSerializer(
-        {
-            "type": "SOCKET_NEW_NOTIFICATION",
-            "payload": aggregated_activity,
-        }
+    aggregated_activities = list(aggregated_activities)
+    if not aggregated_activities:
+        return
+
+    messages = [
+        FeedActivitySocketSerializer(
+            {
+                "type": "SOCKET_NEW_NOTIFICATION",
+                "payload": aggregated_activity,
+            }
+        ).data
+        for aggregated_activity in aggregated_activities
+    ]
+    payloads = FeedViewSet.attach_metadata([data["payload"] for data in messages])
+
+    for data, payload in zip(messages, payloads, strict=True):
+        data["payload"] = payload
+
+    notify_groups(
+        (group_for_user(aggregated_activity.feed_id), data)
+        for aggregated_activity, data in zip(
+            aggregated_activities, messages, strict=True
+        )
     )
-    data = serializer.data
-    data["payload"] = FeedViewSet.attach_metadata([data["payload"]])[0]
-    notify_group(group, data)
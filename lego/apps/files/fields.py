@@ -2,10 +2,13 @@ from urllib.parse import unquote
 
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import URLValidator
+from django.utils.functional import cached_property
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from lego.apps.files.constants import IMAGE
-from lego.apps.files.thumbor import generate_url
+from lego.apps.files.thumbor import generate_url, generate_urls
+from lego.utils.fields import get_list_values
 
 from .models import File
 from .storage import storage
@@ -13,6 +16,17 @@ from .storage import storage
 url_validator = URLValidator()
 
 
+class ManyFileField(serializers.ManyRelatedField):
+    """
+    File list that signs all urls in one batch, used by FileField(many=True).
+    """
+
+    def to_representation(self, iterable):
+        keys = [value.pk for value in iterable]
+        signed_urls = storage.generate_signed_urls(File.bucket, keys)
+        return [signed_urls[key] for key in keys]
+
+
 class FileField(serializers.PrimaryKeyRelatedField):
     default_error_messages = {
         "required": "This field is required.",
@@ -21,12 +35,21 @@ class FileField(serializers.PrimaryKeyRelatedField):
         "incorrect_token": "Incorrect file token, you cannot access this file.",
     }
     allowed_types = None
+    many_field_class = ManyFileField
 
     def __init__(self, allowed_types=None, **kwargs):
         super().__init__(**kwargs)
         self.allowed_types = allowed_types
         self.access_granted = False
 
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return cls.many_field_class(**list_kwargs)
+
     def get_queryset(self):
         if not self.allowed_types:
             return File.objects.all()
@@ -36,7 +59,14 @@ class FileField(serializers.PrimaryKeyRelatedField):
         return True
 
     def to_representation(self, value):
-        return storage.generate_signed_url(File.bucket, value.pk)
+        if value.pk not in self.signed_urls:
+            keys = [value.pk, *(item.pk for item in get_list_values(self))]
+            self.signed_urls.update(storage.generate_signed_urls(File.bucket, keys))
+        return self.signed_urls[value.pk]
+
+    @cached_property
+    def signed_urls(self):
+        return {}
 
     def run_validation(self, data=None):
         if data is None:
@@ -76,6 +106,17 @@ class FileField(serializers.PrimaryKeyRelatedField):
             self.fail("incorrect_type", data_type=type(data).__name__)
 
 
+class ManyImageField(serializers.ManyRelatedField):
+    """
+    Image list that signs all urls in one batch, used by ImageField(many=True).
+    """
+
+    def to_representation(self, iterable):
+        return generate_urls(
+            [unquote(value.pk) for value in iterable], **self.child_relation.options
+        )
+
+
 class ImageField(FileField):
     """
     Load images with thumbor and on demand resizing.
@@ -83,6 +124,7 @@ class ImageField(FileField):
     """
 
     options = {}
+    many_field_class = ManyImageField
 
     def __init__(self, options=None, **kwargs):
         kwargs["allowed_types"] = [IMAGE]
@@ -8,8 +8,12 @@ from django.utils.crypto import get_random_string
 import boto3
 from botocore import exceptions
 
+from lego.utils.cache import LocalCache
+
 
 class Storage:
+    signed_urls = LocalCache(max_size=10000, timeout=0)
+
     def __init__(self):
         self.session = boto3.Session(
             aws_access_key_id=getattr(settings, "AWS_ACCESS_KEY_ID", None),
@@ -47,10 +51,34 @@ class Storage:
     def generate_signed_url(self, bucket, key):
         params = {"Bucket": bucket, "Key": key}
         presigned_url = self.client.generate_presigned_url(
-            ClientMethod="get_object", Params=params, ExpiresIn=60
+            ClientMethod="get_object",
+            Params=params,
+            ExpiresIn=settings.FILE_SIGNED_URL_EXPIRY,
         )
         return presigned_url
 
+    def generate_signed_urls(self, bucket, keys):
+        """
+        Presigned get urls for many keys in a bucket, mapped by key. Signed urls are cached in
+        process for FILE_SIGNED_URL_CACHE_TIMEOUT, only the missing urls are signed.
+        """
+        timeout = settings.FILE_SIGNED_URL_CACHE_TIMEOUT
+        cache_keys = {
+            (bucket, key, settings.FILE_SIGNED_URL_EXPIRY): key for key in keys
+        }
+        cached = self.signed_urls.get_many(cache_keys) if timeout else {}
+
+        signed = {
+            cache_key: self.generate_signed_url(bucket, key)
+            for cache_key, key in cache_keys.items()
+            if cache_key not in cached
+        }
+        if timeout:
+            self.signed_urls.set_many(signed, timeout=timeout)
+
+        cached.update(signed)
+        return {key: cached[cache_key] for cache_key, key in cache_keys.items()}
+
     def key_exists(self, bucket, key):
         try:
             self.resource.Object(bucket, key).load()
@@ -1,12 +1,24 @@
 from unittest import mock
 
+from django.test import override_settings
+from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from lego.apps.files.fields import FileField
+from lego.apps.files.fields import FileField, ImageField
 from lego.apps.files.models import File
+from lego.apps.files.storage import storage
+from lego.apps.users.models import User
 from lego.utils.test_utils import BaseTestCase
 
 
+class ExampleFileSerializer(serializers.ModelSerializer):
+    picture = FileField()
+
+    class Meta:
+        model = User
+        fields = ("id", "picture")
+
+
 class FileFieldTestCase(BaseTestCase):
     fixtures = ["test_users.yaml", "test_files.yaml"]
 
@@ -40,3 +52,62 @@ class FileFieldTestCase(BaseTestCase):
         self.assertRaises(
             ValidationError, self.field.to_internal_value, "abakus.png:_token"
         )
+
+
+@mock.patch.object(
+    storage.client,
+    "generate_presigned_url",
+    side_effect=lambda **kwargs: f"signed/{kwargs['Params']['Key']}",
+)
+class SignedUrlTestCase(BaseTestCase):
+    fixtures = ["test_users.yaml", "test_files.yaml"]
+
+    def setUp(self):
+        storage.signed_urls.clear()
+
+    def test_list_is_signed_in_one_batch(self, mock_presign):
+        users = list(User.objects.order_by("id")[:3])
+        for user, file in zip(users, File.objects.order_by("key"), strict=False):
+            user.picture = file
+            user.save()
+
+        with mock.patch.object(
+            storage, "generate_signed_urls", wraps=storage.generate_signed_urls
+        ) as generate_signed_urls:
+            data = ExampleFileSerializer(users, many=True).data
+
+        generate_signed_urls.assert_called_once()
+        self.assertEqual(
+            [f"signed/{user.picture_id}" for user in users],
+            [item["picture"] for item in data],
+        )
+
+    def test_many_field_is_signed_in_one_batch(self, mock_presign):
+        field = FileField(many=True)
+        files = list(File.objects.order_by("key"))
+
+        self.assertEqual(
+            [f"signed/{file.key}" for file in files], field.to_representation(files)
+        )
+
+    @override_settings(FILE_SIGNED_URL_CACHE_TIMEOUT=60)
+    def test_signed_urls_are_reused(self, mock_presign):
+        first = storage.generate_signed_urls(File.bucket, ["a.pdf", "b.pdf"])
+        second = storage.generate_signed_urls(File.bucket, ["b.pdf", "c.pdf"])
+
+        self.assertEqual(first["b.pdf"], second["b.pdf"])
+        self.assertEqual(3, mock_presign.call_count)
+        self.assertEqual(3600, mock_presign.call_args.kwargs["ExpiresIn"])
+
+
+class ImageFieldTestCase(BaseTestCase):
+    fixtures = ["test_users.yaml", "test_files.yaml"]
+
+    def test_many_matches_single_representation(self):
+        field = ImageField(many=True, options={"height": 50, "filters": ["blur(20)"]})
+        files = list(File.objects.order_by("key"))
+
+        self.assertEqual(
+            [field.child_relation.to_representation(file) for file in files],
+            field.to_representation(files),
+        )
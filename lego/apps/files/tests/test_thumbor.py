@@ -0,0 +1,32 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from lego.apps.files import thumbor
+
+
+class ThumborTestCase(SimpleTestCase):
+    def setUp(self):
+        thumbor._generate_url.cache_clear()
+
+    def test_batch_matches_single_urls(self):
+        options = {"height": 50, "filters": ["blur(20)"]}
+        self.assertEqual(
+            [
+                thumbor.generate_url("a.png", **options),
+                thumbor.generate_url("b.png", **options),
+            ],
+            thumbor.generate_urls(["a.png", "b.png"], **options),
+        )
+
+    def test_memoizes_signatures(self):
+        with mock.patch.object(
+            thumbor.crypto, "generate", wraps=thumbor.crypto.generate
+        ) as generate:
+            first = thumbor.generate_url("a.png", height=100, width=100)
+            second = thumbor.generate_url("a.png", width=100, height=100)
+            other = thumbor.generate_url("a.png", height=200, width=100)
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(2, generate.call_count)
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from django.conf import settings
 
 from libthumbor import CryptoURL
@@ -30,11 +32,45 @@ def _handle_url_field(url):
     return url
 
 
-def generate_url(image_url, **kwargs):
-    image_url = _handle_empty(image_url)
-    image_url = _handle_url_field(image_url)
+# Options are passed to the memoized generator as sorted tuples, lists like filters included
+def _freeze_options(options):
+    return tuple(
+        sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in options.items()
+        )
+    )
 
-    thumbor_server = kwargs.pop("thumbor_server", THUMBOR_SERVER).rstrip("/")
+
+@lru_cache(maxsize=getattr(settings, "THUMBOR_URL_CACHE_SIZE", 10000))
+def _generate_url(image_url, thumbor_server, options):
+    kwargs = {
+        key: list(value) if isinstance(value, tuple) else value
+        for key, value in options
+    }
     encrypted_url = crypto.generate(image_url=image_url, **kwargs).strip("/")
 
     return "%s/%s" % (thumbor_server, encrypted_url)
+
+
+def generate_url(image_url, **kwargs):
+    """
+    Signed thumbor url for an image. The url only depends on the arguments, so the HMAC is
+    memoized in a bounded LRU.
+    """
+    return generate_urls([image_url], **kwargs)[0]
+
+
+def generate_urls(image_urls, **kwargs):
+    """
+    Signed thumbor urls for many images with the same options, in the same order.
+    """
+    thumbor_server = kwargs.pop("thumbor_server", THUMBOR_SERVER).rstrip("/")
+    options = _freeze_options(kwargs)
+
+    return [
+        _generate_url(
+            _handle_url_field(_handle_empty(image_url)), thumbor_server, options
+        )
+        for image_url in image_urls
+    ]
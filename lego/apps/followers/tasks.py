@@ -6,7 +6,9 @@ from structlog import get_logger
 
 from lego import celery_app
 from lego.apps.events.models import Pool
+from lego.apps.followers.models import FollowEvent
 from lego.apps.followers.notifications import RegistrationReminderNotification
+from lego.apps.notifications.notification import Notification
 from lego.utils.tasks import AbakusTask
 
 log = get_logger()
@@ -21,6 +23,8 @@ def send_registration_reminder_mail(self, logger_context=None):
         activation_date__lte=timezone.now() + timedelta(minutes=60),
     ).prefetch_related("event", "event__followers", "event__followers__follower")
 
+    notifications = []
+    sent = {}
     for pool in pools:
         for followsevent in pool.event.followers.all():
             user = followsevent.follower
@@ -31,7 +35,15 @@ def send_registration_reminder_mail(self, logger_context=None):
                 and not pool.event.registrations.filter(user=user).exists()
                 and not followsevent.notification_sent
             ):
-                notification = RegistrationReminderNotification(user, event=pool.event)
-                notification.notify()
+                notifications.append(
+                    RegistrationReminderNotification(user, event=pool.event)
+                )
             followsevent.notification_sent = True
-            followsevent.save()
+            sent[followsevent.pk] = followsevent
+
+    # Only mark the reminders as sent once they are queued
+    Notification.notify_all(notifications)
+    now = timezone.now()
+    for followsevent in sent.values():
+        followsevent.updated_at = now
+    FollowEvent.objects.bulk_update(sent.values(), ["notification_sent", "updated_at"])
@@ -12,7 +12,7 @@ from lego.apps.users.models import AbakusGroup
 from lego.utils.test_utils import BaseTestCase
 
 
-@mock.patch("lego.apps.followers.tasks.RegistrationReminderNotification.notify")
+@mock.patch("lego.apps.followers.tasks.RegistrationReminderNotification.generate")
 class RegistrationReminderTestCase(BaseTestCase):
     fixtures = [
         "test_abakus_groups.yaml",
@@ -108,3 +108,29 @@ class RegistrationReminderTestCase(BaseTestCase):
         )
         send_registration_reminder_mail.delay()
         mock_notification.assert_not_called()
+
+    def test_not_marked_sent_when_notifying_fails(self, mock_notification):
+        self.pool.activation_date = timezone.now() + timedelta(minutes=45)
+        self.pool.save()
+        follow, _ = FollowEvent.objects.get_or_create(
+            follower=self.recipient, target=self.pool.event
+        )
+        mock_notification.side_effect = RuntimeError("broker down")
+
+        with self.assertRaises(RuntimeError):
+            send_registration_reminder_mail()
+
+        follow.refresh_from_db()
+        self.assertFalse(follow.notification_sent)
+
+    def test_marked_sent(self, mock_notification):
+        self.pool.activation_date = timezone.now() + timedelta(minutes=45)
+        self.pool.save()
+        follow, _ = FollowEvent.objects.get_or_create(
+            follower=self.recipient, target=self.pool.event
+        )
+
+        send_registration_reminder_mail()
+
+        follow.refresh_from_db()
+        self.assertTrue(follow.notification_sent)
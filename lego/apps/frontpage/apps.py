@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class FrontpageConfig(AppConfig):
     name = "lego.apps.frontpage"
     verbose_name = "frontpage"
+
+    def ready(self):
+        from lego.apps.articles.models import Article
+        from lego.apps.comments.models import Comment
+        from lego.apps.events.models import Event, Pool
+        from lego.apps.frontpage.signals import frontpage_invalidation_callback
+        from lego.apps.polls.models import Option, Poll
+
+        for model in (Article, Comment, Event, Option, Poll, Pool):
+            post_save.connect(frontpage_invalidation_callback, sender=model)
+            post_delete.connect(frontpage_invalidation_callback, sender=model)
@@ -0,0 +1,77 @@
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from lego.apps.permissions.constants import LIST
+from lego.apps.permissions.utils import get_permission_handler
+
+
+class FrontpageCache:
+    """
+    The parts of the frontpage that are the same for every user in a visibility bucket,
+    cached in redis. Saving an event, article or poll bumps the version and invalidates every
+    bucket.
+    """
+
+    CACHE_KEY = "frontpage_"
+    VERSION_KEY = "frontpage_version"
+
+    @classmethod
+    def get(cls, bucket):
+        key = f"{cls.CACHE_KEY}{bucket}"
+        values = cache.get_many([cls.VERSION_KEY, key])
+        cached = values.get(key)
+        if cached and cached[0] == values.get(cls.VERSION_KEY, 0):
+            return cached[1]
+        return None
+
+    @classmethod
+    def set(cls, bucket, data):
+        version = cache.get(cls.VERSION_KEY, 0)
+        cache.set(
+            f"{cls.CACHE_KEY}{bucket}",
+            (version, data),
+            timeout=settings.FRONTPAGE_CACHE_TIMEOUT,
+        )
+
+    @classmethod
+    def invalidate(cls):
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, timeout=None)
+
+
+def get_visibility_bucket(user, querysets):
+    """
+    Key shared by the users who are allowed to see the same objects in the querysets. Users
+    with list permissions see everything, other users see what their groups can see.
+
+    Returns None when the user can see objects they created or were given access to
+    personally, since nobody else sees the same frontpage.
+    """
+    if not user.is_authenticated:
+        return "anonymous"
+
+    filtered = False
+    parts = []
+    for queryset in querysets:
+        handler = get_permission_handler(queryset.model)
+        if handler.has_perm(user, LIST, queryset=queryset):
+            parts.append("all")
+            continue
+        if queryset.filter(
+            Q(can_edit_users__in=[user.pk]) | Q(created_by=user)
+        ).exists():
+            return None
+        filtered = True
+        parts.append("groups")
+
+    if filtered:
+        group_ids = ",".join(
+            str(pk) for pk in sorted(user.permission_snapshot.group_ids)
+        )
+        parts.append(sha1(group_ids.encode()).hexdigest())
+    return ":".join(["user", *parts])
@@ -0,0 +1,7 @@
+from django.db import transaction
+
+from lego.apps.frontpage.cache import FrontpageCache
+
+
+def frontpage_invalidation_callback(sender, instance, **kwargs):
+    transaction.on_commit(FrontpageCache.invalidate)
@@ -1,9 +1,12 @@
+from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 
 from lego.apps.events.constants import INTEREST_EVENT
-from lego.apps.events.models import Event
+from lego.apps.events.models import Event, Registration
+from lego.apps.events.tests.utils import get_dummy_users
+from lego.apps.frontpage.cache import FrontpageCache
 from lego.apps.users.models import AbakusGroup, User
 from lego.utils.test_utils import BaseAPITestCase
 
@@ -60,3 +63,65 @@ class FrontpageAPITestCase(BaseAPITestCase):
         res = self.client.get(_get_frontpage())
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertNotIn(event.id, [e["id"] for e in res.json()["events"]])
+
+
+@override_settings(FRONTPAGE_CACHE_TIMEOUT=60)
+class FrontpageCacheTestCase(BaseAPITestCase):
+    fixtures = [
+        "test_abakus_groups.yaml",
+        "test_companies.yaml",
+        "test_users.yaml",
+        "test_events.yaml",
+    ]
+
+    def setUp(self):
+        FrontpageCache.invalidate()
+        abakus = AbakusGroup.objects.get(name="Abakus")
+        self.user, self.other_user = get_dummy_users(2)
+        abakus.add_user(self.user)
+        abakus.add_user(self.other_user)
+        self.event = Event.objects.filter(end_time__gt=timezone.now()).first()
+
+    def get_events(self, user):
+        self.client.force_authenticate(user)
+        res = self.client.get(_get_frontpage())
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {event["id"]: event for event in res.json()["events"]}
+
+    def test_cached_response_is_equal(self):
+        with override_settings(FRONTPAGE_CACHE_TIMEOUT=0):
+            uncached = self.get_events(self.user)
+        self.get_events(self.user)
+        self.assertEqual(uncached, self.get_events(self.user))
+
+    def test_user_fields_are_not_shared(self):
+        pool = self.event.pools.first()
+        Registration.objects.create(event=self.event, user=self.user, pool=pool)
+
+        self.assertTrue(self.get_events(self.user)[self.event.id]["isAdmitted"])
+        self.assertFalse(self.get_events(self.other_user)[self.event.id]["isAdmitted"])
+
+    def test_registration_count_is_not_cached(self):
+        count = self.get_events(self.user)[self.event.id]["registrationCount"]
+        Registration.objects.create(
+            event=self.event, user=self.other_user, pool=self.event.pools.first()
+        )
+        self.assertEqual(
+            count + 1, self.get_events(self.user)[self.event.id]["registrationCount"]
+        )
+
+    def test_event_save_invalidates(self):
+        self.get_events(self.user)
+        self.event.title = "Updated"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.save()
+        self.assertEqual("Updated", self.get_events(self.user)[self.event.id]["title"])
+
+    def test_personal_object_permissions_are_not_cached(self):
+        Event.objects.filter(pk=self.event.pk).update(
+            require_auth=True, created_by=self.other_user
+        )
+        self.event.can_view_groups.clear()
+
+        self.assertNotIn(self.event.id, self.get_events(self.user))
+        self.assertIn(self.event.id, self.get_events(self.other_user))
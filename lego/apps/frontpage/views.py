@@ -1,4 +1,5 @@
-from django.db.models import Prefetch
+from django.conf import settings
+from django.db.models import Count, Prefetch
 from django.utils import timezone
 from rest_framework import permissions, viewsets
 from rest_framework.response import Response
@@ -6,8 +7,10 @@ from rest_framework.response import Response
 from lego.apps.articles.models import Article
 from lego.apps.articles.serializers import PublicArticleSerializer
 from lego.apps.events.constants import INTEREST_EVENT, SUCCESS_UNREGISTER
-from lego.apps.events.models import Event, Pool, Registration
+from lego.apps.events.eligibility import UserEventEligibility
+from lego.apps.events.models import Event, Registration
 from lego.apps.events.serializers.events import FrontpageEventSerializer
+from lego.apps.frontpage.cache import FrontpageCache, get_visibility_bucket
 from lego.apps.permissions.constants import LIST
 from lego.apps.permissions.utils import get_permission_handler
 from lego.apps.polls.models import Poll
@@ -21,30 +24,53 @@ class FrontpageViewSet(viewsets.ViewSet):
     permission_classes = (permissions.AllowAny,)
 
     def list(self, request):
-        cached_penalties = (
-            self.request.user.number_of_penalties()
-            if self.request.user.is_authenticated
-            else None
-        )
-
-        def get_serializer_context():
-            """
-            Extra context provided to the serializer class.
-            """
-            return {
-                "request": request,
-                "format": self.format_kwarg,
-                "view": self,
-                "cached_penalties": cached_penalties,
-            }
-
-        articles_handler = get_permission_handler(Article)
+        """
+        The frontpage is built from a part shared by every user in the same visibility bucket,
+        which is cached, and the fields that depend on the user.
+        """
         articles_queryset_base = (
             Article.objects.all()
             .order_by("-pinned", "-created_at")
             .prefetch_related("tags")
         )
+        queryset_events_base = (
+            Event.objects.all()
+            .filter(end_time__gt=timezone.now())
+            # Interest events live on their own page, like in the events list
+            .exclude(event_type=INTEREST_EVENT)
+            .order_by("-pinned", "start_time", "id")
+            .prefetch_related("pools", "pools__registrations", "company", "tags")
+        )
+
+        bucket = None
+        if settings.FRONTPAGE_CACHE_TIMEOUT:
+            bucket = get_visibility_bucket(
+                request.user, [articles_queryset_base, queryset_events_base]
+            )
+        data = FrontpageCache.get(bucket) if bucket else None
+        if data is None:
+            data = self.get_shared_data(
+                request, articles_queryset_base, queryset_events_base
+            )
+            if bucket:
+                FrontpageCache.set(bucket, data)
+
+        if request.user.is_authenticated:
+            self.add_user_data(request.user, data)
+        return Response(data)
 
+    def get_serializer_context(self):
+        """
+        Extra context provided to the serializer class.
+        """
+        return {
+            "request": self.request,
+            "format": self.format_kwarg,
+            "view": self,
+        }
+
+    def get_shared_data(self, request, articles_queryset_base, queryset_events_base):
+        articles_handler = get_permission_handler(Article)
         if articles_handler.has_perm(
             request.user, LIST, queryset=articles_queryset_base
         ):
@@ -55,14 +81,6 @@ class FrontpageViewSet(viewsets.ViewSet):
             )
 
         events_handler = get_permission_handler(Event)
-        queryset_events_base = (
-            Event.objects.all()
-            .filter(end_time__gt=timezone.now())
-            # Interest events live on their own page, like in the events list
-            .exclude(event_type=INTEREST_EVENT)
-            .order_by("-pinned", "start_time", "id")
-            .prefetch_related("pools", "pools__registrations", "company", "tags")
-        )
         if request.user.is_authenticated:
             queryset_events_base = queryset_events_base.prefetch_related(
                 "pools__registrations__user",
@@ -73,13 +91,6 @@ class FrontpageViewSet(viewsets.ViewSet):
                     .select_related("pool"),
                     to_attr="user_reg",
                 ),
-                Prefetch(
-                    "pools",
-                    queryset=Pool.objects.filter(
-                        permission_groups__in=self.request.user.all_groups
-                    ),
-                    to_attr="possible_pools",
-                ),
             )
 
         if events_handler.has_perm(request.user, LIST, queryset=queryset_events_base):
@@ -92,22 +103,63 @@ class FrontpageViewSet(viewsets.ViewSet):
         queryset_poll = Poll.objects.filter(pinned=True).order_by("created_at").last()
 
         articles = PublicArticleSerializer(
-            queryset_articles[:10], context=get_serializer_context(), many=True
+            queryset_articles[:10], context=self.get_serializer_context(), many=True
         ).data
         events = FrontpageEventSerializer(
-            queryset_events, context=get_serializer_context(), many=True
+            queryset_events, context=self.get_serializer_context(), many=True
         ).data
         poll = None
         if queryset_poll:
             if queryset_poll.results_hidden:
                 poll = HiddenResultsDetailedPollSerializer(
-                    queryset_poll, context=get_serializer_context()
+                    queryset_poll, context=self.get_serializer_context()
                 ).data
             else:
                 poll = DetailedPollSerializer(
-                    queryset_poll, context=get_serializer_context()
+                    queryset_poll, context=self.get_serializer_context()
                 ).data
 
-        ret = {"articles": articles, "events": events, "poll": poll}
+        return {"articles": articles, "events": events, "poll": poll}
 
-        return Response(ret)
+    def add_user_data(self, user, data):
+        """
+        Replace the fields of the shared data that depend on the user. The output for anonymous
+        users is the same for everyone.
+        """
+        event_ids = [event["id"] for event in data["events"]]
+        events = {
+            event.pk: event
+            for event in Event.objects.filter(pk__in=event_ids).only(
+                "id", "heed_penalties", "merge_time", "legacy_registration_count"
+            )
+        }
+        eligibility = UserEventEligibility(user)
+        eligibility.load(events.values())
+        registration_counts = dict(
+            Registration.objects.filter(
+                pool__event_id__in=event_ids, pool__deleted=False
+            )
+            .order_by()
+            .values("pool__event_id")
+            .annotate(count=Count("id"))
+            .values_list("pool__event_id", "count")
+        )
+
+        data["events"] = [
+            {
+                **event_data,
+                "activation_time": eligibility.activation_time(event),
+                "is_admitted": eligibility.is_admitted(event),
+                "registration_count": registration_counts.get(event.pk, 0)
+                + event.legacy_registration_count,
+            }
+            for event_data in data["events"]
+            if (event := events.get(event_data["id"]))
+        ]
+        if data["poll"]:
+            data["poll"] = {
+                **data["poll"],
+                "has_answered": Poll.objects.filter(
+                    pk=data["poll"]["id"], answered_users=user
+                ).exists(),
+            }
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+
+
+class ICalConfig(AppConfig):
+    name = "lego.apps.ical"
+
+    def ready(self):
+        from lego.apps.events.models import Event
+        from lego.apps.ical.signals import ical_feed_invalidation_callback
+
+        post_save.connect(ical_feed_invalidation_callback, sender=Event)
+        post_delete.connect(ical_feed_invalidation_callback, sender=Event)
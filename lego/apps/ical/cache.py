@@ -0,0 +1,75 @@
+import time
+from hashlib import md5, sha1
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class ICalCache:
+    """
+    Cached calendars and the fragments they are built from.
+
+    Each VEVENT is cached by the object, its updated_at and the arguments that vary between
+    feeds, so nothing has to be invalidated. The events feed is the same for every user in a
+    visibility bucket and is cached whole, saving an event bumps the version.
+    """
+
+    ITEM_KEY = "ical_item_"
+    FEED_KEY = "ical_feed_"
+    VERSION_KEY = "ical_feed_version"
+    VALIDATORS_KEY = "ical_validators_"
+
+    @classmethod
+    def item_key(cls, *parts):
+        return f"{cls.ITEM_KEY}{sha1(repr(parts).encode()).hexdigest()}"
+
+    @classmethod
+    def get_items(cls, keys):
+        if not settings.ICAL_ITEM_CACHE_TIMEOUT:
+            return {}
+        return cache.get_many(keys)
+
+    @classmethod
+    def set_items(cls, items):
+        if settings.ICAL_ITEM_CACHE_TIMEOUT:
+            cache.set_many(items, timeout=settings.ICAL_ITEM_CACHE_TIMEOUT)
+
+    @classmethod
+    def get_feed(cls, bucket):
+        key = f"{cls.FEED_KEY}{bucket}"
+        values = cache.get_many([cls.VERSION_KEY, key])
+        cached = values.get(key)
+        if cached and cached[0] == values.get(cls.VERSION_KEY, 0):
+            return cached[1]
+        return None
+
+    @classmethod
+    def set_feed(cls, bucket, content):
+        version = cache.get(cls.VERSION_KEY, 0)
+        cache.set(
+            f"{cls.FEED_KEY}{bucket}",
+            (version, content),
+            timeout=settings.ICAL_FEED_CACHE_TIMEOUT,
+        )
+
+    @classmethod
+    def invalidate(cls):
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, timeout=None)
+
+    @classmethod
+    def get_validators(cls, key, content):
+        """
+        ETag and Last-Modified timestamp of a calendar. The modification time is kept for as
+        long as the content of the calendar at the key stays the same.
+        """
+        etag = f'"{md5(content).hexdigest()}"'
+        cache_key = f"{cls.VALIDATORS_KEY}{key}"
+        cached = cache.get(cache_key)
+        if cached and cached[0] == etag:
+            return cached
+        validators = (etag, int(time.time()))
+        cache.set(cache_key, validators, timeout=settings.ICAL_VALIDATORS_TIMEOUT)
+        return validators
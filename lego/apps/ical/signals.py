@@ -0,0 +1,7 @@
+from django.db import transaction
+
+from lego.apps.ical.cache import ICalCache
+
+
+def ical_feed_invalidation_callback(sender, instance, **kwargs):
+    transaction.on_commit(ICalCache.invalidate)
@@ -1,13 +1,19 @@
 import re
 from datetime import timedelta
+from io import BytesIO
+from unittest import mock
 
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 
+from django_ical.feedgenerator import ICal20Feed
 from icalendar.cal import Calendar
 
 from lego.apps.events.models import Event, Pool
+from lego.apps.ical import utils
 from lego.apps.ical.models import ICalToken
 from lego.apps.meetings.models import Meeting
 from lego.apps.permissions.constants import VIEW
@@ -243,6 +249,118 @@ class IcalEventsTestCase(BaseAPITestCase):
             self.assertEqual(int(pk), self.event.pk)
 
 
+class ICalCacheTestCase(BaseAPITestCase):
+    fixtures = ["test_abakus_groups.yaml", "test_users.yaml"]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username="test1")
+        AbakusGroup.objects.get(name="Abakus").add_user(self.user)
+        self.token = ICalToken.objects.get_or_create(user=self.user)[0].token
+        self.events_url = _get_ical_events_url(self.token)
+        self.event = Event.objects.create(
+            title="Event",
+            event_type=0,
+            start_time=timezone.now() + timedelta(hours=7),
+            end_time=timezone.now() + timedelta(hours=10),
+            require_auth=False,
+        )
+
+    def test_cached_items_match_regular_items(self):
+        item = {
+            "title": "Event",
+            "link": "/events/1/",
+            "description": "Description",
+            "unique_id": "event-1@abakus.no",
+            "start_datetime": self.event.start_time,
+            "end_datetime": self.event.end_time,
+        }
+        regular = ICal20Feed(title="Events", link="/", description="Events")
+        regular.add_item(**item)
+        cached = utils.ICalFeed(title="Events", link="/", description="Events")
+        cached.add_cached_item("event-1", lambda: item)
+
+        content = BytesIO()
+        regular.write(content, "utf-8")
+        self.assertEqual(content.getvalue(), utils.render_ical(cached))
+
+    def test_unchanged_calendar_is_not_modified(self):
+        res = self.client.get(self.events_url)
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+
+        res = self.client.get(self.events_url, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, res.status_code)
+        self.assertEqual(b"", res.content)
+
+        res = self.client.get(
+            self.events_url, HTTP_IF_MODIFIED_SINCE=res["Last-Modified"]
+        )
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, res.status_code)
+
+    def test_changed_calendar_is_sent(self):
+        etag = self.client.get(self.events_url)["ETag"]
+        self.event.title = "Changed"
+        self.event.save()
+
+        res = self.client.get(self.events_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertNotEqual(etag, res["ETag"])
+
+    @override_settings(ICAL_ITEM_CACHE_TIMEOUT=60)
+    def test_items_are_rendered_once(self):
+        with mock.patch.object(
+            utils.loader, "get_template", wraps=utils.loader.get_template
+        ) as get_template:
+            self.client.get(self.events_url)
+            self.client.get(self.events_url)
+            self.assertEqual(1, get_template.call_count)
+
+            self.event.title = "Changed"
+            self.event.save()
+            ical_events = _get_ical_events(self.events_url, self.client)
+
+        self.assertEqual(2, get_template.call_count)
+        self.assertEqual("Changed", ical_events[0]["SUMMARY"])
+
+    @override_settings(ICAL_FEED_CACHE_TIMEOUT=60)
+    def test_events_feed_is_cached_until_events_change(self):
+        self.client.get(self.events_url)
+        Event.objects.filter(pk=self.event.pk).update(title="Updated")
+        ical_events = _get_ical_events(self.events_url, self.client)
+        self.assertEqual("Event", ical_events[0]["SUMMARY"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.title = "Saved"
+            self.event.save()
+        ical_events = _get_ical_events(self.events_url, self.client)
+        self.assertEqual("Saved", ical_events[0]["SUMMARY"])
+
+    @override_settings(ICAL_FEED_CACHE_TIMEOUT=60)
+    def test_events_feed_for_list_users_in_different_groups(self):
+        """Users with list permissions share a feed with every event"""
+        abakom_event = Event.objects.create(
+            title="AbakomEvent",
+            event_type=0,
+            start_time=timezone.now() + timedelta(hours=7),
+            end_time=timezone.now() + timedelta(hours=10),
+            require_auth=True,
+        )
+        abakom_event.can_view_groups.add(AbakusGroup.objects.get(name="Abakom"))
+        limited_admin = User.objects.get(username="test2")
+        AbakusGroup.objects.get(name="EventTypeLimitTest").add_user(limited_admin)
+        admin = User.objects.get(username="useradmin_test")
+        AbakusGroup.objects.get(name="EventAdminTest").add_user(admin)
+        AbakusGroup.objects.get(name="Abakom").add_user(admin)
+
+        for user in [limited_admin, admin]:
+            token = ICalToken.objects.get_or_create(user=user)[0].token
+            ical_events = _get_ical_events(_get_ical_events_url(token), self.client)
+            self.assertEqual(
+                {str(self.event.pk), str(abakom_event.pk)},
+                {_get_ical_event_meta(ical_event)[1] for ical_event in ical_events},
+            )
+
+
 class ICalTokenGenerateTestCase(BaseAPITestCase):
     fixtures = ["test_abakus_groups.yaml", "test_users.yaml"]
 
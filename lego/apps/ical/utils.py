@@ -1,12 +1,68 @@
+from io import BytesIO
 from urllib.parse import urlsplit
 
 from django.conf import settings
 from django.http import HttpResponse
 from django.template import loader
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
 from django_ical import feedgenerator
+from icalendar import Calendar
 
 from lego.apps.ical import constants
+from lego.apps.ical.cache import ICalCache
+
+END_CALENDAR = b"END:VCALENDAR\r\n"
+
+
+class ICalFeed(feedgenerator.ICal20Feed):
+    """
+    ICal20Feed with cached items. Cached items are added with a function returning the
+    arguments to add_item, which is only called when the rendered VEVENT isn't cached.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cached_items = []
+
+    def add_cached_item(self, cache_key, get_item):
+        self.cached_items.append((cache_key, get_item))
+
+    def render_items(self, items):
+        feed = feedgenerator.ICal20Feed(title="", link="", description="")
+        for item in items:
+            feed.add_item(**item)
+        calendar = Calendar()
+        feed.write_items(calendar)
+        return [component.to_ical() for component in calendar.subcomponents]
+
+    def write(self, outfile, encoding):
+        keys = [cache_key for cache_key, _ in self.cached_items]
+        fragments = ICalCache.get_items(keys)
+        missing = [
+            (cache_key, get_item)
+            for cache_key, get_item in self.cached_items
+            if cache_key not in fragments
+        ]
+        rendered = dict(
+            zip(
+                [cache_key for cache_key, _ in missing],
+                self.render_items(get_item() for _, get_item in missing),
+                strict=True,
+            )
+        )
+        ICalCache.set_items(rendered)
+        fragments.update(rendered)
+
+        # The cached items are written after the regular items
+        calendar = BytesIO()
+        super().write(calendar, encoding)
+        outfile.write(
+            calendar.getvalue().removesuffix(END_CALENDAR)
+            + b"".join(fragments[cache_key] for cache_key in keys)
+            + END_CALENDAR
+        )
 
 
 def add_events_to_ical_feed(
@@ -24,48 +80,83 @@ def add_meetings_to_ical_feed(feed, meetings, user):
 def add_event_to_ical_feed(
     feed, event, price=None, title=None, ical_starttime=None, ical_endtime=None
 ):
-    desc_context = {"description": event.description, "url": event.get_absolute_url()}
-    if price is not None:
-        desc_context["price"] = int(price / 100)  # Price is in øre NOK, show as NOK
-
-    desc_template = loader.get_template("ical/event_description.txt")
-    feed.add_item(
-        title=event.title if title is None else title,
-        unique_id=f"event-{event.id}@abakus.no",
-        link=event.get_absolute_url(),
-        description=desc_template.render(desc_context),
-        start_datetime=event.start_time if ical_starttime is None else ical_starttime,
-        end_datetime=event.end_time if ical_endtime is None else ical_endtime,
-        location=event.location,
+    def get_item():
+        desc_context = {
+            "description": event.description,
+            "url": event.get_absolute_url(),
+        }
+        if price is not None:
+            desc_context["price"] = int(price / 100)  # Price is in øre NOK, show as NOK
+
+        desc_template = loader.get_template("ical/event_description.txt")
+        return {
+            "title": event.title if title is None else title,
+            "unique_id": f"event-{event.id}@abakus.no",
+            "link": event.get_absolute_url(),
+            "description": desc_template.render(desc_context),
+            "start_datetime": (
+                event.start_time if ical_starttime is None else ical_starttime
+            ),
+            "end_datetime": event.end_time if ical_endtime is None else ical_endtime,
+            "location": event.location,
+        }
+
+    feed.add_cached_item(
+        ICalCache.item_key(
+            "event",
+            event.id,
+            event.updated_at,
+            price,
+            title,
+            ical_starttime,
+            ical_endtime,
+        ),
+        get_item,
     )
 
 
 def add_meeting_to_ical_feed(feed, meeting, user):
-    desc_context = {
-        "title": meeting.title,
-        "report": meeting.report,
-        "description": meeting.description,
-        "reportAuthor": (
-            meeting.report_author.full_name if meeting.report_author else "Ikke valgt"
+    # This uses an annotation on the queryset for performance reasons
+    transparency = "OPAQUE" if meeting.user_participating else "TRANSPARENT"
+
+    def get_item():
+        desc_context = {
+            "title": meeting.title,
+            "report": meeting.report,
+            "description": meeting.description,
+            "reportAuthor": (
+                meeting.report_author.full_name
+                if meeting.report_author
+                else "Ikke valgt"
+            ),
+            "url": meeting.get_absolute_url(),
+        }
+        desc_template = loader.get_template("ical/meeting_description.txt")
+        return {
+            "title": meeting.title,
+            "unique_id": f"meeting-{meeting.id}@abakus.no",
+            "link": meeting.get_absolute_url(),
+            "description": desc_template.render(desc_context),
+            "start_datetime": meeting.start_time,
+            "end_datetime": meeting.end_time,
+            "location": meeting.location,
+            "transparency": transparency,
+        }
+
+    feed.add_cached_item(
+        ICalCache.item_key(
+            "meeting",
+            meeting.id,
+            meeting.updated_at,
+            meeting.report_author_id,
+            transparency,
         ),
-        "url": meeting.get_absolute_url(),
-    }
-    desc_template = loader.get_template("ical/meeting_description.txt")
-    feed.add_item(
-        title=meeting.title,
-        unique_id=f"meeting-{meeting.id}@abakus.no",
-        link=meeting.get_absolute_url(),
-        description=desc_template.render(desc_context),
-        start_datetime=meeting.start_time,
-        end_datetime=meeting.end_time,
-        location=meeting.location,
-        # This uses an annotation on the queryset for performance reasons
-        transparency="OPAQUE" if meeting.user_participating else "TRANSPARENT",
+        get_item,
     )
 
 
 def generate_ical_feed(request, calendar_type):
-    return feedgenerator.ICal20Feed(
+    return ICalFeed(
         title=get_calendar_name(calendar_type),
         link=request.get_full_path(),
         description=get_calendar_description(calendar_type),
@@ -75,12 +166,26 @@ def generate_ical_feed(request, calendar_type):
     )
 
 
-def render_ical_response(feed, calendar_type):
-    response = HttpResponse(content_type="text/calendar")
-    feed.write(response, "utf-8")
+def render_ical(feed):
+    content = BytesIO()
+    feed.write(content, "utf-8")
+    return content.getvalue()
+
+
+def render_ical_response(request, content, calendar_type, key):
+    """
+    Respond with a calendar, or 304 Not Modified when the client has the same calendar. The
+    key identifies the calendar of the user, for the Last-Modified timestamp.
+    """
+    etag, last_modified = ICalCache.get_validators(f"{calendar_type}:{key}", content)
+    response = HttpResponse(content, content_type="text/calendar")
     response["Content-Disposition"] = f'attachment; filename="{calendar_type}.ics"'
     response["Filename"] = f"{calendar_type}.ics"
-    return response
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response
+    )
 
 
 def get_frontend_domain():
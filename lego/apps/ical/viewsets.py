@@ -8,13 +8,17 @@ from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
 from lego.apps.events.constants import INTEREST_EVENT
+from lego.apps.events.eligibility import UserEventEligibility
 from lego.apps.events.models import Event
+from lego.apps.frontpage.cache import get_visibility_bucket
 from lego.apps.ical import constants, utils
 from lego.apps.ical.authentication import ICalTokenAuthentication
+from lego.apps.ical.cache import ICalCache
 from lego.apps.ical.models import ICalToken
 from lego.apps.ical.serializers import ICalTokenSerializer
 from lego.apps.meetings import constants as meeting_constants
 from lego.apps.meetings.models import Meeting, MeetingInvitation
+from lego.apps.permissions.constants import LIST
 from lego.apps.permissions.utils import get_permission_handler
 
 
@@ -111,7 +115,9 @@ class ICalViewset(viewsets.ViewSet):
         utils.add_events_to_ical_feed(feed, following_events)
         utils.add_meetings_to_ical_feed(feed, meetings, request.user)
 
-        return utils.render_ical_response(feed, calendar_type)
+        return utils.render_ical_response(
+            request, utils.render_ical(feed), calendar_type, request.user.pk
+        )
 
     @decorators.action(detail=False, methods=["GET"])
     def registrations(self, request):
@@ -129,8 +135,13 @@ class ICalViewset(viewsets.ViewSet):
             .exclude(event_type=INTEREST_EVENT),
         )
 
+        events = list(events)
+        eligibility = UserEventEligibility(request.user)
+        eligibility.load(events)  # type: ignore[arg-type]
+        is_abakus_member = request.user.is_abakus_member
+
         for event in events:
-            reg_time = event.get_earliest_registration_time(request.user)
+            reg_time = eligibility.activation_time(event)  # type: ignore[arg-type]
             if not reg_time:  # User cannot register
                 continue
 
@@ -138,7 +149,9 @@ class ICalViewset(viewsets.ViewSet):
             ical_endtime = ical_starttime + timedelta(
                 minutes=constants.REGISTRATION_EVENT_LENGTH_IN_MINUTES
             )
-            price = event.get_price(request.user) if event.is_priced else None
+            price = None
+            if event.is_priced:
+                price = event.price_member if is_abakus_member else event.price_guest
             title = f"Reg: {event.title}"
 
             utils.add_event_to_ical_feed(
@@ -149,28 +162,42 @@ class ICalViewset(viewsets.ViewSet):
                 ical_starttime=ical_starttime,
                 ical_endtime=ical_endtime,
             )
-        return utils.render_ical_response(feed, calendar_type)
+        return utils.render_ical_response(
+            request, utils.render_ical(feed), calendar_type, request.user.pk
+        )
 
     @decorators.action(detail=False, methods=["GET"])
     def events(self, request):
         """Event ical route."""
         calendar_type = constants.TYPE_EVENTS
-        feed = utils.generate_ical_feed(request, calendar_type)
 
-        permission_handler = get_permission_handler(Event)
-        events = permission_handler.filter_queryset(
-            request.user,
-            # Interest events stay out of the general feed, like on the
-            # frontpage and event list. Registered users get them through
-            # the personal feed via their FollowEvent.
+        # Interest events stay out of the general feed, like on the
+        # frontpage and event list. Registered users get them through
+        # the personal feed via their FollowEvent.
+        events_base = (
             Event.objects.all()
             .filter(
                 end_time__gt=timezone.now()
                 - timedelta(days=constants.HISTORY_BACKWARDS_IN_DAYS)
             )
-            .exclude(event_type=INTEREST_EVENT),
+            .exclude(event_type=INTEREST_EVENT)
+        )
+        permission_handler = get_permission_handler(Event)
+        if permission_handler.has_perm(request.user, LIST, queryset=events_base):
+            events = events_base
+        else:
+            events = permission_handler.filter_queryset(request.user, events_base)
+
+        # The feed is the same for all users who can see the same events
+        bucket = get_visibility_bucket(request.user, [events])
+        content = ICalCache.get_feed(bucket) if bucket else None
+        if content is None:
+            feed = utils.generate_ical_feed(request, calendar_type)
+            utils.add_events_to_ical_feed(feed, events)
+            content = utils.render_ical(feed)
+            if bucket:
+                ICalCache.set_feed(bucket, content)
+
+        return utils.render_ical_response(
+            request, content, calendar_type, bucket or request.user.pk
         )
-
-        utils.add_events_to_ical_feed(feed, events)
-
-        return utils.render_ical_response(feed, calendar_type)
@@ -1,4 +1,5 @@
-from django.contrib.auth.models import update_last_login
+from django.conf import settings
+from django.utils import timezone
 
 from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 from structlog import get_logger
@@ -17,8 +18,28 @@ class Authentication(JSONWebTokenAuthentication):
         if authentication:
             user = authentication[0]
             log.bind(current_user=user.id)
-            update_last_login(None, user)
-            user.inactive_notified_counter = 0
-            user.save()
+            self.update_last_seen(user)
 
         return authentication
+
+    @staticmethod
+    def update_last_seen(user):
+        """
+        Track activity without writing the user row on every request. last_login is only
+        updated when it is older than USER_LAST_SEEN_INTERVAL, and the inactive counter is
+        only reset when it is set. Only the changed columns are written.
+        """
+        now = timezone.now()
+        updates = {}
+        if (
+            user.last_login is None
+            or now - user.last_login >= settings.USER_LAST_SEEN_INTERVAL
+        ):
+            updates["last_login"] = now
+        if user.inactive_notified_counter:
+            updates["inactive_notified_counter"] = 0
+
+        if updates:
+            type(user).objects.filter(pk=user.pk).update(**updates)
+            for field, value in updates.items():
+                setattr(user, field, value)
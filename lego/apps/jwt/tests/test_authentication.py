@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from lego.apps.jwt.handlers import get_jwt_token
+from lego.apps.users.models import User
+from lego.utils.test_utils import BaseAPITestCase
+
+
+class LastSeenTestCase(BaseAPITestCase):
+    fixtures = ["test_users.yaml"]
+
+    def setUp(self):
+        self.user = User.objects.get(username="test1")
+        self.header = {
+            "HTTP_AUTHORIZATION": f"Bearer {get_jwt_token(self.user)['token']}"
+        }
+
+    def _user_updates(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get("/api/v1/users/me/", **self.header)
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('UPDATE "users_user"')
+        ]
+
+    def test_updates_stale_last_login(self):
+        User.objects.filter(pk=self.user.pk).update(
+            last_login=timezone.now() - timedelta(days=1)
+        )
+        updates = self._user_updates()
+
+        self.assertEqual(1, len(updates))
+        self.assertIn('"last_login"', updates[0])
+        self.assertNotIn('"username"', updates[0])
+        last_login = User.objects.get(pk=self.user.pk).last_login
+        self.assertLess(timezone.now() - last_login, timedelta(minutes=1))
+
+    def test_recent_last_login_is_not_written(self):
+        User.objects.filter(pk=self.user.pk).update(last_login=timezone.now())
+        self.assertEqual([], self._user_updates())
+
+    def test_resets_inactive_counter(self):
+        User.objects.filter(pk=self.user.pk).update(
+            last_login=timezone.now(), inactive_notified_counter=2
+        )
+        updates = self._user_updates()
+
+        self.assertEqual(1, len(updates))
+        self.assertNotIn('"last_login"', updates[0])
+        self.assertEqual(0, User.objects.get(pk=self.user.pk).inactive_notified_counter)
@@ -8,6 +8,7 @@ from lego import celery_app
 from lego.apps.meetings import constants
 from lego.apps.meetings.models import Meeting, MeetingInvitation
 from lego.apps.meetings.notifications import MeetingInvitationReminderNotification
+from lego.apps.notifications.notification import Notification
 from lego.utils.tasks import AbakusTask
 
 log = get_logger()
@@ -25,6 +26,7 @@ def notify_user_of_unanswered_meeting_invitation(self, logger_context=None):
         created_at__lte=timezone.now() - timedelta(days=2),
     )
 
+    notifications = []
     for meeting in meetings:
         # Only send reminder if it's 7, 5, 3 or 1 day till start
         if (
@@ -35,17 +37,20 @@ def notify_user_of_unanswered_meeting_invitation(self, logger_context=None):
 
         meeting_invitations: list[MeetingInvitation] = meeting.invitations.filter(
             status=constants.NO_ANSWER
-        )
+        ).select_related("user", "meeting__report_author")
         for meeting_invitation in meeting_invitations:
             log.info(
                 "user_notified_of_unanswered_meeting_invitation",
                 meeting_id=meeting.id,
                 user_id=meeting_invitation.user.id,
             )
-            notification = MeetingInvitationReminderNotification(
-                meeting_invitation.user, meeting_invitation=meeting_invitation
+            notifications.append(
+                MeetingInvitationReminderNotification(
+                    meeting_invitation.user, meeting_invitation=meeting_invitation
+                )
             )
-            notification.notify()
+
+    Notification.notify_all(notifications)
 
 
 @celery_app.task(base=AbakusTask, bind=True)
@@ -11,7 +11,7 @@ from lego.apps.users.models import User
 from lego.utils.test_utils import BaseTestCase
 
 
-@mock.patch("lego.apps.meetings.tasks.MeetingInvitationReminderNotification.notify")
+@mock.patch("lego.apps.meetings.tasks.MeetingInvitationReminderNotification.generate")
 class RegistrationReminderTestCase(BaseTestCase):
     fixtures = [
         "test_meetings.yaml",
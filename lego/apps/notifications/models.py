@@ -48,6 +48,29 @@ class NotificationSetting(models.Model):
         try:
             setting = cls.objects.get(user=user, notification_type=notification_type)
         except cls.DoesNotExist:
+            setting = None
+
+        return cls._channels(setting)
+
+    @classmethod
+    def active_channels_by_user(cls, users, notification_type):
+        """
+        Return the active notification channels of many users by user id, using one query.
+        """
+        if notification_type not in NOTIFICATION_TYPES:
+            raise ValueError("You asked for an invalid notification_type")
+
+        settings = {
+            setting.user_id: setting
+            for setting in cls.objects.filter(
+                user__in=users, notification_type=notification_type
+            )
+        }
+        return {user.pk: cls._channels(settings.get(user.pk)) for user in users}
+
+    @staticmethod
+    def _channels(setting):
+        if setting is None:
             # No setting equals all channels
             return CHANNELS
 
@@ -72,14 +95,11 @@ class Announcement(BasisModel):
     Send important messages to selected recipients.
     A notification is created when a message is saved.
     This works in the same way as restricted mail.
-    The lookup functions on the relations is called announcement_lookup.
     """
 
     message = models.TextField()
     sent = models.DateTimeField(null=True, default=None)
 
-    MANY_TO_MANY_RELATIONS = ["users", "groups"]
-
     users = models.ManyToManyField("users.User", blank=True)
     groups = models.ManyToManyField("users.AbakusGroup", blank=True)
     events = models.ManyToManyField("events.Event", blank=True)
@@ -100,23 +120,17 @@ class Announcement(BasisModel):
         """
         Lookup users that should receive this message.
         """
-        all_users = []
-
-        for relation_name in self.MANY_TO_MANY_RELATIONS:
-            relation = getattr(self, relation_name)
-            for instance in relation.all():
-                announcement_lookup = getattr(instance, "announcement_lookup", None)
-                if announcement_lookup:
-                    users = announcement_lookup()
-                    all_users += list(users)
-
-        for event in self.events.all():
-            all_users += event.announcement_lookup(self.exclude_waiting_list)
-
-        for meeting in self.meetings.all():
-            all_users += meeting.announcement_lookup(self.meeting_invitation_status)
-
-        return list(set(all_users))
+        from lego.apps.notifications.recipients import Recipients
+
+        recipients = Recipients(
+            users=self.users.all(),
+            groups=self.groups.all(),
+            events=self.events.all(),
+            meetings=self.meetings.all(),
+            exclude_waiting_list=self.exclude_waiting_list,
+            meeting_invitation_status=self.meeting_invitation_status,
+        )
+        return list(recipients.get_users())
 
     def send(self):
         if self.sent:
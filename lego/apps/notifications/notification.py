@@ -1,13 +1,34 @@
+from itertools import groupby
+
+from django.conf import settings
+
 from structlog import get_logger
 
 from lego.utils.content_types import instance_to_string
-from lego.utils.tasks import send_email, send_push
+from lego.utils.tasks import send_email, send_emails, send_push, send_pushes
 
 from .models import NotificationSetting
 
 log = get_logger()
 
 
+class NotificationBatch:
+    """
+    Messages generated by Notification.notify_all, sent by a few batched celery tasks.
+    """
+
+    def __init__(self):
+        self.mails = []
+        self.pushes = []
+
+    def send(self):
+        batch_size = settings.NOTIFICATION_BATCH_SIZE
+        for i in range(0, len(self.mails), batch_size):
+            send_emails.delay(messages=self.mails[i : i + batch_size])
+        for i in range(0, len(self.pushes), batch_size):
+            send_pushes.delay(messages=self.pushes[i : i + batch_size])
+
+
 class Notification:
     """
     Lookup notifications settings and use this to notify the user on activated channels.
@@ -19,6 +40,7 @@ class Notification:
         self.user = user
         self.args = (args,)
         self.kwargs = kwargs
+        self.batch = None
 
     def notify(self):
         """
@@ -27,18 +49,57 @@ class Notification:
         if self.name is None:
             raise ValueError("Set a name on the notification class.")
 
-        generators = {"email": self.generate_mail, "push": self.generate_push}
-
         channels = NotificationSetting.active_channels(self.user, self.name)
+        self.generate(channels)
+
+    def generate(self, channels):
+        generators = {"email": self.generate_mail, "push": self.generate_push}
 
         for channel in channels:
             generator = generators.get(channel)
             generator()
 
+    @classmethod
+    def notify_many(cls, users, *args, **kwargs):
+        """
+        Notify many users with the same arguments, see notify_all.
+        """
+        cls.notify_all([cls(user, *args, **kwargs) for user in users])
+
+    @staticmethod
+    def notify_all(notifications):
+        """
+        Notify on the selected channels of many notifications. The settings are looked up with
+        one query per notification type, and the messages are sent in batches.
+        """
+        batch = NotificationBatch()
+        notifications = sorted(
+            notifications, key=lambda notification: notification.name
+        )
+
+        for name, group in groupby(
+            notifications, lambda notification: notification.name
+        ):
+            if name is None:
+                raise ValueError("Set a name on the notification class.")
+
+            group = list(group)
+            channels = NotificationSetting.active_channels_by_user(
+                [notification.user for notification in group], name
+            )
+            for notification in group:
+                notification.batch = batch
+                notification.generate(channels[notification.user.pk])
+
+        batch.send()
+
     def _delay_mail(self, *args, **kwargs):
         """
         Helper for the send_mail celery task.
         """
+        if self.batch is not None:
+            self.batch.mails.append(kwargs)
+            return None
         return send_email.delay(*args, **kwargs)
 
     def _delay_push(self, template, context, title, instance=None):
@@ -49,13 +110,17 @@ class Notification:
         if instance:
             target = instance_to_string(instance)
 
-        return send_push.delay(
-            user=self.user.id,
-            target=target,
-            title=title,
-            template=template,
-            context=context,
-        )
+        message = {
+            "user": self.user.id,
+            "target": target,
+            "title": title,
+            "template": template,
+            "context": context,
+        }
+        if self.batch is not None:
+            self.batch.pushes.append(message)
+            return None
+        return send_push.delay(**message)
 
     def generate_mail(self):
         """
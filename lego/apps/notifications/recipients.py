@@ -0,0 +1,138 @@
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import (
+    Case,
+    CharField,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Concat
+
+from lego.apps.events.constants import SUCCESS_REGISTER
+from lego.apps.events.models import Registration
+from lego.apps.meetings.models import MeetingInvitation
+from lego.apps.users.models import AbakusGroup, Membership, User
+
+from .constants import EMAIL
+from .models import NotificationSetting
+
+
+def email_address():
+    """
+    The address used to reach a user, computed by the database. Same as User.email_address.
+    """
+    if not settings.GSUITE_DOMAIN:
+        return F("email")
+
+    return Case(
+        When(
+            Q(is_active=True, internal_email__isnull=False, internal_email_enabled=True)
+            & ~Q(crypt_password_hash=""),
+            then=Concat("internal_email_id", Value(f"@{settings.GSUITE_DOMAIN}")),
+        ),
+        default=F("email"),
+        output_field=CharField(),
+    )
+
+
+def active_channel(notification_type, channel):
+    """
+    Filter users with the channel active for the notification type, see
+    NotificationSetting.active_channels. Users without a setting have all channels active.
+    """
+    return ~Exists(
+        NotificationSetting.objects.filter(
+            user=OuterRef("pk"), notification_type=notification_type
+        ).exclude(enabled=True, channels__contains=[channel])
+    )
+
+
+class Recipients:
+    """
+    Resolve the users reached through the users, groups, events and meetings of a restricted
+    mail or an announcement with one query. The relations are given as querysets and compiled
+    into subqueries, nothing is loaded before the users are.
+
+    Groups include the members of all descendant groups. With email_lists, only memberships
+    with email lists enabled count.
+    """
+
+    def __init__(
+        self,
+        users=None,
+        groups=None,
+        events=None,
+        meetings=None,
+        email_lists=False,
+        exclude_waiting_list=False,
+        meeting_invitation_status=None,
+    ):
+        self.users = users
+        self.groups = groups
+        self.events = events
+        self.meetings = meetings
+        self.email_lists = email_lists
+        self.exclude_waiting_list = exclude_waiting_list
+        self.meeting_invitation_status = meeting_invitation_status
+
+    def get_filter(self):
+        recipients = []
+
+        if self.users is not None:
+            recipients.append(Q(pk__in=self.users.values("pk")))
+
+        if self.groups is not None:
+            groups = self.groups.filter(
+                tree_id=OuterRef("tree_id"),
+                lft__lte=OuterRef("lft"),
+                rght__gte=OuterRef("rght"),
+            )
+            memberships = Membership.objects.filter(
+                user=OuterRef("pk"),
+                is_active=True,
+                abakus_group__in=AbakusGroup.objects.filter(Exists(groups)),
+            )
+            if self.email_lists:
+                memberships = memberships.filter(email_lists_enabled=True)
+            recipients.append(Exists(memberships))
+
+        if self.events is not None:
+            registrations = Registration.objects.filter(
+                user=OuterRef("pk"), event__in=self.events, status=SUCCESS_REGISTER
+            )
+            if self.exclude_waiting_list:
+                registrations = registrations.exclude(pool=None)
+            recipients.append(Exists(registrations))
+
+        if self.meetings is not None:
+            invitations = MeetingInvitation.objects.filter(
+                user=OuterRef("pk"), meeting__in=self.meetings
+            )
+            if self.meeting_invitation_status:
+                invitations = invitations.filter(status=self.meeting_invitation_status)
+            recipients.append(Exists(invitations))
+
+        if not recipients:
+            return Q(pk__in=[])
+        return reduce(or_, recipients)
+
+    def get_users(self):
+        return User.objects.filter(self.get_filter())
+
+    def get_email_addresses(self, notification_type=None):
+        """
+        The addresses of the users with email lists enabled, and with email notifications
+        active for the notification type if one is given.
+        """
+        users = self.get_users().filter(email_lists_enabled=True)
+        if notification_type:
+            users = users.filter(active_channel(notification_type, EMAIL))
+        return list(
+            users.annotate(address=email_address()).values_list("address", flat=True)
+        )
@@ -0,0 +1,188 @@
+from datetime import timedelta
+from smtplib import SMTPException, SMTPRecipientsRefused
+from unittest import mock
+
+from django.core import mail
+from django.test import override_settings
+from django.utils import timezone
+
+from celery.exceptions import Retry
+
+from lego.apps.events.tests.utils import get_dummy_users
+from lego.apps.notifications.constants import EMAIL, PUSH, WEEKLY_MAIL
+from lego.apps.notifications.models import NotificationSetting
+from lego.apps.notifications.notification import Notification
+from lego.apps.users.notifications import InactiveNotification
+from lego.utils.tasks import send_emails
+from lego.utils.test_utils import BaseTestCase
+
+
+class ExampleNotification(Notification):
+    name = WEEKLY_MAIL
+
+    def generate_mail(self):
+        return self._delay_mail(
+            to_email=self.user.email,
+            context={"name": self.user.first_name},
+            subject="Example",
+            plain_template="example.txt",
+            html_template="example.html",
+        )
+
+    def generate_push(self):
+        return self._delay_push(
+            template="example.txt", context={}, title="Example", instance=None
+        )
+
+
+@mock.patch("lego.apps.notifications.notification.send_pushes.delay")
+@mock.patch("lego.apps.notifications.notification.send_emails.delay")
+class NotifyManyTestCase(BaseTestCase):
+    fixtures = ["test_abakus_groups.yaml"]
+
+    def setUp(self):
+        self.users = get_dummy_users(4)
+        default, push, email, disabled = self.users
+        NotificationSetting.objects.create(
+            user=push, notification_type=WEEKLY_MAIL, channels=[PUSH]
+        )
+        NotificationSetting.objects.create(
+            user=email, notification_type=WEEKLY_MAIL, channels=[EMAIL]
+        )
+        NotificationSetting.objects.create(
+            user=disabled, notification_type=WEEKLY_MAIL, enabled=False
+        )
+
+    def test_channels(self, send_emails_mock, send_pushes_mock):
+        """The settings of all users are looked up with one query"""
+        default, push, email, _ = self.users
+        with self.assertNumQueries(1):
+            ExampleNotification.notify_many(self.users)
+
+        send_emails_mock.assert_called_once()
+        self.assertEqual(
+            [default.email, email.email],
+            [
+                message["to_email"]
+                for message in send_emails_mock.call_args[1]["messages"]
+            ],
+        )
+        send_pushes_mock.assert_called_once()
+        self.assertEqual(
+            [default.id, push.id],
+            [message["user"] for message in send_pushes_mock.call_args[1]["messages"]],
+        )
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=1)
+    def test_batches(self, send_emails_mock, send_pushes_mock):
+        """The messages are split into batches"""
+        ExampleNotification.notify_many(self.users)
+
+        self.assertEqual(2, send_emails_mock.call_count)
+        self.assertEqual(2, send_pushes_mock.call_count)
+
+    def test_notify(self, send_emails_mock, send_pushes_mock):
+        """A single notification is not batched"""
+        with (
+            mock.patch(
+                "lego.apps.notifications.notification.send_email.delay"
+            ) as send_email_mock,
+            mock.patch(
+                "lego.apps.notifications.notification.send_push.delay"
+            ) as send_push_mock,
+        ):
+            ExampleNotification(self.users[0]).notify()
+
+        send_email_mock.assert_called_once()
+        send_push_mock.assert_called_once()
+        send_emails_mock.assert_not_called()
+        send_pushes_mock.assert_not_called()
+
+
+class SendEmailsTestCase(BaseTestCase):
+    fixtures = ["test_abakus_groups.yaml"]
+
+    def setUp(self):
+        self.users = get_dummy_users(3)
+        for user in self.users:
+            user.last_login = timezone.now() - timedelta(days=300)
+            user.save()
+
+    def test_send_emails(self):
+        """Batched emails are rendered like single emails and sent over one connection"""
+        InactiveNotification.notify_many(self.users, max_inactive_days=365)
+
+        self.assertEqual(3, len(mail.outbox))
+        for user, email in zip(self.users, mail.outbox, strict=True):
+            self.assertEqual([user.email], email.to)
+            self.assertIn(f"Hei {user.first_name}!", email.body)
+            self.assertEqual("text/html", email.alternatives[0][1])
+
+    def messages(self):
+        return [
+            {
+                "to_email": user.email,
+                "context": {"name": user.first_name},
+                "subject": "Subject",
+                "plain_template": "users/email/deleted.txt",
+                "html_template": "users/email/deleted.html",
+            }
+            for user in self.users
+        ]
+
+    def test_refused_recipient(self):
+        """A refused recipient is skipped, the rest of the batch is sent"""
+        messages = self.messages()
+        send_messages = mail.get_connection().__class__.send_messages
+
+        def refuse_first(connection, email_messages):
+            if email_messages[0].to == [messages[0]["to_email"]]:
+                raise SMTPRecipientsRefused({messages[0]["to_email"]: (550, b"No")})
+            return send_messages(connection, email_messages)
+
+        with (
+            mock.patch(
+                "django.core.mail.backends.locmem.EmailBackend.send_messages",
+                refuse_first,
+            ),
+            mock.patch.object(send_emails, "retry", return_value=Retry()) as retry,
+        ):
+            send_emails(messages)
+
+        retry.assert_not_called()
+        self.assertEqual(
+            [[message["to_email"]] for message in messages[1:]],
+            [email.to for email in mail.outbox],
+        )
+
+    def test_render_error(self):
+        """A message that can't be rendered is skipped"""
+        messages = self.messages()
+        messages[0]["html_template"] = "does/not/exist.html"
+
+        send_emails(messages)
+
+        self.assertEqual(2, len(mail.outbox))
+
+    def test_retry_unsent(self):
+        """A retry only sends the messages not sent yet"""
+        messages = self.messages()
+        send_messages = mail.get_connection().__class__.send_messages
+
+        def fail_second(connection, email_messages):
+            if len(mail.outbox) == 1:
+                raise SMTPException("Unavailable")
+            return send_messages(connection, email_messages)
+
+        with (
+            mock.patch(
+                "django.core.mail.backends.locmem.EmailBackend.send_messages",
+                fail_second,
+            ),
+            mock.patch.object(send_emails, "retry", return_value=Retry()) as retry,
+            self.assertRaises(Retry),
+        ):
+            send_emails(messages)
+
+        self.assertEqual(1, len(mail.outbox))
+        self.assertEqual(messages[1:], retry.call_args[1]["kwargs"]["messages"])
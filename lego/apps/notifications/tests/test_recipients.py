@@ -0,0 +1,109 @@
+from lego.apps.email.models import EmailAddress
+from lego.apps.events.tests.utils import get_dummy_users
+from lego.apps.notifications.constants import EMAIL, PUSH, WEEKLY_MAIL
+from lego.apps.notifications.models import NotificationSetting
+from lego.apps.notifications.recipients import Recipients, active_channel
+from lego.apps.restricted.models import RestrictedMail
+from lego.apps.users.models import AbakusGroup, User
+from lego.utils.test_utils import BaseTestCase
+
+
+class RecipientsTestCase(BaseTestCase):
+    fixtures = ["test_abakus_groups.yaml"]
+
+    def setUp(self):
+        self.users = get_dummy_users(5)
+        self.user_ids = [user.pk for user in self.users]
+
+    def test_group_descendants(self):
+        """Members of descendant groups are included once, inactive memberships are not"""
+        parent, child, inactive, other, _ = self.users
+        AbakusGroup.objects.get(name="Abakus").add_user(parent)
+        AbakusGroup.objects.get(name="Webkom").add_user(child)
+        AbakusGroup.objects.get(name="Abakus").add_user(child)
+        AbakusGroup.objects.get(name="Webkom").add_user(inactive, is_active=False)
+        AbakusGroup.objects.get(name="Students").add_user(other)
+
+        recipients = Recipients(groups=AbakusGroup.objects.filter(name="Abakus"))
+        self.assertCountEqual([parent, child], recipients.get_users())
+
+    def test_email_lists(self):
+        """Members and users with email lists disabled are excluded from the addresses"""
+        subscribed, unsubscribed_membership, unsubscribed_user, _, _ = self.users
+        webkom = AbakusGroup.objects.get(name="Webkom")
+        webkom.add_user(subscribed)
+        webkom.add_user(unsubscribed_membership, email_lists_enabled=False)
+        webkom.add_user(unsubscribed_user)
+        unsubscribed_user.email_lists_enabled = False
+        unsubscribed_user.save()
+
+        recipients = Recipients(groups=AbakusGroup.objects.filter(name="Webkom"))
+        self.assertEqual(3, len(recipients.get_users()))
+
+        recipients.email_lists = True
+        self.assertEqual([subscribed.email], recipients.get_email_addresses())
+
+    def test_email_address(self):
+        """The address is the same as User.email_address"""
+        internal, no_password, disabled, _, _ = self.users
+        for user, enabled in [(internal, True), (no_password, True), (disabled, False)]:
+            user.internal_email = EmailAddress.objects.create(email=user.username)
+            user.internal_email_enabled = enabled
+            user.save()
+        internal.set_password("password")
+        internal.save()
+        disabled.set_password("password")
+        disabled.save()
+
+        recipients = Recipients(users=User.objects.filter(pk__in=self.user_ids))
+        self.assertCountEqual(
+            [user.email_address for user in User.objects.filter(pk__in=self.user_ids)],
+            recipients.get_email_addresses(),
+        )
+        self.assertIn(internal.internal_email_address, recipients.get_email_addresses())
+
+    def test_active_channel(self):
+        """The filter matches NotificationSetting.active_channels"""
+        disabled, push, email, no_channels, _ = self.users
+        NotificationSetting.objects.create(
+            user=disabled, notification_type=WEEKLY_MAIL, enabled=False
+        )
+        NotificationSetting.objects.create(
+            user=push, notification_type=WEEKLY_MAIL, channels=[PUSH]
+        )
+        NotificationSetting.objects.create(
+            user=email, notification_type=WEEKLY_MAIL, channels=[EMAIL]
+        )
+        NotificationSetting.objects.create(
+            user=no_channels, notification_type=WEEKLY_MAIL, channels=None
+        )
+
+        for channel in [EMAIL, PUSH]:
+            self.assertCountEqual(
+                [
+                    user
+                    for user in self.users
+                    if channel in NotificationSetting.active_channels(user, WEEKLY_MAIL)
+                ],
+                User.objects.filter(
+                    active_channel(WEEKLY_MAIL, channel), pk__in=self.user_ids
+                ),
+            )
+
+    def test_one_query(self):
+        """All relations of a restricted mail are resolved with one query"""
+        restricted_mail = RestrictedMail.objects.create(
+            from_address="test@test.com", weekly=True
+        )
+        restricted_mail.users.add(self.users[0])
+        restricted_mail.groups.add(AbakusGroup.objects.get(name="Abakus"))
+        for user in self.users[1:]:
+            AbakusGroup.objects.get(name="Students").add_user(user)
+
+        with self.assertNumQueries(1):
+            recipients = restricted_mail.lookup_recipients()
+        self.assertCountEqual([user.email for user in self.users], recipients)
+
+    def test_no_relations(self):
+        """Nothing is resolved without relations"""
+        self.assertEqual([], list(Recipients().get_users()))
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+
+
+class PermissionsConfig(AppConfig):
+    name = "lego.apps.permissions"
+
+    def ready(self):
+        from lego.apps.permissions.signals import (
+            group_permissions_callback,
+            membership_permissions_callback,
+        )
+        from lego.apps.users.models import AbakusGroup, Membership
+
+        post_save.connect(membership_permissions_callback, sender=Membership)
+        post_delete.connect(membership_permissions_callback, sender=Membership)
+        post_save.connect(group_permissions_callback, sender=AbakusGroup)
+        post_delete.connect(group_permissions_callback, sender=AbakusGroup)
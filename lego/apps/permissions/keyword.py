@@ -1,3 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+class PermissionSnapshot:
+    """
+    Precomputed group ids and keyword permissions of a user. The snapshot is cached on the
+    user instance for the rest of the request and in redis between requests.
+
+    The redis entries are invalidated per user when a membership changes, and for all users
+    by bumping the version when a group changes.
+    """
+
+    CACHE_KEY = "permission_snapshot_"
+    VERSION_KEY = "permission_snapshot_version"
+
+    __slots__ = ("group_ids", "permissions", "prefix_lengths")
+
+    def __init__(self, group_ids, permissions):
+        self.group_ids = frozenset(group_ids)
+        self.permissions = frozenset(permissions)
+        # A permission grants every keyword it is a prefix of, so we only need to check the
+        # prefixes of a keyword that have the same length as one of the permissions.
+        self.prefix_lengths = sorted({len(permission) for permission in permissions})
+
+    def has_perm(self, perm):
+        for length in self.prefix_lengths:
+            if length > len(perm):
+                break
+            if perm[:length] in self.permissions:
+                return True
+        return False
+
+    @classmethod
+    def from_groups(cls, groups):
+        permissions = set()
+        for group in groups:
+            if group.permissions:
+                permissions.update(group.permissions)
+        return cls([group.pk for group in groups], permissions)
+
+    @classmethod
+    def for_user(cls, user):
+        timeout = settings.PERMISSION_SNAPSHOT_TIMEOUT
+        if not timeout:
+            return cls.from_groups(user.all_groups)
+
+        key = f"{cls.CACHE_KEY}{user.pk}"
+        values = cache.get_many([cls.VERSION_KEY, key])
+        version = values.get(cls.VERSION_KEY, 0)
+        cached = values.get(key)
+        if cached and cached[0] == version:
+            return cls(cached[1], cached[2])
+
+        snapshot = cls.from_groups(user.all_groups)
+        cache.set(
+            key,
+            (version, list(snapshot.group_ids), list(snapshot.permissions)),
+            timeout=timeout,
+        )
+        return snapshot
+
+    @classmethod
+    def invalidate_user(cls, user_id):
+        cache.delete(f"{cls.CACHE_KEY}{user_id}")
+
+    @classmethod
+    def invalidate_all(cls):
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, timeout=None)
+
+
 class KeywordPermissions:
     """
     This class manages keyword permissions.
@@ -8,18 +82,10 @@ class KeywordPermissions:
         if user.is_anonymous:
             return set()
 
-        perms = set()
-        for group in user.all_groups:
-            available_perms = group.permissions
-            if available_perms:
-                perms.update(available_perms)
-
-        return perms
+        return set(user.permission_snapshot.permissions)
 
     @staticmethod
     def has_perm(user, perm):
-        permissions = KeywordPermissions.get_group_permissions(user)
-        for permission in permissions:
-            if perm.startswith(permission):
-                return True
-        return False
+        if user.is_anonymous:
+            return False
+        return user.permission_snapshot.has_perm(perm)
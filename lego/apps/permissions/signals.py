@@ -0,0 +1,12 @@
+from django.db import transaction
+
+from .keyword import PermissionSnapshot
+
+
+def membership_permissions_callback(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: PermissionSnapshot.invalidate_user(user_id))
+
+
+def group_permissions_callback(sender, instance, **kwargs):
+    transaction.on_commit(PermissionSnapshot.invalidate_all)
@@ -1,4 +1,8 @@
-from lego.apps.permissions.keyword import KeywordPermissions
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import override_settings
+
+from lego.apps.permissions.keyword import KeywordPermissions, PermissionSnapshot
 from lego.apps.users.models import AbakusGroup, User
 from lego.utils.test_utils import BaseTestCase
 
@@ -27,3 +31,59 @@ class KeywordPermissionsTestCase(BaseTestCase):
     def test_has_perm_incorrect(self):
         has_perm = KeywordPermissions.has_perm(self.test_user, "/sudo")
         self.assertFalse(has_perm)
+
+    def test_has_perm_anonymous(self):
+        self.assertFalse(KeywordPermissions.has_perm(AnonymousUser(), "/sudo/"))
+
+
+@override_settings(PERMISSION_SNAPSHOT_TIMEOUT=60)
+class PermissionSnapshotTestCase(BaseTestCase):
+    fixtures = ["test_abakus_groups.yaml", "test_users.yaml"]
+
+    def setUp(self):
+        self.user = User.objects.get(username="useradmin_test")
+        self.group = AbakusGroup.objects.get(name="UserAdminTest")
+        self.group.add_user(self.user)
+        cache.delete_many(
+            [
+                PermissionSnapshot.VERSION_KEY,
+                f"{PermissionSnapshot.CACHE_KEY}{self.user.pk}",
+            ]
+        )
+
+    def snapshot(self):
+        return PermissionSnapshot.for_user(User.objects.get(pk=self.user.pk))
+
+    def test_has_perm_prefix(self):
+        snapshot = PermissionSnapshot(
+            [1], ["/sudo/admin/users/", "/sudo/admin/groups/list/"]
+        )
+        self.assertTrue(snapshot.has_perm("/sudo/admin/users/"))
+        self.assertTrue(snapshot.has_perm("/sudo/admin/users/edit/"))
+        self.assertFalse(snapshot.has_perm("/sudo/admin/groups/"))
+        self.assertFalse(snapshot.has_perm("/sudo/"))
+
+    def test_snapshot_is_cached(self):
+        self.snapshot()
+        with self.assertNumQueries(1):
+            snapshot = self.snapshot()
+        self.assertIn(self.group.pk, snapshot.group_ids)
+        self.assertTrue(snapshot.has_perm("/sudo/admin/users/list/"))
+
+    def test_membership_change_invalidates(self):
+        self.assertFalse(self.snapshot().has_perm("/sudo/admin/does/not/exist"))
+        new_group = AbakusGroup.objects.create(name="new", permissions=["/sudo/admin/"])
+        with self.captureOnCommitCallbacks(execute=True):
+            new_group.add_user(self.user)
+        self.assertTrue(self.snapshot().has_perm("/sudo/admin/does/not/exist"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_group.remove_user(self.user)
+        self.assertFalse(self.snapshot().has_perm("/sudo/admin/does/not/exist"))
+
+    def test_group_permission_change_invalidates(self):
+        self.assertFalse(self.snapshot().has_perm("/sudo/admin/events/"))
+        self.group.permissions = self.group.permissions + ["/sudo/admin/events/"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.save()
+        self.assertTrue(self.snapshot().has_perm("/sudo/admin/events/"))
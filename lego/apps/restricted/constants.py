@@ -1 +1,15 @@
 RESTRICTED_TOKEN_PREFIX = "LEGOTOKEN"
+
+MESSAGE_RECEIVED = "received"
+MESSAGE_QUEUED = "queued"
+MESSAGE_SENT = "sent"
+MESSAGE_REJECTED = "rejected"
+MESSAGE_FAILED = "failed"
+
+MESSAGE_STATUSES = (
+    (MESSAGE_RECEIVED, MESSAGE_RECEIVED),
+    (MESSAGE_QUEUED, MESSAGE_QUEUED),
+    (MESSAGE_SENT, MESSAGE_SENT),
+    (MESSAGE_REJECTED, MESSAGE_REJECTED),
+    (MESSAGE_FAILED, MESSAGE_FAILED),
+)
@@ -1,10 +1,41 @@
 from django.core.mail.message import MIMEMixin
 
 
+class SharedMIMEMixin(MIMEMixin):
+    """
+    Flatten the message once and reuse the result for every recipient, only the To header
+    differs between the messages of a batch. The message must not be changed after it is sent.
+    """
+
+    def as_bytes(self, unixfrom=False, linesep="\n"):
+        flattened = self.__dict__.setdefault("_flattened", {})
+        if (unixfrom, linesep) not in flattened:
+            recipient = self["To"]
+            del self["To"]
+            message = super().as_bytes(unixfrom=unixfrom, linesep=linesep)
+            if recipient is not None:
+                self["To"] = recipient
+            # The headers end with the first empty line
+            end = 0
+            if not message.startswith(linesep.encode()):
+                end = message.index((linesep * 2).encode()) + len(linesep)
+            flattened[unixfrom, linesep] = (message[:end], message[end:])
+
+        headers, body = flattened[unixfrom, linesep]
+        recipient = self["To"]
+        if recipient is None:
+            return headers + body
+        to = self.policy.clone(linesep=linesep).fold_binary("To", recipient)
+        return headers + to + body
+
+
 class EmailMessage:
     """
     This class has the required properties and functions required to send a raw EmailMessage with
     the builtin django email backend.
+
+    The message may be shared by the messages to all recipients of a batch, the To header is
+    replaced when the message is serialized instead of copying the message per recipient.
     """
 
     def __init__(self, recipient, sender, message):
@@ -12,17 +43,22 @@ class EmailMessage:
         self.from_email = sender
         self.msg = message
         self.encoding = None
-        self.msg["To"] = recipient
+        self.set_recipient()
+
+    def set_recipient(self):
+        del self.msg["To"]
+        self.msg["To"] = self.recipient
 
     def recipients(self):
         return [self.recipient]
 
     def message(self):
         """
-        Return the message extended with the MIMEMixin.
+        Return the message extended with the SharedMIMEMixin.
         The MIMEMixin contains a custom as_bytes function required by django.
         """
-        return self.extend_instance(self.msg, MIMEMixin)
+        self.set_recipient()
+        return self.extend_instance(self.msg, SharedMIMEMixin)
 
     @staticmethod
     def extend_instance(obj, cls):
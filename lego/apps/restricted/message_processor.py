@@ -1,11 +1,9 @@
-from copy import deepcopy
 from email.message import Message
 from email.mime.text import MIMEText
 
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives, get_connection
 
-from channels.db import database_sync_to_async
 from structlog import get_logger
 
 from lego.apps.action_handlers.registry import get_handler
@@ -28,8 +26,11 @@ class MessageProcessor:
         self.message_data = message_data
         self.action_handler = get_handler(RestrictedMail)
 
-    @database_sync_to_async
     def process_message(self):
+        """
+        Look up the restricted mail and rewrite the message. Returns the restricted mail, the
+        recipients, the sender and the rewritten message, or None if the message is rejected.
+        """
         token = self.get_token(self.message)
         if not token:
             log.critical("restricted_mail_no_token_found", sender=self.sender)
@@ -57,11 +58,7 @@ class MessageProcessor:
             # Add a footer with a note about the from address rewrite.
             self.decorate(message, restricted_message.hide_sender, self.sender)
 
-        self.send(recipients, sender, message)
-        restricted_message.mark_used()
-
-        # Send a success message to the creator
-        self.action_handler.run(restricted_message, "sent")
+        return restricted_message, recipients, sender, message
 
     def get_sender(self, restricted_mail):
         """
@@ -119,14 +116,14 @@ class MessageProcessor:
         return message
 
     @staticmethod
-    def send(recipients, sender, message):
+    def send(recipients, sender, message, connection=None):
         """
-        Create a new connection and bulk send mails
+        Bulk send mails, over a new connection unless one is given. The message is shared by
+        all recipients and serialized with the To header of each recipient in turn.
         """
-        connection = get_connection(fail_silently=False)
+        connection = connection or get_connection(fail_silently=False)
         messages = [
-            EmailMessage(recipient, sender, deepcopy(message))
-            for recipient in recipients
+            EmailMessage(recipient, sender, message) for recipient in recipients
         ]
         log.info(
             "restricted_mail_process_messages", sender=sender, recipients=len(messages)
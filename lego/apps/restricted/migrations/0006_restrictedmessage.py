@@ -0,0 +1,87 @@
+# Generated by Django 5.2.17 on 2026-10-18 18:46
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("restricted", "0005_alter_restrictedmail_created_by_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RestrictedMessage",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sender", models.EmailField(max_length=254)),
+                ("raw_message", models.BinaryField()),
+                ("received", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("received", "received"),
+                            ("queued", "queued"),
+                            ("sent", "sent"),
+                            ("rejected", "rejected"),
+                        ],
+                        default="received",
+                        max_length=16,
+                    ),
+                ),
+                ("from_address", models.CharField(blank=True, max_length=255)),
+                ("message", models.BinaryField(null=True)),
+                (
+                    "restricted_mail",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="messages",
+                        to="restricted.restrictedmail",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RestrictedMessageBatch",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "recipients",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.EmailField(max_length=254), size=None
+                    ),
+                ),
+                ("sent", models.DateTimeField(null=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                (
+                    "message",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="batches",
+                        to="restricted.restrictedmessage",
+                    ),
+                ),
+            ],
+        ),
+    ]
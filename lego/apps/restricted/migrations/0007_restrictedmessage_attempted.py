@@ -0,0 +1,32 @@
+# Generated by Django 5.2.17 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("restricted", "0006_restrictedmessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restrictedmessage",
+            name="attempted",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="restrictedmessage",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("received", "received"),
+                    ("queued", "queued"),
+                    ("sent", "sent"),
+                    ("rejected", "rejected"),
+                    ("failed", "failed"),
+                ],
+                default="received",
+                max_length=16,
+            ),
+        ),
+    ]
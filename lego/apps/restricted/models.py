@@ -1,16 +1,21 @@
+from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
 from django.core import signing
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.crypto import get_random_string
 
 from structlog import get_logger
 
-from lego.apps.notifications.constants import EMAIL, WEEKLY_MAIL
-from lego.apps.notifications.models import NotificationSetting
+from lego.apps.notifications.constants import WEEKLY_MAIL
+from lego.apps.notifications.recipients import Recipients
 from lego.apps.users.models import AbakusGroup
 from lego.utils.models import BasisModel
 
+from . import constants
+from .parser import EmailParser, ParserMessageType
+
 log = get_logger()
 
 
@@ -22,12 +27,9 @@ class RestrictedMail(BasisModel):
     The creator must provide the from mail and attach the generated token to the mail for
     security reasons.
 
-    All models in the ManyToManyFields must contain a restricted_lookup function that returns a
-    tuple ([users], [raw_addresses])
+    The recipients are resolved by lego.apps.notifications.recipients.Recipients.
     """
 
-    MANY_TO_MANY_RELATIONS = ["users", "groups", "events", "meetings"]
-
     from_address = models.EmailField(db_index=True)
     hide_sender = models.BooleanField(default=False)
     token = models.CharField(max_length=128, db_index=True, unique=True)
@@ -43,7 +45,7 @@ class RestrictedMail(BasisModel):
     @classmethod
     def get_restricted_mail(cls, from_address, token):
         try:
-            return cls.objects.prefetch_related(*cls.MANY_TO_MANY_RELATIONS).get(
+            return cls.objects.get(
                 used=None, from_address=from_address.lower(), token=token
             )
         except cls.DoesNotExist:
@@ -54,36 +56,23 @@ class RestrictedMail(BasisModel):
 
     def lookup_recipients(self):
         """
-        Loop over all many-to-many relations and lookup recipients.
+        Resolve the addresses of all recipients with one query.
         """
-        all_users = []
-        all_raw_addresses = self.raw_addresses or []
-
-        for relation_name in self.MANY_TO_MANY_RELATIONS:
-            relation = getattr(self, relation_name)
-            for instance in relation.all():
-                restricted_lookup = getattr(instance, "restricted_lookup", None)
-                if restricted_lookup:
-                    users, raw_addresses = restricted_lookup()
-                    all_users += list(users)
-                    all_raw_addresses += list(raw_addresses)
-
+        groups = self.groups.all()
         if self.weekly:
-            all_users += AbakusGroup.objects.get(name="Students").restricted_lookup()[0]
-
-        recipients = set(all_raw_addresses)
-
-        for user in all_users:
-            if not user.email_lists_enabled:
-                # Don't send emails to users that don't want mail.
-                continue
-
-            if self.weekly:
-                if EMAIL not in NotificationSetting.active_channels(user, WEEKLY_MAIL):
-                    continue
-            recipients.add(user.email_address)
+            groups = AbakusGroup.objects.filter(
+                Q(restrictedmail=self) | Q(name="Students")
+            )
 
-        return list(recipients)
+        recipients = Recipients(
+            users=self.users.all(),
+            groups=groups,
+            events=self.events.all(),
+            meetings=self.meetings.all(),
+            email_lists=True,
+        )
+        addresses = recipients.get_email_addresses(WEEKLY_MAIL if self.weekly else None)
+        return list(set(addresses) | set(self.raw_addresses or []))
 
     def mark_used(self, timestamp=None):
         """
@@ -116,3 +105,71 @@ class RestrictedMail(BasisModel):
     def create_token():
         token = get_random_string(128)
         return token
+
+
+class RestrictedMessage(models.Model):
+    """
+    A message received by the SMTP server. The raw message is stored when it is received and
+    processed by a celery task. The rewritten message is stored once and delivered to the
+    recipients in batches.
+    """
+
+    sender = models.EmailField()
+    raw_message = models.BinaryField()
+    received = models.DateTimeField(default=timezone.now)
+    status = models.CharField(
+        max_length=16,
+        choices=constants.MESSAGE_STATUSES,
+        default=constants.MESSAGE_RECEIVED,
+    )
+
+    restricted_mail = models.ForeignKey(
+        RestrictedMail, null=True, on_delete=models.SET_NULL, related_name="messages"
+    )
+    from_address = models.CharField(max_length=255, blank=True)
+    message = models.BinaryField(null=True)
+    # Start of the last delivery attempt, used to find messages nobody is delivering
+    attempted = models.DateTimeField(null=True)
+
+    def parse_raw_message(self):
+        return EmailParser(
+            bytes(self.raw_message), self.sender, ParserMessageType.BYTES
+        ).parse()
+
+    def parse_message(self):
+        return EmailParser(
+            bytes(self.message), self.from_address, ParserMessageType.BYTES
+        ).parse()
+
+    def queue(self, restricted_mail, recipients, from_address, message):
+        """
+        Store the rewritten message and split the recipients into batches.
+        """
+        batch_size = settings.RESTRICTED_BATCH_SIZE
+        recipients = sorted(recipients)
+        self.restricted_mail = restricted_mail
+        self.from_address = from_address
+        self.message = message.as_bytes()
+        self.status = constants.MESSAGE_QUEUED
+        self.save()
+        RestrictedMessageBatch.objects.bulk_create(
+            RestrictedMessageBatch(
+                message=self, recipients=recipients[i : i + batch_size]
+            )
+            for i in range(0, len(recipients), batch_size)
+        )
+
+
+class RestrictedMessageBatch(models.Model):
+    """
+    A batch of recipients of a restricted message. Batches are marked as sent one by one, so a
+    delivery that fails midway is retried from the first batch not sent.
+    """
+
+    message = models.ForeignKey(
+        RestrictedMessage, on_delete=models.CASCADE, related_name="batches"
+    )
+    recipients = ArrayField(models.EmailField())
+    sent = models.DateTimeField(null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
@@ -1,6 +1,7 @@
 from django.conf import settings
-from django.utils import timezone
+from django.db import transaction
 
+from channels.db import database_sync_to_async
 from structlog import get_logger
 
 from lego.apps.restricted.exceptions import (
@@ -8,8 +9,9 @@ from lego.apps.restricted.exceptions import (
     MessageIDNotExistException,
     ParseEmailException,
 )
-from lego.apps.restricted.message_processor import MessageProcessor
+from lego.apps.restricted.models import RestrictedMessage
 from lego.apps.restricted.parser import ParserMessageType
+from lego.apps.restricted.tasks import deliver_restricted_message
 
 from .parser import SMTPEmailParser
 
@@ -34,7 +36,7 @@ class RestrictedHandler:
         parser = SMTPEmailParser(data, mailfrom, ParserMessageType.BYTES)
 
         try:
-            message = parser.parse()
+            parser.parse()
         except ParseEmailException:
             log.exception("smtp_email_parse_error")
             return CRLF.join(ERR_451 for _ in recipients)
@@ -45,7 +47,6 @@ class RestrictedHandler:
             log.exception("smtp_message_defect")
             return CRLF.join(ERR_501 for _ in recipients)
 
-        status = []
         for recipient in recipients:
             if recipient not in [
                 settings.RESTRICTED_ADDRESS,
@@ -54,19 +55,23 @@ class RestrictedHandler:
                 log.warn("restricted_incorrect_destination_address", address=recipient)
                 return ERR_511
 
-            try:
-                message_data = {
-                    "original_size": message.original_size,
-                    "received_time": timezone.now(),
-                }
-
-                message_processor = MessageProcessor(mailfrom, message, message_data)
-                await message_processor.process_message()
-
-                return OK_250
+        try:
+            await self.queue_message(mailfrom, data)
+        except Exception:
+            log.exception("smtp_queue_failure")
+            return CRLF.join(ERR_451 for _ in recipients)
 
-            except Exception:
-                log.exception("smtp_lookup_failure")
-                status.append(ERR_550)
+        return OK_250
 
-        return CRLF.join(status)
+    @staticmethod
+    @database_sync_to_async
+    def queue_message(sender, raw_message):
+        """
+        Store the raw message and leave the processing and delivery to celery, the SMTP client
+        gets its response as soon as the message is saved.
+        """
+        message = RestrictedMessage.objects.create(
+            sender=sender, raw_message=raw_message
+        )
+        transaction.on_commit(lambda: deliver_restricted_message.delay(message.id))
+        return message
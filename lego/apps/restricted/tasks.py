@@ -0,0 +1,166 @@
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from celery.utils.time import get_exponential_backoff_interval
+from structlog import get_logger
+
+from lego import celery_app
+from lego.apps.action_handlers.registry import get_handler
+from lego.apps.restricted import constants
+from lego.apps.restricted.message_processor import MessageProcessor
+from lego.apps.restricted.models import RestrictedMail, RestrictedMessage
+from lego.utils.tasks import AbakusTask
+
+log = get_logger()
+
+
+def queue_restricted_message(message):
+    """
+    Process a received message and queue the rewritten message for delivery.
+    """
+    processor = MessageProcessor(
+        message.sender,
+        message.parse_raw_message(),
+        {
+            "original_size": len(message.raw_message),
+            "received_time": message.received,
+        },
+    )
+    result = processor.process_message()
+    if result is None:
+        message.status = constants.MESSAGE_REJECTED
+        message.save(update_fields=["status"])
+        return
+
+    restricted_mail, recipients, sender, rewritten_message = result
+    message.queue(restricted_mail, recipients, sender, rewritten_message)
+    # The token is used as soon as the message is queued, a second message with the same
+    # token is rejected even if this one is still being delivered.
+    restricted_mail.mark_used()
+    log.info(
+        "restricted_mail_queued",
+        message_id=message.id,
+        recipients=len(recipients),
+        batches=message.batches.count(),
+    )
+
+
+@celery_app.task(serializer="json", bind=True, max_retries=5, base=AbakusTask)
+def deliver_restricted_message(self, message_id, logger_context=None):
+    """
+    Deliver a message received by the restricted SMTP server. The batches are sent over one
+    connection, a failed batch or connection is retried with backoff and the batches already
+    sent are kept.
+    """
+    self.setup_logger(logger_context)
+
+    with transaction.atomic():
+        message = RestrictedMessage.objects.select_for_update().get(id=message_id)
+        if message.status in (constants.MESSAGE_RECEIVED, constants.MESSAGE_QUEUED):
+            message.attempted = timezone.now()
+            message.save(update_fields=["attempted"])
+        if message.status == constants.MESSAGE_RECEIVED:
+            queue_restricted_message(message)
+
+    if message.status != constants.MESSAGE_QUEUED:
+        return
+
+    email = message.parse_message()
+    batch = None
+    try:
+        with get_connection(fail_silently=False) as connection:
+            for batch in message.batches.filter(sent=None).order_by("id"):
+                batch.attempts += 1
+                MessageProcessor.send(
+                    batch.recipients, message.from_address, email, connection
+                )
+                batch.sent = timezone.now()
+                batch.save(update_fields=["attempts", "sent"])
+    except (SMTPException, OSError) as e:
+        # OSError covers a relay that refuses or times out the connection
+        if batch is not None and batch.sent is None:
+            batch.error = str(e)
+            batch.save(update_fields=["attempts", "error"])
+        log.error(
+            "restricted_mail_batch_failed",
+            message_id=message.id,
+            batch_id=batch.id if batch else None,
+            attempts=batch.attempts if batch else None,
+        )
+        raise self.retry(
+            exc=e,
+            countdown=get_exponential_backoff_interval(
+                factor=60,
+                retries=self.request.retries,
+                maximum=1800,
+                full_jitter=True,
+            ),
+        ) from e
+
+    message.status = constants.MESSAGE_SENT
+    message.save(update_fields=["status"])
+
+    # Send a success message to the creator
+    get_handler(RestrictedMail).run(message.restricted_mail, "sent")
+
+
+@celery_app.task(serializer="json", bind=True, base=AbakusTask)
+def redeliver_restricted_messages(self, logger_context=None):
+    """
+    Deliver messages again that were received or queued, but have not been attempted for
+    RESTRICTED_REDELIVERY_DELAY, in case the task was lost or ran out of retries. Messages
+    older than RESTRICTED_DELIVERY_TIMEOUT are given up and the sender is notified.
+    """
+    self.setup_logger(logger_context)
+
+    now = timezone.now()
+    stale = RestrictedMessage.objects.annotate(
+        last_attempt=Coalesce("attempted", "received")
+    ).filter(
+        status__in=[constants.MESSAGE_RECEIVED, constants.MESSAGE_QUEUED],
+        last_attempt__lte=now - settings.RESTRICTED_REDELIVERY_DELAY,
+    )
+
+    expired = stale.filter(received__lte=now - settings.RESTRICTED_DELIVERY_TIMEOUT)
+    for message in expired.only("id", "sender"):
+        log.error("restricted_mail_delivery_failed", message_id=message.id)
+        RestrictedMessage.objects.filter(id=message.id).update(
+            status=constants.MESSAGE_FAILED
+        )
+        get_handler(RestrictedMail).run(
+            None, "failure", sender=message.sender, reason="DELIVERY_FAILED"
+        )
+
+    for message_id in stale.exclude(
+        received__lte=now - settings.RESTRICTED_DELIVERY_TIMEOUT
+    ).values_list("id", flat=True):
+        log.warn("restricted_mail_redelivered", message_id=message_id)
+        deliver_restricted_message.delay(message_id)
+
+
+@celery_app.task(serializer="json", bind=True, base=AbakusTask)
+def clean_restricted_messages(self, logger_context=None):
+    """
+    Delete the bodies of messages that are done after RESTRICTED_MESSAGE_RETENTION. The
+    messages and batches are kept as a log of the delivery.
+    """
+    self.setup_logger(logger_context)
+
+    cleaned = (
+        RestrictedMessage.objects.filter(
+            status__in=[
+                constants.MESSAGE_SENT,
+                constants.MESSAGE_REJECTED,
+                constants.MESSAGE_FAILED,
+            ],
+            received__lte=timezone.now() - settings.RESTRICTED_MESSAGE_RETENTION,
+        )
+        .exclude(raw_message=b"", message=None)
+        .update(raw_message=b"", message=None)
+    )
+    log.info("restricted_messages_cleaned", messages=cleaned)
@@ -30,3 +30,23 @@ class MessageTestCase(BaseTestCase):
         self.assertIsInstance(raw_message, Message)
         self.assertIsInstance(raw_message.as_string(), str)
         self.assertIsInstance(raw_message.as_bytes(), bytes)
+
+    def test_shared_message(self):
+        """
+        A message shared by many recipients is serialized as if it was copied per recipient
+        """
+        shared = Message()
+        shared["Subject"] = "Subject"
+        shared.set_payload("Payload")
+        first = EmailMessage("first@test.com", "sender", shared)
+        second = EmailMessage("second@test.com", "sender", shared)
+
+        for email in [first, second, first]:
+            expected = Message()
+            expected["Subject"] = "Subject"
+            expected["To"] = email.recipient
+            expected.set_payload("Payload")
+            self.assertEqual(
+                expected.as_bytes(policy=expected.policy.clone(linesep="\r\n")),
+                email.message().as_bytes(linesep="\r\n"),
+            )
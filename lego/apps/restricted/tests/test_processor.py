@@ -8,7 +8,7 @@ from lego.apps.restricted.message_processor import MessageProcessor
 from lego.apps.restricted.models import RestrictedMail
 from lego.apps.restricted.parser import EmailParser, ParserMessageType
 from lego.apps.restricted.tests.utils import read_file
-from lego.utils.test_utils import BaseTestCase, async_test
+from lego.utils.test_utils import BaseTestCase
 
 
 class MessageProcessorTestCase(BaseTestCase):
@@ -149,10 +149,9 @@ class MessageProcessorTestCase(BaseTestCase):
             first_message.keys(),
         )
 
-    @async_test
-    async def test_send_wrong_addr(self):
+    def test_send_wrong_addr(self):
         """Sending from wrong addr shouldn't crash and burn"""
         processor = MessageProcessor("test-wrong-from-addr@test.com", self.message, {})
-        await processor.process_message()
+        self.assertIsNone(processor.process_message())
 
         self.assertEqual(1, len(mail.outbox))
@@ -0,0 +1,214 @@
+from datetime import timedelta
+from smtplib import SMTPException
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.test import override_settings
+from django.utils import timezone
+
+from asgiref.sync import async_to_sync
+from celery.exceptions import Retry
+
+from lego.apps.restricted import constants
+from lego.apps.restricted.models import RestrictedMail, RestrictedMessage
+from lego.apps.restricted.smtp.handler import OK_250, RestrictedHandler
+from lego.apps.restricted.tasks import (
+    clean_restricted_messages,
+    deliver_restricted_message,
+    redeliver_restricted_messages,
+)
+from lego.apps.restricted.tests.utils import read_file
+from lego.utils.test_utils import BaseTestCase
+
+
+@override_settings(RESTRICTED_BATCH_SIZE=2)
+class DeliverRestrictedMessageTestCase(BaseTestCase):
+    fixtures = ["test_abakus_groups.yaml", "test_users.yaml"]
+
+    def setUp(self):
+        self.raw_message = read_file(
+            f"{settings.BASE_DIR}/apps/restricted/fixtures/emails/valid.txt"
+        ).encode()
+        self.addresses = [f"test{i}@test.com" for i in range(5)]
+        self.restricted_mail = RestrictedMail.objects.create(
+            from_address="test@test.com",
+            token="test_token",
+            raw_addresses=self.addresses,
+        )
+
+    def receive(self):
+        envelope = SimpleNamespace(
+            content=self.raw_message,
+            mail_from="test@test.com",
+            rcpt_tos=[f"{settings.RESTRICTED_ADDRESS}@{settings.RESTRICTED_DOMAIN}"],
+        )
+        # database_sync_to_async closes the connection used by the test transaction
+        with (
+            mock.patch("channels.db.close_old_connections"),
+            mock.patch.object(deliver_restricted_message, "delay") as delay,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = async_to_sync(RestrictedHandler().handle_DATA)(
+                None, None, envelope
+            )
+        self.assertEqual(OK_250, response)
+        message = RestrictedMessage.objects.get()
+        delay.assert_called_once_with(message.id)
+        return message
+
+    def test_handler_stores_raw_message(self):
+        """The SMTP handler saves the message and leaves the delivery to celery"""
+        message = self.receive()
+
+        self.assertEqual(self.raw_message, bytes(message.raw_message))
+        self.assertEqual(constants.MESSAGE_RECEIVED, message.status)
+        self.assertEqual(0, len(mail.outbox))
+
+    def test_deliver_in_batches(self):
+        """The recipients are split into batches and every recipient gets its own To header"""
+        message = self.receive()
+        deliver_restricted_message(message.id)
+
+        message.refresh_from_db()
+        self.assertEqual(constants.MESSAGE_SENT, message.status)
+        self.assertEqual(3, message.batches.count())
+        self.assertFalse(message.batches.filter(sent=None).exists())
+
+        self.restricted_mail.refresh_from_db()
+        self.assertIsNotNone(self.restricted_mail.used)
+
+        self.assertEqual(len(self.addresses), len(mail.outbox))
+        for email in mail.outbox:
+            self.assertEqual(email.recipients(), email.message().get_all("To"))
+        self.assertCountEqual(
+            self.addresses, [email.recipients()[0] for email in mail.outbox]
+        )
+
+    def test_retry_failed_batch(self):
+        """A failed batch keeps its state and the retry does not resend the batches before it"""
+        message = self.receive()
+        send_messages = mail.get_connection().__class__.send_messages
+        calls = []
+
+        def fail_second_batch(connection, messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise SMTPException("Unavailable")
+            return send_messages(connection, messages)
+
+        with (
+            mock.patch(
+                "django.core.mail.backends.locmem.EmailBackend.send_messages",
+                fail_second_batch,
+            ),
+            mock.patch.object(
+                deliver_restricted_message, "retry", return_value=Retry()
+            ),
+            self.assertRaises(Retry),
+        ):
+            deliver_restricted_message(message.id)
+
+        message.refresh_from_db()
+        self.assertEqual(constants.MESSAGE_QUEUED, message.status)
+        first, second, third = message.batches.order_by("id")
+        self.assertIsNotNone(first.sent)
+        self.assertIsNone(second.sent)
+        self.assertEqual(1, second.attempts)
+        self.assertEqual("Unavailable", second.error)
+        self.assertEqual(0, third.attempts)
+        self.assertEqual(2, len(mail.outbox))
+
+        deliver_restricted_message(message.id)
+
+        message.refresh_from_db()
+        self.assertEqual(constants.MESSAGE_SENT, message.status)
+        self.assertCountEqual(
+            self.addresses, [email.recipients()[0] for email in mail.outbox]
+        )
+
+    def test_rejected_message(self):
+        """A message with an unknown token is rejected and nothing is sent"""
+        self.restricted_mail.token = "other_token"
+        self.restricted_mail.save()
+        message = self.receive()
+        deliver_restricted_message(message.id)
+
+        message.refresh_from_db()
+        self.assertEqual(constants.MESSAGE_REJECTED, message.status)
+        self.assertFalse(message.batches.exists())
+
+    def test_retry_connection_error(self):
+        """A relay refusing the connection retries the delivery"""
+        message = self.receive()
+
+        with (
+            mock.patch(
+                "django.core.mail.backends.locmem.EmailBackend.open",
+                side_effect=ConnectionRefusedError(),
+            ),
+            mock.patch.object(
+                deliver_restricted_message, "retry", return_value=Retry()
+            ) as retry,
+            self.assertRaises(Retry),
+        ):
+            deliver_restricted_message(message.id)
+
+        retry.assert_called_once()
+        message.refresh_from_db()
+        self.assertEqual(constants.MESSAGE_QUEUED, message.status)
+        self.assertIsNotNone(message.attempted)
+        self.assertEqual(0, len(mail.outbox))
+
+
+class RestrictedMessageMaintenanceTestCase(BaseTestCase):
+    def create_message(self, status, received, attempted=None):
+        return RestrictedMessage.objects.create(
+            sender="sender@test.com",
+            raw_message=b"raw",
+            message=b"message",
+            status=status,
+            received=timezone.now() - received,
+            attempted=attempted and timezone.now() - attempted,
+        )
+
+    @mock.patch("lego.apps.restricted.tasks.get_handler")
+    @mock.patch.object(deliver_restricted_message, "delay")
+    def test_redeliver(self, delay, get_handler):
+        """Stale messages are delivered again, expired messages are given up"""
+        received = self.create_message(constants.MESSAGE_RECEIVED, timedelta(hours=2))
+        queued = self.create_message(
+            constants.MESSAGE_QUEUED, timedelta(hours=5), attempted=timedelta(hours=2)
+        )
+        self.create_message(
+            constants.MESSAGE_QUEUED, timedelta(hours=5), attempted=timedelta(minutes=5)
+        )
+        self.create_message(constants.MESSAGE_SENT, timedelta(hours=5))
+        expired = self.create_message(constants.MESSAGE_QUEUED, timedelta(days=3))
+
+        redeliver_restricted_messages()
+
+        self.assertCountEqual(
+            [received.id, queued.id], [call.args[0] for call in delay.call_args_list]
+        )
+        expired.refresh_from_db()
+        self.assertEqual(constants.MESSAGE_FAILED, expired.status)
+        get_handler.return_value.run.assert_called_once_with(
+            None, "failure", sender="sender@test.com", reason="DELIVERY_FAILED"
+        )
+
+    def test_clean(self):
+        """The bodies of old messages that are done are deleted"""
+        old = self.create_message(constants.MESSAGE_SENT, timedelta(days=31))
+        recent = self.create_message(constants.MESSAGE_SENT, timedelta(days=1))
+        queued = self.create_message(constants.MESSAGE_QUEUED, timedelta(days=31))
+
+        clean_restricted_messages()
+
+        old.refresh_from_db()
+        self.assertEqual(b"", bytes(old.raw_message))
+        self.assertIsNone(old.message)
+        for message in [recent, queued]:
+            message.refresh_from_db()
+            self.assertEqual(b"raw", bytes(message.raw_message))
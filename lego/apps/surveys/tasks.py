@@ -21,11 +21,12 @@ def send_survey_mail(self, logger_context=None):
         is_template=False,
         event__isnull=False,
     )
-    for survey in surveys.all():
-        for registration in survey.event.registrations.filter(
+    for survey in surveys.select_related("event"):
+        registrations = survey.event.registrations.filter(
             presence=PRESENCE_CHOICES.PRESENT
-        ):
-            notification = SurveyNotification(registration.user, survey=survey)
-            notification.notify()
+        ).select_related("user")
+        SurveyNotification.notify_many(
+            [registration.user for registration in registrations], survey=survey
+        )
         survey.sent = True
         survey.save()
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+
+
+class UsersConfig(AppConfig):
+    name = "lego.apps.users"
+
+    def ready(self):
+        from lego.apps.users.models import AbakusGroup, Membership
+        from lego.apps.users.signals import group_population_callback
+
+        for model in (AbakusGroup, Membership):
+            post_save.connect(group_population_callback, sender=model)
+            post_delete.connect(group_population_callback, sender=model)
@@ -1,16 +1,122 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, cast
+
+from django.conf import settings
 from django.contrib.auth.models import UserManager
-from django.db.models import Q
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, QuerySet, Subquery, Sum
 from django.utils import timezone
 
 from mptt.managers import TreeManager
 
 from lego.utils.managers import PersistentModelManager
 
+if TYPE_CHECKING:
+    from lego.apps.users.models import AbakusGroup, Penalty
+
 
 class AbakusGroupManager(TreeManager, PersistentModelManager):
     def get_by_natural_key(self, name):
         return self.get(name=name)
 
+    def ancestors_by_group(
+        self, groups: Iterable[AbakusGroup]
+    ) -> dict[int, list[AbakusGroup]]:
+        """
+        Return the ancestors of each group, with the root first, using one query for all
+        groups instead of one get_ancestors() query per group.
+        """
+        groups_by_pk: dict[int, AbakusGroup] = {group.pk: group for group in groups}
+        if not groups_by_pk:
+            return {}
+
+        ancestor_filter = Q()
+        for group in groups_by_pk.values():
+            ancestor_filter |= Q(
+                tree_id=group.tree_id, lft__lt=group.lft, rght__gt=group.rght
+            )
+        ancestors = cast(
+            "list[AbakusGroup]", list(self.filter(ancestor_filter).order_by("lft"))
+        )
+
+        return {
+            pk: [
+                ancestor
+                for ancestor in ancestors
+                if ancestor.tree_id == group.tree_id
+                and ancestor.lft < group.lft
+                and ancestor.rght > group.rght
+            ]
+            for pk, group in groups_by_pk.items()
+        }
+
+    POPULATION_CACHE_KEY = "group_population_"
+    POPULATION_VERSION_KEY = "group_population_version"
+
+    def populations(self, group_ids: Iterable[int]) -> dict[int, int]:
+        """
+        Return the number of distinct users with an active membership in each group or one of
+        its descendants. Counts are cached in redis until a membership or group changes.
+        """
+        pks: set[int] = set(group_ids)
+        timeout = settings.GROUP_POPULATION_TIMEOUT
+        if not timeout:
+            return self._count_populations(pks)
+
+        keys: dict[str, int] = {f"{self.POPULATION_CACHE_KEY}{pk}": pk for pk in pks}
+        values = cache.get_many([self.POPULATION_VERSION_KEY, *keys])
+        version = values.get(self.POPULATION_VERSION_KEY, 0)
+        populations: dict[int, int] = {}
+        for key, pk in keys.items():
+            cached = values.get(key)
+            if cached and cached[0] == version:
+                populations[pk] = cached[1]
+
+        missing = self._count_populations(pks - populations.keys())
+        if missing:
+            cache.set_many(
+                {
+                    f"{self.POPULATION_CACHE_KEY}{pk}": (version, count)
+                    for pk, count in missing.items()
+                },
+                timeout=timeout,
+            )
+        return populations | missing
+
+    def _count_populations(self, group_ids: set[int]) -> dict[int, int]:
+        if not group_ids:
+            return {}
+        from lego.apps.users.models import Membership
+
+        population = (
+            Membership.objects.filter(
+                deleted=False,
+                is_active=True,
+                abakus_group__deleted=False,
+                abakus_group__tree_id=OuterRef("tree_id"),
+                abakus_group__lft__gte=OuterRef("lft"),
+                abakus_group__rght__lte=OuterRef("rght"),
+            )
+            .order_by()
+            .values("abakus_group__tree_id")
+            .annotate(count=Count("user", distinct=True))
+            .values("count")
+        )
+        populations: dict[int, int | None] = dict.fromkeys(group_ids, 0)
+        populations.update(
+            self.filter(pk__in=group_ids)
+            .annotate(population=Subquery(population))
+            .values_list("pk", "population")
+        )
+        return {pk: count or 0 for pk, count in populations.items()}
+
+    def invalidate_populations(self) -> None:
+        try:
+            cache.incr(self.POPULATION_VERSION_KEY)
+        except ValueError:
+            cache.set(self.POPULATION_VERSION_KEY, 1, timeout=None)
+
 
 class AbakusGroupManagerWithoutText(AbakusGroupManager):
     def get_queryset(self, *args, **kwargs):
@@ -37,10 +143,58 @@ class AbakusUserManager(UserManager, PersistentModelManager):
             Q(username__iexact=username.lower()) | Q(email__iexact=username.lower())
         )
 
+    def all_group_ids_by_user(self, user_ids: list[int]) -> dict[int, set[int]]:
+        """
+        Return the ids of User.all_groups for many users, using two queries in total.
+        """
+        from lego.apps.users.models import AbakusGroup, Membership
+
+        memberships = Membership.objects.filter(
+            user_id__in=user_ids,
+            abakus_group__deleted=False,
+            deleted=False,
+            is_active=True,
+        ).select_related("abakus_group")
+        groups_by_user: dict[int, list[AbakusGroup]] = {}
+        for membership in memberships:
+            groups_by_user.setdefault(membership.user_id, []).append(
+                membership.abakus_group
+            )
+
+        ancestors = AbakusGroup.objects.ancestors_by_group(
+            group for groups in groups_by_user.values() for group in groups
+        )
+        group_ids: dict[int, set[int]] = {user_id: set() for user_id in user_ids}
+        for user_id, groups in groups_by_user.items():
+            for group in groups:
+                group_ids[user_id].add(group.pk)
+                group_ids[user_id].update(
+                    ancestor.pk for ancestor in ancestors[group.pk]
+                )
+        return group_ids
+
 
 class UserPenaltyManager(PersistentModelManager):
-    def valid(self):
+    def valid(self) -> QuerySet[Penalty]:
         from lego.apps.users.models import Penalty
 
         offset = Penalty.penalty_offset(timezone.now(), False)
-        return super().filter(created_at__gt=timezone.now() - offset)
+        return cast(
+            "QuerySet[Penalty]",
+            super().filter(created_at__gt=timezone.now() - offset),
+        )
+
+    def weights_by_user(self, user_ids: list[int]) -> dict[int, int]:
+        """
+        Return the total weight of valid penalties for each user, like
+        User.number_of_penalties() for many users in one query.
+        """
+        weights = (
+            self.valid()
+            .filter(user_id__in=user_ids)
+            .order_by()
+            .values("user_id")
+            .annotate(total=Sum("weight"))
+            .values_list("user_id", "total")
+        )
+        return dict.fromkeys(user_ids, 0) | dict(weights)
@@ -20,6 +20,7 @@ from lego.apps.email.models import EmailList
 from lego.apps.events.constants import PRESENCE_CHOICES
 from lego.apps.external_sync.models import GSuiteAddress, PasswordHashUser
 from lego.apps.files.models import FileField
+from lego.apps.permissions.keyword import PermissionSnapshot
 from lego.apps.permissions.validators import KeywordPermissionValidator
 from lego.apps.users import constants
 from lego.apps.users.managers import (
@@ -192,7 +193,7 @@ class AbakusGroup(MPTTModel, PersistentModel):
 
     @abakus_cached_property
     def number_of_users(self) -> int:
-        return self.memberships.distinct("user").count()
+        return AbakusGroup.objects.populations([self.pk])[self.pk]
 
     def add_user(self, user, **kwargs):
         membership, _ = Membership.objects.update_or_create(
@@ -240,7 +241,9 @@ class AbakusGroup(MPTTModel, PersistentModel):
         """
         Restricted Mail
         """
-        memberships = self.memberships.filter(email_lists_enabled=True)
+        memberships = self.memberships.filter(email_lists_enabled=True).select_related(
+            "user"
+        )
         return [membership.user for membership in memberships], []
 
     def announcement_lookup(self):
@@ -349,13 +352,18 @@ class PermissionsMixin(CachedModel):
         # node first (inclusive group from membership)
         mapping = {}
 
-        memberships = self.memberships.filter(
-            abakus_group__deleted=False, deleted=False, is_active=True
-        ).select_related("abakus_group")
+        memberships = list(
+            self.memberships.filter(
+                abakus_group__deleted=False, deleted=False, is_active=True
+            ).select_related("abakus_group")
+        )
 
+        ancestors = AbakusGroup.objects.ancestors_by_group(
+            membership.abakus_group for membership in memberships
+        )
         for membership in memberships:
-            mapping[membership] = list(membership.abakus_group.get_ancestors()) + [
-                membership.abakus_group,
+            mapping[membership] = ancestors[membership.abakus_group_id] + [
+                membership.abakus_group
             ]
         return mapping
 
@@ -366,6 +374,10 @@ class PermissionsMixin(CachedModel):
             all_groups.update(groups)
         return list(all_groups)
 
+    @abakus_cached_property
+    def permission_snapshot(self):
+        return PermissionSnapshot.for_user(self)
+
 
 class User(
     PasswordHashUser, GSuiteAddress, AbstractBaseUser, PersistentModel, PermissionsMixin
@@ -678,7 +690,7 @@ class Penalty(BasisModel):
         return timezone.now() + dt
 
     @staticmethod
-    def penalty_offset(start_date, forwards=True):
+    def penalty_offset(start_date: datetime, forwards: bool = True) -> timedelta:
         remaining_days = settings.PENALTY_DURATION.days
         offset_days = 0
         multiplier = 1 if forwards else -1
@@ -697,7 +709,7 @@ class Penalty(BasisModel):
         return timedelta(days=offset_days)
 
     @staticmethod
-    def ignore_date(date):
+    def ignore_date(date: datetime) -> bool:
         summer_from, summer_to = settings.PENALTY_IGNORE_SUMMER
         winter_from, winter_to = settings.PENALTY_IGNORE_WINTER
         if summer_from <= (date.month, date.day) <= summer_to:
@@ -0,0 +1,7 @@
+from django.db import transaction
+
+from lego.apps.users.models import AbakusGroup
+
+
+def group_population_callback(sender, instance, **kwargs):
+    transaction.on_commit(AbakusGroup.objects.invalidate_populations)
@@ -36,11 +36,12 @@ def reconcile_interest_group_leadership(
             )
 
 
-def send_inactive_notification(user):
-    notification = InactiveNotification(user, max_inactive_days=MAX_INACTIVE_DAYS)
-    notification.notify()
-    user.inactive_notified_counter += 1
-    user.save()
+def send_inactive_notifications(users):
+    users = list(users)
+    InactiveNotification.notify_many(users, max_inactive_days=MAX_INACTIVE_DAYS)
+    for user in users:
+        user.inactive_notified_counter += 1
+        user.save()
 
 
 @celery_app.task(serializer="json", bind=True, base=AbakusTask)
@@ -62,11 +63,10 @@ def send_inactive_reminder_mail_and_delete_users(self, logger_context=None):
             users_to_delete=users_to_delete,
         )
 
+    DeletedUserNotification.notify_many(
+        users_to_delete, max_inactive_days=MAX_INACTIVE_DAYS
+    )
     for user in users_to_delete:
-        notification = DeletedUserNotification(
-            user, max_inactive_days=MAX_INACTIVE_DAYS
-        )
-        notification.notify()
         user.delete(force=True)
 
     if len(users_to_delete) > 0:
@@ -84,13 +84,11 @@ def send_inactive_reminder_mail_and_delete_users(self, logger_context=None):
         last_login__lte=timezone.now() - timezone.timedelta(days=MEDIAN_INACTIVE_DAYS)
     )
 
-    for user in users_to_notifiy_weekly:
-        send_inactive_notification(user)
+    send_inactive_notifications(users_to_notifiy_weekly)
 
     users_to_notifiy_montly = User.objects.filter(
         Q(last_login__lte=timezone.now() - timezone.timedelta(days=MIN_INACTIVE_DAYS))
         & Q(inactive_notified_counter=0)
     )
 
-    for user in users_to_notifiy_montly:
-        send_inactive_notification(user)
+    send_inactive_notifications(users_to_notifiy_montly)
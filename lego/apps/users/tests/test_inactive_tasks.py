@@ -13,7 +13,7 @@ from lego.apps.users.tasks import (
 from lego.utils.test_utils import BaseTestCase
 
 
-@mock.patch("lego.apps.users.tasks.InactiveNotification.notify")
+@mock.patch("lego.apps.users.tasks.InactiveNotification.generate")
 class InactiveNotificationTestCase(BaseTestCase):
     fixtures = [
         "test_abakus_groups.yaml",
@@ -82,7 +82,7 @@ class InactiveNotificationTestCase(BaseTestCase):
         self.assertEqual(num_users_before, num_users_after)
 
 
-@mock.patch("lego.apps.users.tasks.DeletedUserNotification.notify")
+@mock.patch("lego.apps.users.tasks.DeletedUserNotification.generate")
 class DeletedUserNotificationTestCase(BaseTestCase):
     fixtures = [
         "test_abakus_groups.yaml",
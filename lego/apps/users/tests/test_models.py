@@ -1,5 +1,6 @@
 from unittest import mock
 
+from django.core.cache import cache
 from django.db import transaction
 from django.test import override_settings
 from django.utils import timezone
@@ -146,6 +147,48 @@ class AbakusGroupHierarchyTestCase(BaseTestCase):
         self.assertEqual(set(AbakusGroup.objects.all()), union)
 
 
+@override_settings(GROUP_POPULATION_TIMEOUT=60)
+class GroupPopulationTestCase(BaseTestCase):
+    fixtures = ["test_abakus_groups.yaml", "test_users.yaml"]
+
+    def setUp(self):
+        self.abakus = AbakusGroup.objects.get(name="Abakus")
+        self.webkom = AbakusGroup.objects.get(name="Webkom")
+        self.user = User.objects.get(username="test1")
+        cache.delete_many(
+            [
+                AbakusGroup.objects.POPULATION_VERSION_KEY,
+                f"{AbakusGroup.objects.POPULATION_CACHE_KEY}{self.abakus.pk}",
+                f"{AbakusGroup.objects.POPULATION_CACHE_KEY}{self.webkom.pk}",
+            ]
+        )
+
+    def populations(self):
+        return AbakusGroup.objects.populations([self.abakus.pk, self.webkom.pk])
+
+    def test_populations_count_descendants(self):
+        self.webkom.add_user(self.user)
+        self.abakus.add_user(self.user)
+        self.abakus.add_user(User.objects.get(username="test2"))
+
+        self.assertEqual({self.abakus.pk: 2, self.webkom.pk: 1}, self.populations())
+
+    def test_populations_are_cached(self):
+        self.populations()
+        with self.assertNumQueries(0):
+            self.populations()
+
+    def test_membership_change_invalidates(self):
+        self.assertEqual(0, self.populations()[self.webkom.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.webkom.add_user(self.user)
+        self.assertEqual({self.abakus.pk: 1, self.webkom.pk: 1}, self.populations())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.webkom.remove_user(self.user)
+        self.assertEqual({self.abakus.pk: 0, self.webkom.pk: 0}, self.populations())
+
+
 class UserTestCase(BaseTestCase):
     fixtures = ["test_abakus_groups.yaml", "test_users.yaml", "test_files.yaml"]
 
@@ -1,3 +1,5 @@
+from typing import Iterable
+
 from asgiref.sync import AsyncToSync
 from channels.layers import get_channel_layer
 from djangorestframework_camel_case.render import camelize
@@ -17,3 +19,22 @@ def notify_group(group: str, message: dict):
     return AsyncToSync(channel_layer.group_send)(
         group, {"type": "notification.message", "text": payload}
     )
+
+
+def notify_groups(messages: Iterable[tuple[str, dict]]):
+    """
+    Sends multiple messages using a single event loop, use this instead of calling
+    notify_group in a loop.
+
+    :param messages: iterable of (group, message) tuples
+    """
+    channel_layer = get_channel_layer()
+    payloads = [(group, serialize(camelize(message))) for group, message in messages]
+
+    async def send_all():
+        for group, payload in payloads:
+            await channel_layer.group_send(
+                group, {"type": "notification.message", "text": payload}
+            )
+
+    return AsyncToSync(send_all)()
@@ -33,6 +33,10 @@ schedule = {
         "task": "lego.apps.external_sync.tasks.sync_external_systems",
         "schedule": crontab(hour="*", minute=0),
     },
+    "check-admission-queues": {
+        "task": "lego.apps.events.tasks.check_admission_queues",
+        "schedule": crontab(minute="*/5"),
+    },
     "check-that-pool-counters-match-registration-number": {
         "task": "lego.apps.events.tasks.check_that_pool_counters_match_registration_number",
         "schedule": crontab(hour="*", minute=0),
@@ -69,6 +73,18 @@ schedule = {
         "task": "lego.apps.meetings.tasks.generate_weekly_recurring_meetings",
         "schedule": crontab(hour=0, minute=0),
     },
+    "prune_feeds": {
+        "task": "lego.apps.feeds.tasks.prune_feeds",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "redeliver_restricted_messages": {
+        "task": "lego.apps.restricted.tasks.redeliver_restricted_messages",
+        "schedule": crontab(minute="*/15"),
+    },
+    "clean_restricted_messages": {
+        "task": "lego.apps.restricted.tasks.clean_restricted_messages",
+        "schedule": crontab(hour=3, minute=0),
+    },
     "reconcile_interest_group_leadership": {
         "task": "lego.apps.users.tasks.reconcile_interest_group_leadership",
         "schedule": crontab(hour=5, minute=0),
@@ -13,6 +13,9 @@ API_VERSION = "v1"
 LOGIN_REDIRECT_URL = f"/api/{API_VERSION}/"
 
 EMAIL_SUBJECT_PREFIX = "[Abakus] "
+# Seconds the mail connection of a worker is kept open without sending, before it is
+# reopened on the next message.
+EMAIL_CONNECTION_MAX_AGE = 60
 
 ADMINS = (("Webkom", "webkom@abakus.no"),)
 MANAGERS = ADMINS
@@ -22,6 +25,46 @@ PENALTY_DURATION = timedelta(days=20)
 PENALTY_IGNORE_SUMMER = ((6, 1), (8, 15))
 PENALTY_IGNORE_WINTER = ((11, 18), (1, 10))
 
+# Retention policy per feed model. max_items is the number of aggregated activities kept
+# per feed_id, max_age is compared with updated_at. None disables the rule.
+FEED_RETENTION = {
+    "personalfeed": {"max_items": 500, "max_age": timedelta(days=365)},
+    "userfeed": {"max_items": 500, "max_age": None},
+    "notificationfeed": {"max_items": 200, "max_age": timedelta(days=2 * 365)},
+}
+FEED_RETENTION_BATCH_SIZE = 1000
+
+# Seconds a users group ids and keyword permissions are cached between requests. Changes to
+# memberships and groups invalidate the cache, the timeout bounds staleness from bulk updates.
+PERMISSION_SNAPSHOT_TIMEOUT = 60 * 10
+
+# Seconds the number of users in a group is cached, invalidated like the permission snapshots
+GROUP_POPULATION_TIMEOUT = 60 * 60
+
+# Seconds the shared part of the frontpage is cached for each visibility bucket. Saving an
+# event, article or poll invalidates it, the timeout bounds staleness from related objects.
+FRONTPAGE_CACHE_TIMEOUT = 60
+
+# Seconds rendered rich text is cached. The cache is keyed by a hash of the content, so edits
+# never serve stale html and the timeout only bounds memory.
+CONTENT_RENDER_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Seconds presigned file urls are valid, and seconds a signed url is reused. The difference is
+# the shortest validity a client receives.
+FILE_SIGNED_URL_EXPIRY = 60 * 60
+FILE_SIGNED_URL_CACHE_TIMEOUT = 60 * 45
+
+# Seconds a rendered calendar item is cached. Items are keyed by updated_at and never stale.
+ICAL_ITEM_CACHE_TIMEOUT = 60 * 60 * 24
+# Seconds the events calendar is cached for each visibility bucket. Saving an event
+# invalidates it, the timeout bounds staleness from events moving out of the time window.
+ICAL_FEED_CACHE_TIMEOUT = 60 * 5
+# Seconds the ETag and Last-Modified timestamp of each calendar is remembered
+ICAL_VALIDATORS_TIMEOUT = 60 * 60 * 24 * 30
+
+# Minimum time between last_login updates from authenticated API requests
+USER_LAST_SEEN_INTERVAL = timedelta(minutes=15)
+
 BEDKOM_BOOKING_PERIOD = ((1, 1), (12, 30))
 
 REGISTRATION_CONFIRMATION_TIMEOUT = 60 * 60 * 24
@@ -56,6 +99,20 @@ RESTRICTED_ADDRESS = "restricted"
 RESTRICTED_DOMAIN = "abakus.no"
 RESTRICTED_FROM = "Abakus <no-reply@abakus.no>"
 RESTRICTED_ALLOW_ORIGINAL_SENDER = False
+# Number of recipients sent to over the SMTP connection between each saved batch of a
+# restricted message, a failed batch is retried without resending the batches before it.
+RESTRICTED_BATCH_SIZE = 200
+# Restricted messages not attempted for this long are delivered again, and messages not
+# delivered this long after they were received are given up and the sender is notified.
+RESTRICTED_REDELIVERY_DELAY = timedelta(hours=1)
+RESTRICTED_DELIVERY_TIMEOUT = timedelta(days=2)
+# The bodies of delivered, rejected and failed restricted messages are deleted after this.
+RESTRICTED_MESSAGE_RETENTION = timedelta(days=30)
+
+# Number of messages sent by each batched email and push task from Notification.notify_all.
+NOTIFICATION_BATCH_SIZE = 100
+# Backend used by PushMessage to send batches to the push providers.
+PUSH_BACKEND = "lego.utils.push.ProviderBackend"
 
 GSUITE_DOMAIN = "abakus.no"
 
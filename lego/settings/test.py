@@ -35,6 +35,7 @@ CAPTCHA_KEY = os.environ.get("CAPTCHA_KEY") or "1x000000000000000000000000000000
 OAUTH2_PROVIDER_ACCESS_TOKEN_MODEL = "oauth2_provider.AccessToken"
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+PUSH_BACKEND = "lego.utils.push.LocmemBackend"
 
 DATABASES = {
     "default": {
@@ -61,6 +62,15 @@ CACHES = {
 
 CELERY_TASK_ALWAYS_EAGER = True
 
+# Fixture primary keys are reused between test cases, and on_commit invalidation never runs
+# inside a TestCase.
+PERMISSION_SNAPSHOT_TIMEOUT = 0
+GROUP_POPULATION_TIMEOUT = 0
+FRONTPAGE_CACHE_TIMEOUT = 0
+FILE_SIGNED_URL_CACHE_TIMEOUT = 0
+ICAL_ITEM_CACHE_TIMEOUT = 0
+ICAL_FEED_CACHE_TIMEOUT = 0
+
 CHANNEL_LAYERS["default"]["CONFIG"] = {"hosts": [f"redis://{CACHE}/5"]}
 
 INSTALLED_APPS += ("lego.apps.permissions.tests",)
@@ -0,0 +1,49 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with a timeout per item.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        result = {}
+        with self.lock:
+            for key in keys:
+                item = self.items.get(key)
+                if item is None:
+                    continue
+                expires, value = item
+                if expires < now:
+                    del self.items[key]
+                    continue
+                self.items.move_to_end(key)
+                result[key] = value
+        return result
+
+    def set_many(self, values, timeout=None):
+        expires = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self.lock:
+            for key, value in values.items():
+                self.items[key] = (expires, value)
+                self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
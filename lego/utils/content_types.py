@@ -1,5 +1,9 @@
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+from django.core.exceptions import (
+    MultipleObjectsReturned,
+    ObjectDoesNotExist,
+    ValidationError,
+)
 
 #  isort:skip
 """
@@ -29,13 +33,20 @@ def split_string(instance_string):
     return content_type_string, id_string
 
 
+def string_to_content_type(content_type_string):
+    """
+    Convert a string like app_label.model_name to a ContentType. The lookup goes through the
+    ContentType cache, so only the first lookup of each content type hits the database.
+    """
+    app_label, model_name = content_type_string.split(".")
+    return ContentType.objects.get_by_natural_key(app_label, model_name)
+
+
 def string_to_model_cls(content_type_string):
     """
     Convert a string like app_label.model_name to a model cls
     """
-    app_label, model_name = content_type_string.split(".")
-    content_type = ContentType.objects.get(app_label=app_label, model=model_name)
-    return content_type.model_class()
+    return string_to_content_type(content_type_string).model_class()
 
 
 def string_to_instance(instance_string):
@@ -44,11 +55,45 @@ def string_to_instance(instance_string):
     """
     content_type_string, id_string = split_string(instance_string)
 
-    app_label, model_name = content_type_string.split(".")
-    content_type = ContentType.objects.get(app_label=app_label, model=model_name)
+    content_type = string_to_content_type(content_type_string)
     return content_type.get_object_for_this_type(pk=id_string)
 
 
+def strings_to_instances(instance_strings, related_fields=None):
+    """
+    Batch version of string_to_instance, using one query per model. Returns a dict mapping
+    the content strings to instances, invalid strings and missing objects are left out.
+    Objects are looked up using the default manager of the model.
+
+    related_fields is an optional dict of {content_type_string: [fields]} passed to
+    select_related.
+    """
+    related_fields = related_fields or {}
+    lookups = {}
+
+    for instance_string in instance_strings:
+        try:
+            content_type_string, id_string = split_string(instance_string)
+            model = string_to_model_cls(content_type_string)
+            pk = model._meta.pk.to_python(id_string)
+        except (*VALIDATION_EXCEPTIONS, ValidationError):
+            continue
+        lookup = lookups.setdefault(content_type_string, (model, {}))
+        lookup[1].setdefault(pk, []).append(instance_string)
+
+    result = {}
+    for content_type_string, (model, strings_by_pk) in lookups.items():
+        queryset = model._default_manager.filter(pk__in=strings_by_pk.keys())
+        fields = related_fields.get(content_type_string)
+        if fields:
+            queryset = queryset.select_related(*fields)
+        for instance in queryset:
+            for instance_string in strings_by_pk[instance.pk]:
+                result[instance_string] = instance
+
+    return result
+
+
 def instance_to_content_type_string(instance) -> str:
     """
     Convert a model instance to a string like app_label.model_name
@@ -1,25 +1,242 @@
+import re
+import threading
+import time
+from functools import cache
+from smtplib import SMTPException, SMTPServerDisconnected
+
 from django.conf import settings
-from django.core.mail import send_mail as django_send_mail
-from django.template.loader import render_to_string
+from django.core.mail import (
+    EmailMultiAlternatives,
+    get_connection,
+    send_mail as django_send_mail,
+)
+from django.template import engines
+from django.template.base import tag_re
+from django.template.loader import get_template, render_to_string
 
 from premailer import transform
 from structlog import get_logger
 
 log = get_logger()
 
+_connections = threading.local()
+
+BLOCK_TAG = re.compile(r"{%\s*block\s+(\w+)\s*%}")
+END_BLOCK_TAG = re.compile(r"{%\s*endblock(\s+\w+)?\s*%}")
+EXTENDS_TAG = re.compile(r"""{%\s*extends\s+(["'])(.+?)\1\s*%}""")
+LOAD_TAG = re.compile(r"{%\s*load\s")
+# Tags that depend on markup in the context or the parent template, these templates are
+# inlined when they are rendered.
+UNSUPPORTED_TAG = re.compile(
+    r"\bsafe(seq)?\b|\bautoescape\b|\bblock\.super\b|^{%\s*(extends|include)\b"
+)
+# Templates inlined ahead of time. Only add templates that render the same elements and
+# styles as inlining each message, this is checked by the tests for every email template.
+INLINED_TEMPLATES = frozenset(
+    {
+        "companies/email/response_mail_bedkom.html",
+        "companies/email/response_mail_company.html",
+        "contact/email/contact_form.html",
+        "events/email/admin_registration.html",
+        "events/email/admin_unregistration.html",
+        "events/email/bump.html",
+        "events/email/payment_overdue.html",
+        "events/email/payment_overdue_author.html",
+        "followers/email/reminder.html",
+        "lendingRequests/email/lending_request.html",
+        "lendingRequests/email/lending_request_status_update.html",
+        "meetings/email/meeting_invitation.html",
+        "meetings/email/meeting_invitation_reminder.html",
+        "notifications/email/announcement.html",
+        "restricted/email/process_failure.html",
+        "restricted/email/process_success.html",
+        "surveys/email/survey.html",
+        "users/email/deleted.html",
+        "users/email/inactive.html",
+        "users/email/list_of_deleted_users.html",
+        "users/email/penalty.html",
+        "users/email/registration.html",
+        "users/email/reset_password.html",
+        "users/email/student_confirmation.html",
+    }
+)
+PLACEHOLDER = "lego-template-tag-{:04d}"
+PLACEHOLDER_RE = re.compile(r"lego-template-tag-(\d{4})")
+
+
+def get_mail_connection():
+    """
+    The mail connection of the current worker thread. It is opened on first use and kept
+    open between tasks, and reopened when it has been idle for EMAIL_CONNECTION_MAX_AGE
+    seconds.
+    """
+    connection = getattr(_connections, "connection", None)
+    now = time.monotonic()
+    if connection is not None and (
+        _connections.backend != settings.EMAIL_BACKEND
+        or now - _connections.last_used > settings.EMAIL_CONNECTION_MAX_AGE
+    ):
+        close_mail_connection()
+        connection = None
+
+    if connection is None:
+        connection = get_connection(fail_silently=False)
+        # An open connection is not closed by send_messages
+        connection.open()
+        _connections.connection = connection
+        _connections.backend = settings.EMAIL_BACKEND
+
+    _connections.last_used = now
+    return connection
+
+
+def close_mail_connection():
+    connection = getattr(_connections, "connection", None)
+    _connections.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except (OSError, SMTPException):
+            pass
+
+
+def send_with_connection(send):
+    """
+    Call send with the mail connection of the worker. A connection closed by the server is
+    reopened once, on other errors the connection is dropped so the retry starts over.
+    """
+    try:
+        return send(get_mail_connection())
+    except SMTPServerDisconnected:
+        close_mail_connection()
+        return send(get_mail_connection())
+    except SMTPException:
+        close_mail_connection()
+        raise
+
+
+def _parse_template(name):
+    """
+    Split the source of a template into the loaded libraries, the parent template and a
+    list of text, tags and blocks, where a block is a tuple of its name and its content.
+    Returns None for templates that can't be inlined ahead of time.
+    """
+    source = get_template(name).template.source
+    loads = []
+    parent = None
+    blocks = {}
+    stack = [[]]
+    for i, bit in enumerate(tag_re.split(source)):
+        if i % 2 == 0:
+            stack[-1].append(bit)
+        elif match := EXTENDS_TAG.fullmatch(bit):
+            parent = match.group(2)
+        elif UNSUPPORTED_TAG.search(bit):
+            return None
+        elif LOAD_TAG.match(bit):
+            loads.append(bit)
+        elif match := BLOCK_TAG.fullmatch(bit):
+            content = []
+            blocks[match.group(1)] = content
+            stack[-1].append((match.group(1), content))
+            stack.append(content)
+        elif END_BLOCK_TAG.fullmatch(bit):
+            if len(stack) == 1:
+                return None
+            stack.pop()
+        else:
+            stack[-1].append(bit)
+
+    if len(stack) != 1:
+        return None
+    return loads, parent, blocks, stack[0]
+
+
+def _expand_template(name, overrides=None):
+    """
+    The source of a template with the templates it extends resolved, as a list of loads and
+    the source without extends and block tags.
+    """
+    parsed = _parse_template(name)
+    if parsed is None:
+        return None
+    loads, parent, blocks, nodes = parsed
+    overrides = {**blocks, **(overrides or {})}
+
+    if parent is not None:
+        expanded = _expand_template(parent, overrides)
+        if expanded is None:
+            return None
+        parent_loads, source = expanded
+        return parent_loads + loads, source
+
+    def join(nodes):
+        return "".join(
+            node if isinstance(node, str) else join(overrides[node[0]])
+            for node in nodes
+        )
+
+    return loads, join(nodes)
+
+
+@cache
+def get_inlined_template(name):
+    """
+    Compile an html email template with the CSS inlined once, so only the context is
+    rendered for each message. The template tags are replaced with placeholders while
+    premailer inlines the CSS. Returns None for templates not in INLINED_TEMPLATES, when
+    premailer fails, or when it moved or dropped a tag.
+    """
+    if name not in INLINED_TEMPLATES:
+        return None
+
+    expanded = _expand_template(name)
+    if expanded is None:
+        return None
+    loads, source = expanded
+
+    tags = []
+
+    def placeholder(match):
+        tags.append(match.group(0))
+        return PLACEHOLDER.format(len(tags) - 1)
+
+    try:
+        inlined = transform(tag_re.sub(placeholder, source))
+    except Exception:
+        log.warning("email_template_not_inlined", template=name, exc_info=True)
+        return None
+    if [int(i) for i in PLACEHOLDER_RE.findall(inlined)] != list(range(len(tags))):
+        log.warning("email_template_not_inlined", template=name)
+        return None
+
+    inlined = PLACEHOLDER_RE.sub(lambda match: tags[int(match.group(1))], inlined)
+    return engines["django"].from_string("".join(loads) + inlined)
+
+
+def render_html(html_template, context):
+    """
+    Render an html email template with the CSS inlined.
+    """
+    template = get_inlined_template(html_template)
+    if template is None:
+        return transform(render_to_string(html_template, context))
+    return template.render(context)
+
 
 def send_email(
     to_email, context, subject, plain_template, html_template, from_email=None
 ):
     """
-    Render a plain and html message based on a context and send it using django.core.mail.
+    Render a plain and html message based on a context and send it over the mail connection
+    of the worker.
     """
 
     plain_body = render_to_string(plain_template, context)
 
     html_body = None
     if html_template:
-        html_body = render_to_string(html_template, context)
+        html_body = render_html(html_template, context)
 
     recipient_list = to_email if isinstance(to_email, list) else [to_email]
 
@@ -30,14 +247,35 @@ def send_email(
         recipient_list=recipient_list,
     )
 
-    django_send_mail(
+    send_with_connection(
+        lambda connection: django_send_mail(
+            subject=subject,
+            message=plain_body,
+            from_email=from_email,
+            recipient_list=recipient_list,
+            html_message=html_body,
+            fail_silently=False,
+            connection=connection,
+        )
+    )
+
+
+def render_email(
+    to_email, context, subject, plain_template, html_template, from_email=None
+):
+    """
+    Render the message sent by send_email, used to send many messages over one connection.
+    """
+    recipient_list = to_email if isinstance(to_email, list) else [to_email]
+    message = EmailMultiAlternatives(
         subject=subject,
-        message=plain_body,
+        body=render_to_string(plain_template, context),
         from_email=from_email,
-        recipient_list=recipient_list,
-        html_message=transform(html_body),
-        fail_silently=False,
+        to=recipient_list,
     )
+    if html_template:
+        message.attach_alternative(render_html(html_template, context), "text/html")
+    return message
 
 
 class EmailMessage:
@@ -80,6 +318,17 @@ class EmailMessage:
         context.update(kwargs)
         return context
 
+    def render(self, **kwargs):
+        context = self.build_context(**kwargs)
+        return render_email(
+            self.to_email,
+            context,
+            self.subject,
+            self.plain_template,
+            self.html_template,
+            self.from_email,
+        )
+
     def send(self, **kwargs):
         context = self.build_context(**kwargs)
         return send_email(
@@ -4,3 +4,25 @@ from rest_framework import serializers
 class PrimaryKeyRelatedFieldNoPKOpt(serializers.PrimaryKeyRelatedField):
     def use_pk_only_optimization(self):
         return False
+
+
+def get_list_values(field):
+    """
+    The values of a field for every item in the list being serialized, used by fields that
+    look up the values of all items at once. Empty when the field is not part of a list.
+    """
+    root = field.root
+    if (
+        not isinstance(root, serializers.ListSerializer)
+        or field.parent is not root.child
+    ):
+        return []
+    values = []
+    for instance in root.instance or []:
+        try:
+            value = field.get_attribute(instance)
+        except (AttributeError, KeyError):
+            continue
+        if value is not None:
+            values.append(value)
+    return values
@@ -0,0 +1,100 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from lego.apps.content import rendering
+from lego.apps.events import constants
+from lego.apps.events.models import Event
+from lego.apps.events.serializers.events import EventSearchSerializer
+from lego.utils.management_command import BaseCommand
+
+PARAGRAPH = (
+    "<p>Velkommen til <b>bedriftspresentasjon</b> med <i>mat</i> og "
+    '<a href="https://abakus.no" target="_blank">mingling</a> etterpå.</p>'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark serializing events with rich text, with the rendered html uncached, "
+        "cached in redis and cached in process"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--events",
+            type=int,
+            default=100,
+            help="Number of events in each serialized list",
+        )
+        parser.add_argument(
+            "--paragraphs",
+            type=int,
+            default=20,
+            help="Number of paragraphs in the text of each event",
+        )
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=3,
+            help="Number of images in the text of each event",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of times the list is serialized in each run",
+        )
+
+    def get_events(self, options):
+        now = timezone.now()
+        images = "".join(
+            f'<figure><img data-file-key="image{i}.png"></figure>'
+            for i in range(options["images"])
+        )
+        return [
+            Event(
+                id=i,
+                title=f"Benchmark {i}",
+                description="Benchmark",
+                text=f"<h2>Event {i}</h2>{PARAGRAPH * options['paragraphs']}{images}",
+                event_type=constants.COMPANY_PRESENTATION,
+                location="Benchmark",
+                start_time=now + timedelta(days=7),
+                end_time=now + timedelta(days=7, hours=2),
+            )
+            for i in range(options["events"])
+        ]
+
+    def measure(self, events, repeat, before=None):
+        durations = []
+        for _ in range(repeat):
+            if before:
+                before()
+            start = time.perf_counter()
+            _ = EventSearchSerializer(events, many=True).data
+            durations.append(time.perf_counter() - start)
+        print(
+            f"median {statistics.median(durations) * 1000:.1f} ms, "
+            f"max {max(durations) * 1000:.1f} ms"
+        )
+
+    def run(self, *args, **options):
+        events = self.get_events(options)
+        repeat = options["repeat"]
+        print(f"Serializing {len(events)} events {repeat} times:")
+
+        with override_settings(CONTENT_RENDER_CACHE_TIMEOUT=0):
+            print("Uncached:         ", end="")
+            self.measure(events, repeat)
+
+        with override_settings(CONTENT_RENDER_CACHE_TIMEOUT=60):
+            # Warm the cache in redis, then read from redis only
+            rendering.get_rendered_content([event.text for event in events])
+            print("Cached in redis:  ", end="")
+            self.measure(events, repeat, before=rendering.local_cache.clear)
+            print("Cached in process:", end=" ")
+            self.measure(events, repeat)
@@ -0,0 +1,91 @@
+import time
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
+from django.test import override_settings
+
+from premailer import transform
+
+from lego.utils.email import (
+    EmailMessage,
+    close_mail_connection,
+    get_inlined_template,
+    send_with_connection,
+)
+from lego.utils.management_command import BaseCommand
+
+TEMPLATE = "users/email/inactive"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the number of emails rendered and sent per second with a new connection "
+        "and CSS inlining for each message, and with the worker connection and templates "
+        "inlined ahead of time. The mail is sent to the locmem backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=500,
+            help="Number of messages sent",
+        )
+
+    def messages(self, count):
+        return [
+            EmailMessage(
+                to_email=f"benchmark{i}@abakus.no",
+                context={
+                    "name": f"Benchmark {i}",
+                    "username": f"benchmark{i}",
+                    "last_login": "2024-01-01",
+                    "date_of_deletion": "2025-01-01",
+                    "max_inactive_days": 365,
+                },
+                subject="Inaktiv bruker",
+                plain_template=f"{TEMPLATE}.txt",
+                html_template=f"{TEMPLATE}.html",
+            )
+            for i in range(count)
+        ]
+
+    def per_message(self, message):
+        context = message.build_context()
+        email = EmailMultiAlternatives(
+            subject=message.subject,
+            body=render_to_string(message.plain_template, context),
+            from_email=message.from_email,
+            to=[message.to_email],
+        )
+        email.attach_alternative(
+            transform(render_to_string(message.html_template, context)), "text/html"
+        )
+        get_connection(fail_silently=False).send_messages([email])
+
+    def pooled(self, message):
+        email = message.render()
+        send_with_connection(lambda connection: connection.send_messages([email]))
+
+    def measure(self, name, send, messages):
+        mail.outbox = []
+        start = time.perf_counter()
+        for message in messages:
+            send(message)
+        duration = time.perf_counter() - start
+        print(
+            f"{name:<12}{len(mail.outbox)} mails: {duration:.2f} s, "
+            f"{len(messages) / duration:.0f} messages/s"
+        )
+        mail.outbox = []
+
+    def run(self, *args, **options):
+        messages = self.messages(options["messages"])
+        with override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+        ):
+            self.measure("Per message", self.per_message, messages)
+            get_inlined_template.cache_clear()
+            self.measure("Pooled", self.pooled, messages)
+            close_mail_connection()
@@ -0,0 +1,152 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from lego.apps.events import constants
+from lego.apps.events.admission import AdmissionQueue
+from lego.apps.events.models import Event, Pool, Registration
+from lego.apps.events.tasks import admit_registration, async_admit_registrations
+from lego.apps.users.models import AbakusGroup, Membership, User
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark registration throughput when an event opens, with concurrent "
+        "workers registering to the same pools. Creates and removes its own data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--registrations",
+            type=int,
+            default=500,
+            help="Number of users registering when the event opens",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of concurrent workers, each with its own database connection",
+        )
+        parser.add_argument(
+            "--pools", type=int, default=2, help="Number of pools in the event"
+        )
+        parser.add_argument(
+            "--capacity", type=int, default=100, help="Capacity of each pool"
+        )
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            default=False,
+            help="Admit through the admission queue instead of one registration per task",
+        )
+
+    def register(self, registration_ids, event_id=None):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        try:
+            with connection.execute_wrapper(count_queries):
+                for registration_id in registration_ids:
+                    # Each registration is a task, like async_register or the task
+                    # started by enqueue_registration.
+                    if event_id:
+                        async_admit_registrations(event_id)
+                    else:
+                        admit_registration(registration_id)
+        finally:
+            connection.close()
+        return queries
+
+    def setup(self, options):
+        now = timezone.now()
+        group = AbakusGroup.objects.create(name=f"benchmark-{now.timestamp()}")
+        users = User.objects.bulk_create(
+            User(
+                username=f"benchmark{i}",
+                first_name="Benchmark",
+                last_name=str(i),
+                email=f"benchmark{i}@abakus.no",
+            )
+            for i in range(options["registrations"])
+        )
+        Membership.objects.bulk_create(
+            Membership(user=user, abakus_group=group) for user in users
+        )
+        event = Event.objects.create(
+            title="Benchmark",
+            event_type=constants.COMPANY_PRESENTATION,
+            location="Benchmark",
+            start_time=now + timedelta(days=7),
+            end_time=now + timedelta(days=7, hours=2),
+            heed_penalties=False,
+        )
+        for i in range(options["pools"]):
+            pool = Pool.objects.create(
+                name=f"Benchmark {i}",
+                capacity=options["capacity"],
+                event=event,
+                activation_date=now,
+            )
+            pool.permission_groups.add(group)
+        registrations = Registration.objects.bulk_create(
+            Registration(event=event, user=user, status=constants.PENDING_REGISTER)
+            for user in users
+        )
+        return group, users, event, [registration.id for registration in registrations]
+
+    def teardown(self, group, users, event):
+        Registration.all_objects.filter(event=event).delete()
+        Pool.all_objects.filter(event=event).delete()
+        event.delete(force=True)
+        Membership.all_objects.filter(abakus_group=group).delete()
+        User.all_objects.filter(id__in=[user.id for user in users]).delete()
+        group.delete(force=True)
+
+    def run(self, *args, **options):
+        group, users, event, registration_ids = self.setup(options)
+        workers = options["workers"]
+        event_id = None
+        if options["queue"]:
+            event_id = event.id
+            AdmissionQueue(event_id).push(*registration_ids)
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                queries = sum(
+                    executor.map(
+                        self.register,
+                        (registration_ids[i::workers] for i in range(workers)),
+                        [event_id] * workers,
+                    )
+                )
+            duration = time.perf_counter() - start
+
+            admitted_ids = set(
+                event.registrations.exclude(pool=None).values_list("id", flat=True)
+            )
+            admitted = len(admitted_ids)
+            # Registrations are queued in the order of registration_ids
+            unfair = len(admitted_ids - set(registration_ids[:admitted]))
+            waiting = event.waiting_registrations.count()
+            counters = sum(event.pools.values_list("counter", flat=True))
+            print(
+                f"{len(registration_ids)} registrations with {workers} workers: "
+                f"{duration:.2f} s, {len(registration_ids) / duration:.0f} registrations/s, "
+                f"{queries / len(registration_ids):.1f} queries per registration"
+            )
+            print(
+                f"{admitted} admitted, {waiting} on the waiting list, "
+                f"pool counters sum to {counters}, "
+                f"{unfair} admitted ahead of an earlier registration"
+            )
+        finally:
+            self.teardown(group, users, event)
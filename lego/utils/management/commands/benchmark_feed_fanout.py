@@ -0,0 +1,69 @@
+import time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from lego.apps.feeds.activity import Activity
+from lego.apps.feeds.models import NotificationFeed, PersonalFeed
+from lego.apps.feeds.utils import add_to_feed
+from lego.apps.feeds.verbs import AnnouncementVerb
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Benchmark the number of queries used to fan out an activity"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipients",
+            type=int,
+            default=3000,
+            help="Number of recipients to fan out to",
+        )
+        parser.add_argument(
+            "--notification",
+            action="store_true",
+            default=False,
+            help="Fan out to the NotificationFeed instead of the PersonalFeed",
+        )
+
+    def fanout(self, feed, recipients, object_id):
+        activity = Activity(
+            actor="users.user-1",
+            verb=AnnouncementVerb,
+            object=f"notifications.announcement-{object_id}",
+            time=timezone.now(),
+        )
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            add_to_feed(activity, feed, recipients)
+        duration = time.perf_counter() - start
+
+        print(
+            f"{feed.__name__}: {queries} queries, "
+            f"{queries / len(recipients):.4f} queries per recipient, "
+            f"{duration * 1000:.0f} ms"
+        )
+
+    def run(self, *args, **options):
+        feed = NotificationFeed if options["notification"] else PersonalFeed
+        # Use feed ids that do not collide with real users
+        recipients = [f"benchmark-{i}" for i in range(options["recipients"])]
+
+        with transaction.atomic():
+            print("New aggregated activities:")
+            self.fanout(feed, recipients, 10**9)
+            print("Existing aggregated activities:")
+            self.fanout(feed, recipients, 10**9)
+            transaction.set_rollback(True)
+
+        if feed == NotificationFeed:
+            for feed_id in recipients:
+                NotificationFeed.mark_all(feed_id, True, True)
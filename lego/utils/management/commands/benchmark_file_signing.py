@@ -0,0 +1,51 @@
+import time
+
+from django.test import override_settings
+
+from lego.apps.files.storage import Storage
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the cost of presigning file urls one by one, in a batch and from the "
+        "cache. Uses dummy credentials, nothing is sent to S3."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--files",
+            type=int,
+            default=1000,
+            help="Number of files signed in each run",
+        )
+
+    def measure(self, name, sign):
+        start = time.perf_counter()
+        sign()
+        print(f"{name:<16}{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def run(self, *args, **options):
+        keys = [f"file{i}.pdf" for i in range(options["files"])]
+        print(f"Signing {len(keys)} files:")
+
+        with override_settings(
+            AWS_ACCESS_KEY_ID="benchmark",
+            AWS_SECRET_ACCESS_KEY="benchmark",
+            AWS_REGION="us-east-1",
+            FILE_SIGNED_URL_CACHE_TIMEOUT=60 * 45,
+        ):
+            storage = Storage()
+            bucket = "benchmark"
+            storage.signed_urls.clear()
+
+            self.measure(
+                "One by one",
+                lambda: [storage.generate_signed_url(bucket, key) for key in keys],
+            )
+            self.measure(
+                "Batch, cold", lambda: storage.generate_signed_urls(bucket, keys)
+            )
+            self.measure(
+                "Batch, cached", lambda: storage.generate_signed_urls(bucket, keys)
+            )
@@ -0,0 +1,96 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from lego.apps.frontpage.cache import FrontpageCache
+from lego.apps.frontpage.views import FrontpageViewSet
+from lego.apps.users.models import User
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the frontpage endpoint with concurrent clients, with and without the "
+        "shared frontpage cache, and report latency percentiles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Number of requests in each run",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of concurrent clients, each with its own database connection",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=20,
+            help="Number of different users making the requests, 0 for anonymous requests",
+        )
+
+    def request(self, users):
+        view = FrontpageViewSet.as_view({"get": "list"})
+        factory = APIRequestFactory()
+        latencies = []
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        try:
+            with connection.execute_wrapper(count_queries):
+                for user in users:
+                    request = factory.get("/api/v1/frontpage/")
+                    if user.is_authenticated:
+                        force_authenticate(request, user=user)
+                    start = time.perf_counter()
+                    view(request).render()
+                    latencies.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+        return latencies, queries
+
+    def load_test(self, users, workers):
+        latencies = []
+        queries = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for worker_latencies, worker_queries in executor.map(
+                self.request, (users[i::workers] for i in range(workers))
+            ):
+                latencies += worker_latencies
+                queries += worker_queries
+
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"p50 {percentiles[49] * 1000:.1f} ms, p95 {percentiles[94] * 1000:.1f} ms, "
+            f"{queries / len(users):.1f} queries per request"
+        )
+
+    def run(self, *args, **options):
+        if options["users"]:
+            clients = list(User.objects.order_by("id")[: options["users"]])
+        else:
+            clients = [AnonymousUser()]
+        users = [clients[i % len(clients)] for i in range(options["requests"])]
+
+        print(f"{len(users)} requests from {len(clients)} users:")
+        with override_settings(FRONTPAGE_CACHE_TIMEOUT=0):
+            print("Without cache: ", end="")
+            self.load_test(users, options["workers"])
+        with override_settings(FRONTPAGE_CACHE_TIMEOUT=60):
+            FrontpageCache.invalidate()
+            print("With cache:    ", end="")
+            self.load_test(users, options["workers"])
@@ -0,0 +1,50 @@
+import time
+
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+
+from lego.apps.jwt.authentication import Authentication
+from lego.apps.jwt.handlers import get_jwt_token
+from lego.apps.users.models import User
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Benchmark the writes done by JWT authentication of API requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", type=str, help="User to authenticate as")
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            help="Number of requests to authenticate",
+        )
+
+    def run(self, *args, **options):
+        user = User.objects.get(username=options["username"])
+        token = get_jwt_token(user)["token"]
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        authentication = Authentication()
+        queries = 0
+        updates = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries, updates
+            queries += 1
+            if sql.startswith("UPDATE"):
+                updates += 1
+            return execute(sql, params, many, context)
+
+        with transaction.atomic():
+            with connection.execute_wrapper(count_queries):
+                start = time.perf_counter()
+                for _ in range(options["requests"]):
+                    authentication.authenticate(request)
+                duration = time.perf_counter() - start
+            transaction.set_rollback(True)
+
+        print(
+            f"{options['requests']} requests: {queries} queries, {updates} updates, "
+            f"{duration * 1000 / options['requests']:.3f} ms per request"
+        )
@@ -0,0 +1,51 @@
+import time
+
+from django.db import connection
+
+from lego.apps.permissions.keyword import KeywordPermissions
+from lego.apps.users.models import User
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Benchmark KeywordPermissions.has_perm for a user in a deep group tree"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", type=str, help="User to check permissions for")
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=1000,
+            help="Number of requests to simulate",
+        )
+        parser.add_argument(
+            "--checks",
+            type=int,
+            default=20,
+            help="Number of has_perm calls per request",
+        )
+
+    def run(self, *args, **options):
+        user_id = User.objects.get(username=options["username"]).pk
+        keywords = [f"/sudo/admin/benchmark/{i}/" for i in range(options["checks"])]
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            start = time.perf_counter()
+            for _ in range(options["iterations"]):
+                # A new user instance per iteration, like a new request
+                user = User.objects.get(pk=user_id)
+                for keyword in keywords:
+                    KeywordPermissions.has_perm(user, keyword)
+            duration = time.perf_counter() - start
+
+        print(
+            f"{options['iterations']} requests with {options['checks']} checks: "
+            f"{duration * 1000 / options['iterations']:.3f} ms per request, "
+            f"{queries / options['iterations']:.1f} queries per request"
+        )
@@ -0,0 +1,87 @@
+import time
+from datetime import timedelta
+
+from django.core import mail
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from lego.apps.users.models import User
+from lego.apps.users.notifications import InactiveNotification
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark notifying many users one by one and with Notification.notify_many. "
+        "Run with eager celery tasks, the data is created in a transaction that is rolled "
+        "back and the mail is sent to the locmem backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=500,
+            help="Number of users notified",
+        )
+
+    def measure(self, name, notify):
+        queries = 0
+        connections = 0
+        backend = mail.get_connection().__class__
+        init_connection = backend.__init__
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        def count_connections(self, *args, **kwargs):
+            nonlocal connections
+            connections += 1
+            return init_connection(self, *args, **kwargs)
+
+        mail.outbox = []
+        backend.__init__ = count_connections
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count_queries):
+                notify()
+        finally:
+            backend.__init__ = init_connection
+        duration = time.perf_counter() - start
+        print(
+            f"{name:<12}{len(mail.outbox)} mails: {queries} queries, "
+            f"{connections} connections, {duration:.2f} s"
+        )
+        mail.outbox = []
+
+    def run(self, *args, **options):
+        with (
+            transaction.atomic(),
+            override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+            ),
+        ):
+            users = User.objects.bulk_create(
+                User(
+                    username=f"benchmark{i}",
+                    first_name="Benchmark",
+                    last_name=str(i),
+                    email=f"benchmark{i}@abakus.no",
+                    last_login=timezone.now() - timedelta(days=300),
+                )
+                for i in range(options["users"])
+            )
+
+            def one_by_one():
+                for user in users:
+                    InactiveNotification(user, max_inactive_days=365).notify()
+
+            self.measure("One by one", one_by_one)
+            self.measure(
+                "notify_many",
+                lambda: InactiveNotification.notify_many(users, max_inactive_days=365),
+            )
+            transaction.set_rollback(True)
@@ -0,0 +1,100 @@
+import time
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import override_settings
+
+from expo_notifications.models import Device as ExpoDevice
+from push_notifications.models import APNSDevice, GCMDevice
+from redis.client import Pipeline
+
+from lego.apps.users.models import User
+from lego.utils import push
+from lego.utils.management_command import BaseCommand
+from lego.utils.push import PushMessage
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark sending a push message to many users one by one and with "
+        "PushMessage.send_many. Every user has a GCM, APNS and Expo device. The data is "
+        "created in a transaction that is rolled back and the batches are kept by the "
+        "LocmemBackend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=500,
+            help="Number of users receiving the message",
+        )
+
+    def setup(self, options):
+        users = User.objects.bulk_create(
+            User(
+                username=f"benchmark{i}",
+                first_name="Benchmark",
+                last_name=str(i),
+                email=f"benchmark{i}@abakus.no",
+            )
+            for i in range(options["users"])
+        )
+        GCMDevice.objects.bulk_create(
+            GCMDevice(user=user, registration_id=f"gcm{user.pk}") for user in users
+        )
+        APNSDevice.objects.bulk_create(
+            APNSDevice(user=user, registration_id=f"apns{user.pk}") for user in users
+        )
+        ExpoDevice.objects.bulk_create(
+            ExpoDevice(user=user, push_token=f"ExponentPushToken[{user.pk}]")
+            for user in users
+        )
+        return [
+            PushMessage(
+                user=user,
+                template="notifications/push/announcement.txt",
+                context={"sender": "Webkom"},
+                title="Kunngjøring fra Webkom",
+            )
+            for user in users
+        ]
+
+    def measure(self, name, send):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        push.outbox.clear()
+        start = time.perf_counter()
+        with (
+            connection.execute_wrapper(count_queries),
+            mock.patch.object(
+                Pipeline, "execute", autospec=True, side_effect=Pipeline.execute
+            ) as pipelines,
+        ):
+            send()
+        duration = time.perf_counter() - start
+        print(
+            f"{name:<12}{len(push.outbox)} batches: {queries} queries, "
+            f"{pipelines.call_count} redis round trips, {duration * 1000:.0f} ms"
+        )
+        push.outbox.clear()
+
+    def run(self, *args, **options):
+        with (
+            transaction.atomic(),
+            override_settings(PUSH_BACKEND="lego.utils.push.LocmemBackend"),
+        ):
+            messages = self.setup(options)
+
+            def one_by_one():
+                for message in messages:
+                    message.send()
+
+            self.measure("One by one", one_by_one)
+            self.measure("send_many", lambda: PushMessage.send_many(messages))
+            transaction.set_rollback(True)
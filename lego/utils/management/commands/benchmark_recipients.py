@@ -0,0 +1,92 @@
+import time
+
+from django.db import connection, transaction
+
+from lego.apps.notifications.constants import EMAIL, PUSH, WEEKLY_MAIL
+from lego.apps.notifications.models import Announcement, NotificationSetting
+from lego.apps.restricted.models import RestrictedMail
+from lego.apps.users.models import AbakusGroup, Membership, User
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark resolving the recipients of a restricted mail and an announcement sent "
+        "to a large group. The data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--members",
+            type=int,
+            default=5000,
+            help="Number of members of the group, spread over the group and a subgroup",
+        )
+
+    def setup(self, options):
+        students = AbakusGroup.objects.get(name="Students")
+        group = AbakusGroup.objects.create(name="benchmark")
+        subgroup = AbakusGroup.objects.create(name="benchmark-subgroup", parent=group)
+        users = User.objects.bulk_create(
+            User(
+                username=f"benchmark{i}",
+                first_name="Benchmark",
+                last_name=str(i),
+                email=f"benchmark{i}@abakus.no",
+            )
+            for i in range(options["members"])
+        )
+        Membership.objects.bulk_create(
+            [Membership(user=user, abakus_group=students) for user in users]
+            + [
+                Membership(user=user, abakus_group=group if i % 2 else subgroup)
+                for i, user in enumerate(users)
+            ]
+        )
+        # Every third student has changed the weekly mail setting
+        NotificationSetting.objects.bulk_create(
+            NotificationSetting(
+                user=user,
+                notification_type=WEEKLY_MAIL,
+                channels=[PUSH] if i % 2 else [EMAIL],
+            )
+            for i, user in enumerate(users[::3])
+        )
+
+        restricted_mail = RestrictedMail.objects.create(
+            from_address="benchmark@abakus.no", token="benchmark"
+        )
+        restricted_mail.groups.add(group)
+        weekly_mail = RestrictedMail.objects.create(
+            from_address="benchmark@abakus.no", token="benchmark-weekly", weekly=True
+        )
+        announcement = Announcement.objects.create(message="Benchmark")
+        announcement.groups.add(group)
+        return restricted_mail, weekly_mail, announcement
+
+    def measure(self, name, lookup):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            recipients = lookup()
+        duration = time.perf_counter() - start
+        print(
+            f"{name:<16}{len(recipients)} recipients: {queries} queries, "
+            f"{duration * 1000:.0f} ms"
+        )
+
+    def run(self, *args, **options):
+        with transaction.atomic():
+            restricted_mail, weekly_mail, announcement = self.setup(options)
+            print(f"Group with {options['members']} members:")
+
+            self.measure("Restricted mail", restricted_mail.lookup_recipients)
+            self.measure("Weekly mail", weekly_mail.lookup_recipients)
+            self.measure("Announcement", announcement.lookup_recipients)
+            transaction.set_rollback(True)
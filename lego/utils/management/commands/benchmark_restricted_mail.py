@@ -0,0 +1,108 @@
+import time
+import tracemalloc
+from copy import deepcopy
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+
+from lego.apps.restricted.message import EmailMessage
+from lego.apps.restricted.message_processor import MessageProcessor
+from lego.apps.restricted.parser import EmailParser, ParserMessageType
+from lego.utils.management_command import BaseCommand
+
+
+class SerializingBackend(BaseEmailBackend):
+    """
+    Serialize each message like the SMTP backend does, without sending it anywhere.
+    """
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            message.message().as_bytes(linesep="\r\n")
+        return len(email_messages)
+
+
+class CopiedEmailMessage(EmailMessage):
+    """
+    The message sent to each recipient before the messages were shared, flattened in full.
+    """
+
+    def message(self):
+        return self.extend_instance(self.msg, MIMEMixin)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark time and peak memory of sending a restricted mail with a copy of the "
+        "message per recipient and with one message shared by each batch"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipients",
+            type=int,
+            default=2000,
+            help="Number of recipients of the message",
+        )
+        parser.add_argument(
+            "--attachment",
+            type=int,
+            default=256,
+            help="Size of an attachment added to the message, in kB",
+        )
+
+    def get_message(self, attachment_size):
+        with open(
+            f"{settings.BASE_DIR}/apps/restricted/fixtures/emails/valid.txt"
+        ) as file:
+            raw_message = file.read()
+        attachment = "\n".join(
+            "QUJBS1VT" * 9 for _ in range(attachment_size * 1024 // 73)
+        )
+        raw_message = raw_message.replace(
+            "TEVHT1RPS0VOdGVzdF90b2tlbgo=",
+            f"TEVHT1RPS0VOdGVzdF90b2tlbgo=\n{attachment}",
+        )
+        message = EmailParser(
+            raw_message, "benchmark@abakus.no", ParserMessageType.STRING
+        ).parse()
+        message = MessageProcessor.rewrite_message(message, settings.RESTRICTED_FROM)
+        MessageProcessor.decorate(message, False, "benchmark@abakus.no")
+        return message
+
+    def measure(self, name, send):
+        tracemalloc.start()
+        start = time.perf_counter()
+        send()
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<16}{duration:.2f} s, peak memory {peak / 1024 / 1024:.1f} MB")
+
+    def run(self, *args, **options):
+        message = self.get_message(options["attachment"])
+        recipients = [f"benchmark{i}@abakus.no" for i in range(options["recipients"])]
+        sender = settings.RESTRICTED_FROM
+        batch_size = settings.RESTRICTED_BATCH_SIZE
+        connection = SerializingBackend()
+        print(
+            f"Sending a {len(message.as_bytes()) // 1024} kB message to "
+            f"{len(recipients)} recipients:"
+        )
+
+        def copied():
+            messages = [
+                CopiedEmailMessage(recipient, sender, deepcopy(message))
+                for recipient in recipients
+            ]
+            connection.send_messages(messages)
+
+        def batched():
+            for i in range(0, len(recipients), batch_size):
+                MessageProcessor.send(
+                    recipients[i : i + batch_size], sender, message, connection
+                )
+
+        self.measure("Copied", copied)
+        self.measure("Shared batches", batched)
@@ -0,0 +1,68 @@
+import time
+
+from lego.apps.files import thumbor
+from lego.utils.management_command import BaseCommand
+
+# The image options used by FrontpageEventSerializer
+OPTIONS = [
+    {"height": 500},
+    {"height": 50, "filters": ["blur(20)"]},
+    {"height": 500, "width": 500, "smart": True},
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark signing thumbor urls for a list of events with and without the "
+        "memoized generator"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=100,
+            help="Number of different images, each signed with three sets of options",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=100,
+            help="Number of times the urls are signed",
+        )
+
+    def measure(self, name, generate, repeat, urls):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            generate()
+        duration = time.perf_counter() - start
+        print(
+            f"{name:<12}{duration / repeat * 1000:.2f} ms per list, "
+            f"{duration / (repeat * urls) * 1e6:.2f} µs per url"
+        )
+
+    def run(self, *args, **options):
+        keys = [f"image{i}.png" for i in range(options["images"])]
+        repeat = options["repeat"]
+        urls = len(keys) * len(OPTIONS)
+        print(f"Signing {urls} urls {repeat} times:")
+
+        def uncached():
+            for key in keys:
+                for image_options in OPTIONS:
+                    thumbor.crypto.generate(image_url=key, **image_options)
+
+        def single():
+            for key in keys:
+                for image_options in OPTIONS:
+                    thumbor.generate_url(key, **image_options)
+
+        def batch():
+            for image_options in OPTIONS:
+                thumbor.generate_urls(keys, **image_options)
+
+        thumbor._generate_url.cache_clear()
+        self.measure("Uncached", uncached, repeat, urls)
+        self.measure("Memoized", single, repeat, urls)
+        self.measure("Batch", batch, repeat, urls)
+        print(thumbor._generate_url.cache_info())
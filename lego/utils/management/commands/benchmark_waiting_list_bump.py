@@ -0,0 +1,100 @@
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from lego.apps.events import constants
+from lego.apps.events.models import Event, Pool, Registration
+from lego.apps.events.tasks import check_events_for_registrations_with_expired_penalties
+from lego.apps.users.models import AbakusGroup, Membership, Penalty, User
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the number of queries used to bump waiting registrations when "
+        "penalties expire. The data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--waiting",
+            type=int,
+            default=200,
+            help="Number of registrations on the waiting list",
+        )
+        parser.add_argument(
+            "--spots",
+            type=int,
+            default=10,
+            help="Number of open spots, filled by the last users on the waiting list",
+        )
+
+    def setup(self, options):
+        now = timezone.now()
+        group = AbakusGroup.objects.create(name=f"benchmark-{now.timestamp()}")
+        users = User.objects.bulk_create(
+            User(
+                username=f"benchmark{i}",
+                first_name="Benchmark",
+                last_name=str(i),
+                email=f"benchmark{i}@abakus.no",
+            )
+            for i in range(options["waiting"])
+        )
+        Membership.objects.bulk_create(
+            Membership(user=user, abakus_group=group) for user in users
+        )
+        event = Event.objects.create(
+            title="Benchmark",
+            event_type=constants.COMPANY_PRESENTATION,
+            location="Benchmark",
+            start_time=now + timedelta(days=7),
+            end_time=now + timedelta(days=7, hours=2),
+            heed_penalties=True,
+        )
+        pool = Pool.objects.create(
+            name="Benchmark",
+            capacity=options["spots"],
+            event=event,
+            activation_date=now - timedelta(days=1),
+        )
+        pool.permission_groups.add(group)
+        Registration.objects.bulk_create(
+            Registration(
+                event=event,
+                user=user,
+                status=constants.SUCCESS_REGISTER,
+                registration_date=now - timedelta(minutes=len(users) - i),
+            )
+            for i, user in enumerate(users)
+        )
+        # Everyone ahead of the last users on the waiting list are still penalized
+        Penalty.objects.bulk_create(
+            Penalty(user=user, reason="Benchmark", weight=3, source_event=event)
+            for user in users[: -options["spots"]]
+        )
+        return event
+
+    def run(self, *args, **options):
+        with transaction.atomic():
+            event = self.setup(options)
+            queries = 0
+
+            def count_queries(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            start = time.perf_counter()
+            with connection.execute_wrapper(count_queries):
+                check_events_for_registrations_with_expired_penalties()
+            duration = time.perf_counter() - start
+
+            bumped = event.registrations.exclude(pool=None).count()
+            print(
+                f"{options['waiting']} waiting, {bumped} bumped: {queries} queries, "
+                f"{duration * 1000:.0f} ms"
+            )
+            transaction.set_rollback(True)
@@ -0,0 +1,107 @@
+import time
+from datetime import timedelta
+
+from django.core import mail
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from lego.apps.email.tasks import send_weekly_email
+from lego.apps.events import constants
+from lego.apps.events.models import Event, Pool
+from lego.apps.users.models import AbakusGroup, Membership, User
+from lego.utils.management_command import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark building the weekly mail for many students. The data is created in a "
+        "transaction that is rolled back, and the mail is sent to the locmem backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--students",
+            type=int,
+            default=2000,
+            help="Number of students receiving the mail",
+        )
+        parser.add_argument(
+            "--events",
+            type=int,
+            default=10,
+            help="Number of events with registration next week",
+        )
+        parser.add_argument(
+            "--groups",
+            type=int,
+            default=5,
+            help="Number of groups the students and event pools are spread over",
+        )
+
+    def setup(self, options):
+        now = timezone.now()
+        students = AbakusGroup.objects.get(name="Students")
+        groups = [
+            AbakusGroup.objects.create(name=f"benchmark-{now.timestamp()}-{i}")
+            for i in range(options["groups"])
+        ]
+        users = User.objects.bulk_create(
+            User(
+                username=f"benchmark{i}",
+                first_name="Benchmark",
+                last_name=str(i),
+                email=f"benchmark{i}@abakus.no",
+            )
+            for i in range(options["students"])
+        )
+        Membership.objects.bulk_create(
+            [Membership(user=user, abakus_group=students) for user in users]
+            + [
+                Membership(user=user, abakus_group=groups[i % len(groups)])
+                for i, user in enumerate(users)
+            ]
+        )
+        for i in range(options["events"]):
+            event = Event.objects.create(
+                title=f"Benchmark {i}",
+                event_type=constants.COMPANY_PRESENTATION,
+                location="Benchmark",
+                start_time=now + timedelta(days=14),
+                end_time=now + timedelta(days=14, hours=2),
+                require_auth=False,
+            )
+            pool = Pool.objects.create(
+                name="Benchmark",
+                capacity=10,
+                event=event,
+                activation_date=now + timedelta(days=2),
+            )
+            pool.permission_groups.add(groups[i % len(groups)])
+
+    def run(self, *args, **options):
+        with transaction.atomic():
+            self.setup(options)
+            queries = 0
+
+            def count_queries(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            with override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+            ):
+                mail.outbox = []
+                start = time.perf_counter()
+                with connection.execute_wrapper(count_queries):
+                    send_weekly_email()
+                duration = time.perf_counter() - start
+                sent = len(mail.outbox)
+                mail.outbox = []
+
+            print(
+                f"{options['students']} students, {sent} mails: {queries} queries, "
+                f"{duration:.2f} s"
+            )
+            transaction.set_rollback(True)
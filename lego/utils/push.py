@@ -1,6 +1,11 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
 
-from expo_notifications.models import Device as ExpoDevice
+from expo_notifications.models import Device as ExpoDevice, Message as ExpoMessage
+from push_notifications.exceptions import NotificationError
 from push_notifications.models import APNSDevice, GCMDevice
 from structlog import get_logger
 
@@ -8,6 +13,71 @@ from lego.apps.feeds.models import NotificationFeed
 
 log = get_logger()
 
+# Batches sent with the LocmemBackend
+outbox = []
+
+
+class ProviderBackend:
+    """
+    Send push messages through the batch APIs of the providers. Expo messages are saved and
+    sent by one expo_notifications task.
+    """
+
+    def send_gcm(self, registration_ids, data, cloud_type, application_id):
+        from push_notifications.gcm import send_message as gcm_send_message
+
+        gcm_send_message(
+            registration_ids, data, cloud_type, application_id=application_id
+        )
+
+    def send_apns(self, registration_ids, alert, application_id, **kwargs):
+        from push_notifications.apns import apns_send_bulk_message
+
+        apns_send_bulk_message(
+            registration_ids=registration_ids,
+            alert=alert,
+            application_id=application_id,
+            **kwargs,
+        )
+
+    def send_expo(self, messages):
+        ExpoMessage.objects.bulk_send(messages)
+
+
+class LocmemBackend:
+    """
+    Keep the batches in lego.utils.push.outbox instead of sending them, used by the tests.
+    """
+
+    def send_gcm(self, registration_ids, data, cloud_type, application_id):
+        outbox.append(
+            {
+                "provider": "gcm",
+                "registration_ids": registration_ids,
+                "data": data,
+                "cloud_type": cloud_type,
+                "application_id": application_id,
+            }
+        )
+
+    def send_apns(self, registration_ids, alert, application_id, **kwargs):
+        outbox.append(
+            {
+                "provider": "apns",
+                "registration_ids": registration_ids,
+                "alert": alert,
+                "application_id": application_id,
+                **kwargs,
+            }
+        )
+
+    def send_expo(self, messages):
+        outbox.append({"provider": "expo", "messages": messages})
+
+
+def get_backend():
+    return import_string(settings.PUSH_BACKEND)()
+
 
 class PushMessage:
     def __init__(self, user, template, context, title, target=None):
@@ -17,35 +87,108 @@ class PushMessage:
         self.target = target
         self.title = title
 
-    def _get_unread_count(self):
-        feed = NotificationFeed
-        data = feed.get_notification_data(self.user.pk)
-        return data.get("unread_count", 0)
+    def render(self):
+        return render_to_string(self.template, self.context).strip()
+
+    def get_extra(self):
+        extra = {}
+        if self.target:
+            extra["target"] = self.target
+        return extra
 
     def send(self):
         """
         Send push messages to devices owned by the user. Apple supports a badge argument, this is
         set to the unread notifications count.
         """
+        failed = self.send_many([self])
+        if failed:
+            raise failed[0][1]
 
-        message = render_to_string(self.template, self.context).strip()
-        extra = {}
-        if self.target:
-            extra["target"] = self.target
+    @staticmethod
+    def send_many(messages):
+        """
+        Send push messages to the devices of many users. The devices of each provider are
+        loaded with one query and the unread counts with one redis pipeline. Messages with
+        the same content are sent to all their devices in one batch, APNS batches are also
+        split by the badge. Returns the messages in failed batches with the error.
+        """
+        users = {message.user.pk for message in messages}
+        gcm_devices = defaultdict(list)
+        for device in GCMDevice.objects.filter(user__in=users, active=True):
+            gcm_devices[device.user_id].append(device)
+        apns_devices = defaultdict(list)
+        for device in APNSDevice.objects.filter(user__in=users, active=True):
+            apns_devices[device.user_id].append(device)
+        expo_devices = {}
+        for device in ExpoDevice.objects.filter(
+            user__in=users, is_active=True
+        ).order_by("pk"):
+            expo_devices.setdefault(device.user_id, device)
+        unread_counts = {
+            feed_id: data["unread_count"]
+            for feed_id, data in NotificationFeed.get_notification_data_many(
+                list(apns_devices)
+            ).items()
+        }
 
-        gcm_devices = GCMDevice.objects.filter(user=self.user, active=True)
-        apns_devices = APNSDevice.objects.filter(user=self.user, active=True)
+        gcm_batches = defaultdict(lambda: ([], []))
+        apns_batches = defaultdict(lambda: ([], []))
+        expo_messages = []
+        for message in messages:
+            body = message.render()
+            user = message.user.pk
 
-        expo_device = ExpoDevice.objects.filter(user=self.user, is_active=True).first()
-        if expo_device:
-            expo_device.messages.send(title=self.title, body=message)
+            for device in gcm_devices[user]:
+                key = (
+                    body,
+                    message.target,
+                    device.cloud_message_type,
+                    device.application_id,
+                )
+                gcm_batches[key][0].append(device.registration_id)
+                gcm_batches[key][1].append(message)
+            for device in apns_devices[user]:
+                key = (body, message.target, unread_counts[user], device.application_id)
+                apns_batches[key][0].append(device.registration_id)
+                apns_batches[key][1].append(message)
+            if user in expo_devices:
+                expo_messages.append(
+                    ExpoMessage(
+                        device=expo_devices[user], title=message.title, body=body
+                    )
+                )
 
-        log.info(
-            "send_push",
-            message=message,
-            gcm_devices=gcm_devices.count(),
-            apns_devices=apns_devices.count(),
-        )
+            log.info(
+                "send_push",
+                message=body,
+                gcm_devices=len(gcm_devices[user]),
+                apns_devices=len(apns_devices[user]),
+            )
+
+        backend = get_backend()
+        if expo_messages:
+            backend.send_expo(expo_messages)
+
+        failed = {}
+        for key, (registration_ids, batch) in gcm_batches.items():
+            body, _, cloud_type, application_id = key
+            data = {**batch[0].get_extra(), "message": body}
+            try:
+                backend.send_gcm(registration_ids, data, cloud_type, application_id)
+            except NotificationError as e:
+                failed.update(dict.fromkeys(batch, e))
+        for key, (registration_ids, batch) in apns_batches.items():
+            body, _, badge, application_id = key
+            try:
+                backend.send_apns(
+                    registration_ids,
+                    body,
+                    application_id,
+                    badge=badge,
+                    extra=batch[0].get_extra(),
+                )
+            except NotificationError as e:
+                failed.update(dict.fromkeys(batch, e))
 
-        gcm_devices.send_message(message, extra=extra)
-        apns_devices.send_message(message, badge=self._get_unread_count(), extra=extra)
+        return list(failed.items())
@@ -1,4 +1,4 @@
-from smtplib import SMTPException
+from smtplib import SMTPDataError, SMTPException, SMTPRecipientsRefused
 
 from celery.app.task import Task
 from celery.utils.time import get_exponential_backoff_interval
@@ -8,7 +8,7 @@ from structlog import get_context, get_logger
 from lego import celery_app
 from lego.apps.users.models import User
 
-from .email import EmailMessage
+from .email import EmailMessage, send_with_connection
 from .push import PushMessage
 
 log = get_logger()
@@ -28,6 +28,7 @@ class AbakusTask(Task):
     def apply_async(self, args=None, kwargs=None, *arguments, **keyword_arguments):
         logger = log.bind()
         logger_context = dict(get_context(logger)._dict)
+        kwargs = kwargs if kwargs is not None else {}
         kwargs["logger_context"] = logger_context
 
         async_result = super().apply_async(
@@ -64,6 +65,46 @@ def send_email(self, logger_context=None, **kwargs):
         ) from e
 
 
+@celery_app.task(bind=True, max_retries=5, base=AbakusTask)
+def send_emails(self, messages, logger_context=None):
+    """
+    Send many emails over the mail connection of the worker. The messages take the same
+    arguments as send_email. Messages that can't be rendered or are rejected by the server
+    are skipped, connection errors retry the messages not sent yet.
+    """
+    self.setup_logger(logger_context)
+
+    for i, message in enumerate(messages):
+        try:
+            email = EmailMessage(**message).render()
+        except Exception:
+            log.error(
+                "email_render_exception",
+                exc_info=True,
+                to_email=message.get("to_email"),
+            )
+            continue
+
+        try:
+            send_with_connection(
+                lambda connection, email=email: connection.send_messages([email])
+            )
+        except (SMTPRecipientsRefused, SMTPDataError):
+            log.error("email_rejected", exc_info=True, to_email=message.get("to_email"))
+        except (SMTPException, OSError) as e:
+            log.error("email_task_exception", exc_info=True, sent=i)
+            raise self.retry(
+                kwargs={"messages": messages[i:]},
+                exc=e,
+                countdown=get_exponential_backoff_interval(
+                    factor=60,
+                    retries=self.request.retries,
+                    maximum=1800,
+                    full_jitter=True,
+                ),
+            ) from e
+
+
 @celery_app.task(bind=True, max_retries=5, base=AbakusTask)
 def send_push(self, user, title, target=None, logger_context=None, **kwargs):
     """
@@ -88,3 +129,31 @@ def send_push(self, user, title, target=None, logger_context=None, **kwargs):
                 factor=60, retries=self.request.retries, maximum=1800, full_jitter=True
             ),
         ) from e
+
+
+@celery_app.task(bind=True, max_retries=5, base=AbakusTask)
+def send_pushes(self, messages, logger_context=None):
+    """
+    Send many push messages with PushMessage.send_many. The messages take the same arguments
+    as send_push, a retry only sends the messages in batches that failed.
+    """
+    self.setup_logger(logger_context)
+
+    users = User.objects.in_bulk({message["user"] for message in messages})
+    pushes = {
+        PushMessage(**{**message, "user": users[message["user"]]}): message
+        for message in messages
+        if message["user"] in users
+    }
+    failed = PushMessage.send_many(list(pushes))
+
+    if failed:
+        error = failed[0][1]
+        log.error("push_task_exception", failed=len(failed))
+        raise self.retry(
+            kwargs={"messages": [pushes[push] for push, _ in failed]},
+            exc=error,
+            countdown=get_exponential_backoff_interval(
+                factor=60, retries=self.request.retries, maximum=1800, full_jitter=True
+            ),
+        ) from error
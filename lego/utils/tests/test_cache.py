@@ -0,0 +1,22 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from lego.utils.cache import LocalCache
+
+
+class LocalCacheTestCase(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        local_cache = LocalCache(max_size=2, timeout=60)
+        local_cache.set_many({"a": 1, "b": 2})
+        local_cache.get_many(["a"])
+        local_cache.set_many({"c": 3})
+
+        self.assertEqual({"a": 1, "c": 3}, local_cache.get_many(["a", "b", "c"]))
+
+    def test_expires_items(self):
+        local_cache = LocalCache(max_size=2, timeout=60)
+        with mock.patch("lego.utils.cache.time.monotonic", return_value=0):
+            local_cache.set_many({"a": 1})
+        with mock.patch("lego.utils.cache.time.monotonic", return_value=61):
+            self.assertEqual({}, local_cache.get_many(["a"]))
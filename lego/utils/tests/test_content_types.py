@@ -1,6 +1,6 @@
 from unittest import mock
 
-from lego.apps.users.models import User
+from lego.apps.users.models import AbakusGroup, User
 from lego.utils import content_types
 from lego.utils.test_utils import BaseTestCase
 
@@ -34,3 +34,34 @@ class ContentTypesTestCase(BaseTestCase):
             content_types.string_to_model_cls,
             "unknown.model",
         )
+
+    def test_string_to_model_cls_is_cached(self):
+        content_types.string_to_model_cls("users.user")
+        with self.assertNumQueries(0):
+            self.assertEqual(content_types.string_to_model_cls("users.user"), User)
+
+
+class StringsToInstancesTestCase(BaseTestCase):
+    fixtures = ["test_abakus_groups.yaml", "test_users.yaml"]
+
+    def test_one_query_per_model(self):
+        users = list(User.objects.all()[:2])
+        group = AbakusGroup.objects.first()
+        strings = [content_types.instance_to_string(user) for user in users]
+        strings.append(content_types.instance_to_string(group))
+        # Warm the ContentType cache
+        content_types.string_to_model_cls("users.user")
+        content_types.string_to_model_cls("users.abakusgroup")
+
+        with self.assertNumQueries(2):
+            result = content_types.strings_to_instances(strings)
+
+        self.assertEqual(
+            {strings[0]: users[0], strings[1]: users[1], strings[2]: group}, result
+        )
+
+    def test_skips_invalid_strings(self):
+        result = content_types.strings_to_instances(
+            ["users.user-abc", "unknown.model-1", "invalid", "users.user-999999"]
+        )
+        self.assertEqual({}, result)
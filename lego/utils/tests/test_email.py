@@ -0,0 +1,193 @@
+from glob import glob
+from smtplib import SMTPException, SMTPServerDisconnected
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.template.loader import render_to_string
+from django.test import override_settings
+
+from lxml import html
+from premailer import transform
+from premailer.premailer import ExternalFileLoadingError
+
+from lego.utils import email
+from lego.utils.email import (
+    INLINED_TEMPLATES,
+    close_mail_connection,
+    get_inlined_template,
+    get_mail_connection,
+    render_html,
+    send_email,
+    send_with_connection,
+)
+from lego.utils.test_utils import BaseTestCase
+
+CONTEXT = {
+    "title": "Inaktiv bruker",
+    "frontend_url": "https://abakus.no",
+    "name": "Ola & <Kari>",
+    "last_login": "2020-01-01",
+    "username": "ola",
+    "date_of_deletion": "2021-01-01",
+    "max_inactive_days": 365,
+}
+
+
+def elements(body):
+    return [
+        (
+            element.tag,
+            element.attrib,
+            (element.text or "").split(),
+            (element.tail or "").split(),
+        )
+        for element in html.document_fromstring(body).iter()
+        if isinstance(element.tag, str)
+    ]
+
+
+# Renders every branch of the email templates, an empty context renders none of them
+FULL_CONTEXT = {
+    **CONTEXT,
+    "site": "abakus.no",
+    "event": "Bedpres",
+    "users": [{"name": "Ola", "email": "ola@abakus.no"}],
+    "userlist": ["ola", "kari"],
+    "week_number": 3,
+    "events": [
+        {
+            "title": "Bedpres",
+            "id": 1,
+            "pools": [{"name": "Abakus", "activation_date": "01.01 kl. 12:00"}],
+            "start_time": "02.01 kl. 16:15",
+            "url": "https://abakus.no/events/1",
+            "image": "https://abakus.no/image.png",
+        }
+    ],
+    "joblistings": [{"company": "Webkom", "title": "Utvikler", "id": 2}],
+    "todays_weekly": "https://abakus.no/articles/1",
+    "collaborations": "Bedpres",
+    "readme": True,
+    "comment": "A comment longer than ten characters",
+}
+
+EMAIL_TEMPLATES = sorted(
+    path.split("/templates/", 1)[1]
+    for path in glob(
+        f"{settings.BASE_DIR}/**/templates/**/email/*.html", recursive=True
+    )
+)
+
+
+class InlinedTemplateTestCase(BaseTestCase):
+    def setUp(self):
+        get_inlined_template.cache_clear()
+
+    def test_same_as_transform(self):
+        """
+        The templates inlined ahead of time render the same elements and styles as inlining
+        each message, other templates are inlined for each message.
+        """
+        for name in EMAIL_TEMPLATES:
+            with self.subTest(template=name):
+                if name not in INLINED_TEMPLATES:
+                    self.assertIsNone(get_inlined_template(name))
+                    continue
+                self.assertIsNotNone(get_inlined_template(name))
+                for context in [FULL_CONTEXT, {}]:
+                    self.assertEqual(
+                        elements(transform(render_to_string(name, context))),
+                        elements(render_html(name, context)),
+                    )
+
+    def test_allowlist(self):
+        """Every template in the allowlist exists"""
+        self.assertLessEqual(INLINED_TEMPLATES, set(EMAIL_TEMPLATES))
+
+    def test_transform_error(self):
+        """A template premailer fails on is inlined for each message"""
+        with mock.patch(
+            "lego.utils.email.transform", side_effect=ExternalFileLoadingError
+        ):
+            self.assertIsNone(get_inlined_template("users/email/inactive.html"))
+
+    def test_inlined_once(self):
+        """The CSS is inlined the first time a template is rendered"""
+        with mock.patch(
+            "lego.utils.email.transform", wraps=transform
+        ) as transform_mock:
+            render_html("users/email/inactive.html", CONTEXT)
+            render_html("users/email/inactive.html", {**CONTEXT, "name": "Kari"})
+
+        self.assertEqual(1, transform_mock.call_count)
+
+    def test_escaped(self):
+        """The context is escaped like before"""
+        body = render_html("users/email/inactive.html", CONTEXT)
+        self.assertIn("Hei Ola &amp; &lt;Kari&gt;!", body)
+
+    def test_markup_in_context(self):
+        """Templates inserting markup from the context are inlined for each message"""
+        self.assertIsNone(get_inlined_template("comments/email/comment_reply.html"))
+        with mock.patch(
+            "lego.utils.email.transform", wraps=transform
+        ) as transform_mock:
+            render_html("comments/email/comment_reply.html", {"text": "<b>Hei</b>"})
+            render_html("comments/email/comment_reply.html", {"text": "<b>Hei</b>"})
+
+        self.assertEqual(2, transform_mock.call_count)
+
+
+class MailConnectionTestCase(BaseTestCase):
+    def setUp(self):
+        close_mail_connection()
+
+    def tearDown(self):
+        close_mail_connection()
+
+    def send(self):
+        send_email(
+            "test@abakus.no",
+            CONTEXT,
+            "Subject",
+            "users/email/inactive.txt",
+            "users/email/inactive.html",
+        )
+
+    def test_reused(self):
+        """Messages are sent over the same connection"""
+        with mock.patch(
+            "lego.utils.email.get_connection", wraps=email.get_connection
+        ) as get_connection_mock:
+            self.send()
+            self.send()
+
+        get_connection_mock.assert_called_once()
+        self.assertEqual(2, len(mail.outbox))
+        self.assertIn("Hei Ola &amp; &lt;Kari&gt;!", mail.outbox[0].alternatives[0][0])
+
+    @override_settings(EMAIL_CONNECTION_MAX_AGE=-1)
+    def test_max_age(self):
+        """An idle connection is reopened"""
+        connection = get_mail_connection()
+        self.assertIsNot(connection, get_mail_connection())
+
+    def test_server_disconnected(self):
+        """A connection closed by the server is reopened once"""
+        connection = get_mail_connection()
+        send = mock.Mock(side_effect=[SMTPServerDisconnected("closed"), 1])
+
+        self.assertEqual(1, send_with_connection(send))
+        self.assertIs(connection, send.call_args_list[0][0][0])
+        self.assertIsNot(connection, send.call_args_list[1][0][0])
+
+    def test_error(self):
+        """The connection is dropped on errors"""
+        connection = get_mail_connection()
+        send = mock.Mock(side_effect=SMTPException("error"))
+
+        with self.assertRaises(SMTPException):
+            send_with_connection(send)
+        send.assert_called_once()
+        self.assertIsNot(connection, get_mail_connection())
@@ -1,12 +1,19 @@
 from unittest.mock import patch
 
+from django.test import override_settings
+
 from expo_notifications.models import Device, Message
+from push_notifications.exceptions import NotificationError
+from push_notifications.models import APNSDevice, GCMDevice
 
+from lego.apps.feeds.models import NotificationFeed
 from lego.apps.users.models import User
+from lego.utils import push
 from lego.utils.push import PushMessage
 from lego.utils.test_utils import BaseTestCase
 
 
+@override_settings(PUSH_BACKEND="lego.utils.push.ProviderBackend")
 class PushMessageTestCase(BaseTestCase):
     fixtures = ["test_users.yaml"]
 
@@ -50,3 +57,67 @@ class PushMessageTestCase(BaseTestCase):
         self.push_message.send()
         self.assertEqual(Message.objects.count(), 0)
         delay_on_commit_mock.assert_not_called()
+
+
+class SendManyTestCase(BaseTestCase):
+    fixtures = ["test_users.yaml"]
+
+    def setUp(self):
+        push.outbox.clear()
+        self.users = list(User.objects.order_by("pk")[:3])
+        gcm, apns, apns_unread = self.users
+        GCMDevice.objects.create(
+            user=gcm, registration_id="gcm", cloud_message_type="FCM"
+        )
+        GCMDevice.objects.create(
+            user=apns, registration_id="gcm-2", cloud_message_type="FCM"
+        )
+        APNSDevice.objects.create(user=apns, registration_id="apns")
+        APNSDevice.objects.create(user=apns_unread, registration_id="apns-2")
+        Device.objects.create(user=gcm, push_token="ExponentPushToken[test_token]")
+        for user in self.users:
+            NotificationFeed.mark_all(user.pk, seen=True, read=True)
+        NotificationFeed.mark_insert_activity(apns_unread.pk, "activity")
+
+    def tearDown(self):
+        push.outbox.clear()
+
+    def messages(self):
+        return [
+            PushMessage(
+                user=user,
+                template="notifications/push/announcement.txt",
+                context={"sender": "Webkom"},
+                title="Kunngjøring fra Webkom",
+                target="announcement",
+            )
+            for user in self.users
+        ]
+
+    def test_batches(self):
+        """Devices are loaded with one query per provider and messages sent in batches"""
+        with self.assertNumQueries(3):
+            failed = PushMessage.send_many(self.messages())
+
+        self.assertEqual([], failed)
+        expo, gcm, apns, apns_unread = push.outbox
+        self.assertEqual("expo", expo["provider"])
+        self.assertEqual(1, len(expo["messages"]))
+        self.assertEqual(["gcm", "gcm-2"], gcm["registration_ids"])
+        self.assertEqual("announcement", gcm["data"]["target"])
+        self.assertEqual(["apns"], apns["registration_ids"])
+        self.assertEqual(0, apns["badge"])
+        self.assertEqual(["apns-2"], apns_unread["registration_ids"])
+        self.assertEqual(1, apns_unread["badge"])
+
+    def test_failed_batch(self):
+        """The messages of a failed batch are returned with the error"""
+        messages = self.messages()
+        with patch(
+            "lego.utils.push.LocmemBackend.send_apns",
+            side_effect=NotificationError("error"),
+        ):
+            failed = PushMessage.send_many(messages)
+
+        self.assertEqual(messages[1:], [message for message, _ in failed])
+        self.assertIsInstance(failed[0][1], NotificationError)